@@ -1,6 +1,11 @@
 import os
 import logging
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+from pyspark import StorageLevel
+import pyspark.sql.types as ps_types
 from marshmallow import Schema, fields, post_load, validates, ValidationError
 import pandas as pd
 from .utilities import s3_utils, spark_utils, general_utils
@@ -8,6 +13,125 @@ from .assets import BaseDatasetSchema, BaseDataset
 
 S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
 S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
+# Registry of dataset schemas, disabled by default
+_SCHEMA_REGISTRY = None
+
+
+class SchemaRegistry(object):
+    """
+    Registry of dataset schemas keyed by asset name and schema version. The
+    registered schemas are passed to spark explicitly so loads skip schema
+    inference and mergeSchema footer scans. The registry is stored as YAML,
+    schemas are either spark json schemas or column to type mappings.
+    """
+    def __init__(self, registry_path=None, sample_size=2, max_checked=100):
+        """
+        Registry constructor.
+
+        Args:
+            registry_path (str): optional local YAML file to persist to
+            sample_size (int): number of new paths checked for drift
+            max_checked (int): number of checked paths remembered per schema
+        """
+        self.registry_path = registry_path
+        self.sample_size = sample_size
+        self.max_checked = max_checked
+        self.lock = threading.Lock()
+        self.entries = {}
+        if registry_path and os.path.exists(registry_path):
+            with open(registry_path, "r") as f:
+                self.entries = yaml.safe_load(f) or {}
+
+    def get(self, asset_name, version):
+        """
+        This method will get a registered schema.
+
+        Args:
+            asset_name (str): dataset asset name
+            version (str): schema version
+
+        Returns:
+            pyspark schema or None if it isn't registered
+        """
+        entry = self.entries.get(asset_name, {}).get(str(version))
+        if not entry:
+            return None
+        schema = entry["schema"]
+        if "fields" in schema:
+            return ps_types.StructType.fromJson(schema)
+        return spark_utils.create_spark_schema(schema.keys(), schema.values())
+
+    def get_unchecked_paths(self, asset_name, version, paths):
+        """
+        This method will get a sample of the paths that haven't been checked
+        against the registered schema yet, newest last.
+
+        Args:
+            asset_name (str): dataset asset name
+            version (str): schema version
+            paths (list): dataset paths
+
+        Returns:
+            list of at most sample_size paths
+        """
+        entry = self.entries.get(asset_name, {}).get(str(version), {})
+        checked = set(entry.get("checked_paths", []))
+        unchecked = [path for path in paths if path not in checked]
+
+        return unchecked[-self.sample_size:] if self.sample_size else []
+
+    def register(self, asset_name, version, schema, checked_paths=[]):
+        """
+        This method will register a schema and save the registry.
+
+        Args:
+            asset_name (str): dataset asset name
+            version (str): schema version
+            schema (pyspark.sql.types.StructType): schema to register
+            checked_paths (list): paths known to match the schema
+        """
+        with self.lock:
+            entry = self.entries.setdefault(asset_name, {}).setdefault(
+                str(version), {})
+            entry["schema"] = schema.jsonValue()
+            checked = [
+                path for path in entry.get("checked_paths", [])
+                if path not in checked_paths] + list(checked_paths)
+            entry["checked_paths"] = checked[-self.max_checked:]
+            self.save()
+
+    def save(self):
+        """
+        This method will write the registry to its YAML file if it has one.
+        """
+        if self.registry_path:
+            with open(self.registry_path, "w") as f:
+                yaml.safe_dump(self.entries, f)
+
+
+def enable_schema_registry(registry_path=None, sample_size=2):
+    """
+    This method will enable the schema registry for all dataset loads.
+
+    Args:
+        registry_path (str): optional local YAML file to persist to
+        sample_size (int): number of new paths checked for drift
+
+    Returns:
+        the schema registry
+    """
+    global _SCHEMA_REGISTRY
+    _SCHEMA_REGISTRY = SchemaRegistry(registry_path, sample_size)
+
+    return _SCHEMA_REGISTRY
+
+
+def disable_schema_registry():
+    """
+    This method will disable the schema registry.
+    """
+    global _SCHEMA_REGISTRY
+    _SCHEMA_REGISTRY = None
 
 
 class TimeDeltaSchema(Schema):
@@ -46,6 +170,17 @@ class TimestampConversionSchema(Schema):
     new_column_header = fields.String()
 
 
+class PartitioningSchema(Schema):
+    """
+    Schema for reading Hive style partitioned layouts, e.g. dt=.../hour=...
+    """
+    date_column = fields.String(required=True)
+    # Only the date partitions are filtered if not provided
+    hour_column = fields.String()
+    # Will default to %Y-%m-%d
+    date_format = fields.String()
+
+
 class DatasetSchema(BaseDatasetSchema):
     """
         Dataset marshmallow validation schema.
@@ -62,6 +197,10 @@ class DatasetSchema(BaseDatasetSchema):
     dt_delta = fields.Nested(DtDeltaSchema)
     exclude_hours = fields.List(fields.String())
     rename = fields.Dict()
+    exact_files = fields.Boolean()
+    use_pandas = fields.Boolean()
+    partitioning = fields.Nested(PartitioningSchema)
+    schema_version = fields.String()
 
     @post_load
     def make_dataset(self, data, **kwargs):
@@ -84,7 +223,8 @@ class Dataset(BaseDataset):
             bucket=None, format_args={},
             time_delta={"days": 0, "hours": 0, "weeks": 0},
             timestamp_conversion=[], dt_delta={}, exclude_hours=[],
-            rename={}, **kwargs
+            rename={}, exact_files=False, use_pandas=False, partitioning={},
+            schema_version="1", **kwargs
         ):
         """
         Dataset constructor.
@@ -95,28 +235,148 @@ class Dataset(BaseDataset):
             bucket_asset_name, header, schema)
         # Setup additional Dataset arguments
         self.spark = spark
-        # Get all unique permutations of the format arguments
-        format_args_permutations = general_utils.get_dict_permutations(
-            format_args)
-        # Load data from s3 if that is what the location is set to
-        if location == "s3":
+        # Whether to expand s3 globs and pass Spark the exact files
+        self.exact_files = exact_files
+        # Whether to read local csv files through pandas
+        self.use_pandas = use_pandas
+        # Whether the file paths are base paths of a partitioned layout
+        self.partitioning = partitioning
+        self.partition_filter = None
+        # Version of the dataset's schema in the schema registry
+        self.schema_version = schema_version
+        # Record the load plan, data is only discovered and read once the
+        # DataFrame is first accessed or the dataset is prefetched
+        self.load_location = location
+        self.path_templates = list(self.file_path_list)
+        self.dt = dt
+        self.hour = hour
+        self.time_delta = time_delta
+        self.bucket_name = bucket
+        self.format_args = format_args
+        self.dt_delta = dt_delta
+        self.exclude_hours = exclude_hours
+        self.timestamp_conversion = timestamp_conversion
+        self.rename = rename
+        self.resolved = location != "s3" and not partitioning
+        self._df = None
+
+    @property
+    def df(self):
+        """
+        Dataset pyspark DataFrame, loaded on first access.
+        """
+        if self._df is None:
+            self._df = self._load()
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+
+    def get_plan(self):
+        """
+        This method will get the load plan of the dataset, datasets with
+        equal plans load the same data.
+
+        Returns:
+            dict of the path templates, time window, format and schema
+        """
+        return {
+            "location": self.load_location,
+            "path_templates": self.path_templates, "dt": self.dt,
+            "hour": self.hour, "time_delta": self.time_delta,
+            "bucket": self.bucket_name, "format_args": self.format_args,
+            "dt_delta": self.dt_delta, "exclude_hours": self.exclude_hours,
+            "exact_files": self.exact_files, "use_pandas": self.use_pandas,
+            "partitioning": self.partitioning,
+            "file_format": self.file_format,
+            "separator": self.separator, "header": self.header,
+            "schema": self.schema, "schema_version": self.schema_version}
+
+    def prefetch(self, listing_cache=None):
+        """
+        This method will discover the dataset's s3 files without reading
+        them.
+
+        Args:
+            listing_cache (s3_utils.S3ListingCache): optional listing cache
+                shared with other datasets
+
+        Returns:
+            the dataset
+        """
+        if not self.resolved and self.partitioning:
+            self.file_path_list, self.partition_filter = (
+                self._setup_partition_path(
+                    self.path_templates, self.dt, self.hour,
+                    self.time_delta, self.bucket_name,
+                    general_utils.get_dict_permutations(self.format_args),
+                    self.dt_delta, self.exclude_hours,
+                    listing_cache=listing_cache))
+            self.resolved = True
+        elif not self.resolved:
             self.file_path_list = self._setup_s3_path(
-                self.file_path_list, dt, hour, time_delta, bucket, 
-                format_args_permutations, dt_delta, exclude_hours)
+                self.path_templates, self.dt, self.hour, self.time_delta,
+                self.bucket_name,
+                # Get all unique permutations of the format arguments
+                general_utils.get_dict_permutations(self.format_args),
+                self.dt_delta, self.exclude_hours,
+                listing_cache=listing_cache)
+            self.resolved = True
+        return self
+
+    def _load(self):
+        """
+        This method will discover and read the dataset.
+
+        Returns:
+            pyspark DataFrame
+        """
+        # Read partitioned layouts from their base paths and let spark prune
+        # the partitions outside of the time window
+        if self.partitioning:
+            self.prefetch()
+            df = None
+            for path in self.file_path_list:
+                path_df = self._load_data_with_spark(
+                    [path], self.schema, self.file_format, self.separator,
+                    self.header, rename=self.rename,
+                    base_path=path.rsplit("/", 1)[0],
+                    partition_filter=self.partition_filter)
+                df = (
+                    path_df if df is None else
+                    df.unionByName(path_df, allowMissingColumns=True))
+            if df is None:
+                logging.error("No valid data located.\n")
+                raise Exception
+        # Load data from s3 if that is what the location is set to
+        elif self.load_location == "s3":
+            self.prefetch()
             # Load data into a pyspark DataFrame
-            self.df = self._load_data_from_s3(
-                schema, file_format, separator, header, rename=rename)
-            # Convert timestamp if applicable
-            if timestamp_conversion:
-                for params in timestamp_conversion:
-                    self.df = spark_utils.convert_timestamp(self.df, **params)
-        # Otherwise assume the data is a local csv file
-        else:
-            self.df = spark_utils.pandas_to_spark(
-                spark, pd.concat(
+            df = self._load_data_with_spark(
+                self.file_path_list, self.schema, self.file_format,
+                self.separator, self.header, rename=self.rename)
+        # Small local csv files can be read through pandas on the driver
+        elif self.use_pandas:
+            df = spark_utils.pandas_to_spark(
+                self.spark, pd.concat(
                     [pd.read_csv(path) for path in self.file_path_list],
                     ignore_index=True))
-    
+        # Otherwise read local files directly with spark
+        else:
+            df = self._load_data_with_spark(
+                [
+                    path if "://" in path else
+                    "file://" + os.path.abspath(path)
+                    for path in self.file_path_list],
+                self.schema, self.file_format, self.separator, self.header,
+                rename=self.rename)
+        # Convert timestamp if applicable
+        for params in self.timestamp_conversion:
+            df = spark_utils.convert_timestamp(df, **params)
+
+        return df
+
     @classmethod
     def from_base_dataset(cls, base_dataset, **additional_fields):
         # Create a new Dataset instance using attributes from base_dataset
@@ -130,7 +390,7 @@ class Dataset(BaseDataset):
 
     def _setup_s3_path(
             self, s3_path, dt, hour, time_delta, bucket, format_args,
-            dt_delta, exclude_hours):
+            dt_delta, exclude_hours, listing_cache=None):
         """
         This method will setup the s3 path for the dataset.
 
@@ -141,11 +401,16 @@ class Dataset(BaseDataset):
             bucket (str): bucket name
             format_args (list): list of unique format argument dicts
             dt_delta (dict): either rolling or latest day / hour range
+            listing_cache (s3_utils.S3ListingCache): optional listing cache
 
         Returns:
             final dataset s3 path
         """
         dataset_s3_path_list = []
+        # Share one listing per prefix between all path checks
+        if listing_cache is None:
+            listing_cache = s3_utils.S3ListingCache()
+        checked_paths = set()
         # Apply time delta and modify dt and hour
         dt, hour = general_utils.apply_time_delta(dt, hour, time_delta)
         # Iterate over each path and format accordingly
@@ -156,37 +421,8 @@ class Dataset(BaseDataset):
                     not dt_delta or
                     (dt_delta and dt_delta["delta_type"] == "rolling")
                 ):
-                    # Default input days to 0
-                    input_days = 0
-                    input_weeks = 0
-                    # Setup input hour based on hour variable
-                    if hour == "*":
-                        input_hours = hour
-                    else:
-                        input_hours = 1
-                    # Override values depending on dt_delta
-                    if dt_delta and (dt_delta["delta_type"] == "rolling"):
-                        if "days" in dt_delta:
-                            input_days = dt_delta["days"]
-                        if "hours" in dt_delta:
-                            input_hours = dt_delta["hours"]
-                        if "weeks" in dt_delta:
-                            input_weeks = dt_delta["weeks"]
-                    # Get dt range given assembled arguments
-                    if hour == "*":
-                        dt_range = general_utils.get_dt_range(
-                            dt, days=input_days, hours=input_hours,
-                            weeks=input_weeks)
-                    else:
-                        dt_range = general_utils.get_dt_range(
-                            datetime.datetime(
-                                dt.year, dt.month, dt.day, hour=int(hour)),
-                            days=input_days, hours=input_hours,
-                            weeks=input_weeks)
-                    # Exclude hours
-                    if exclude_hours:
-                        dt_range = general_utils.exclude_hours_from_range(
-                            dt_range, exclude_hours)
+                    dt_range = self._get_dt_range(
+                        dt, hour, dt_delta, exclude_hours)
                     # Assemble list of valid s3 paths
                     for dt_object in dt_range:
                         dt_path = path.format(
@@ -196,22 +432,16 @@ class Dataset(BaseDataset):
                             hour=dt_object.hour,
                             lz_hour=general_utils.leading_zero(dt_object.hour),
                             bucket=bucket, **unique_format_args)
-                        # Only check whether path exists if the bucket matches
-                        # TODO: Update this once bucket asset is setup properly
-                        if bucket in dt_path:
-                            exist_status = s3_utils.check_s3_path(
-                                S3_ACCESS_KEY, S3_SECRET_KEY, dt_path, bucket)
-                        else:
-                            # Assume we are using IAM role to read
-                            exist_status = s3_utils.check_s3_path(
-                                None, None, *s3_utils.parse_url(dt_path))
-                        # Verify whether path exists if bucket matches and is
-                        # new then append
-                        if (
-                            exist_status and
-                            (dt_path not in dataset_s3_path_list)
+                        # Hours of the same day often format to the same path
+                        if dt_path in checked_paths:
+                            continue
+                        checked_paths.add(dt_path)
+                        # Add the path, or the files it matches, if it exists
+                        for resolved_path in self._resolve_s3_path(
+                            dt_path, bucket, listing_cache
                         ):
-                            dataset_s3_path_list.append(dt_path)
+                            if resolved_path not in dataset_s3_path_list:
+                                dataset_s3_path_list.append(resolved_path)
                 # Otherwise, get latest valid path
                 elif dt_delta["delta_type"] == "latest":
                     # Default to one
@@ -231,51 +461,476 @@ class Dataset(BaseDataset):
                             lz_hour=general_utils.leading_zero(hour),
                             bucket=bucket, **unique_format_args)
                         # Only check whether path exists if the bucket matches
-                        exist_status = True
+                        resolved_paths = [dataset_s3_path]
                         if bucket in dataset_s3_path:
-                            exist_status = s3_utils.check_s3_path(
-                                S3_ACCESS_KEY, S3_SECRET_KEY, dataset_s3_path,
-                                bucket)
+                            resolved_paths = self._resolve_s3_path(
+                                dataset_s3_path, bucket, listing_cache)
                         # Set to previous date if the path isn't valid
-                        if exist_status:
+                        if resolved_paths:
                             break
                         i += 1
                     if i == n:
                         logging.error(f"No latest path exists for {dataset_s3_path}\n")
                     else:
-                        dataset_s3_path_list.append(dataset_s3_path)
+                        dataset_s3_path_list += resolved_paths
                 else:
                     logging.error("Invalid dt_delta arguments provided.\n")
 
         return dataset_s3_path_list
 
+    def _setup_partition_path(
+            self, base_path, dt, hour, time_delta, bucket, format_args,
+            dt_delta, exclude_hours, listing_cache=None):
+        """
+        This method will setup the paths and partition filter of a Hive style
+        partitioned dataset. Rather than one path per hour, each base path is
+        read once with a glob over the dates in the window and the hours are
+        left to the partition filter.
+
+        Args:
+            base_path (list): base paths of the partitioned layout
+            dt (datetime.datetime): datetime object
+            hour (int|str): input hour
+            bucket (str): bucket name
+            format_args (list): list of unique format argument dicts
+            dt_delta (dict): either rolling or latest day / hour range
+            listing_cache (s3_utils.S3ListingCache): optional listing cache
+
+        Returns:
+            list of date glob paths and the partition filter
+        """
+        date_column = self.partitioning["date_column"]
+        hour_column = self.partitioning.get("hour_column")
+        date_format = self.partitioning.get("date_format", "%Y-%m-%d")
+        if listing_cache is None:
+            listing_cache = s3_utils.S3ListingCache()
+        # Apply time delta and modify dt and hour
+        dt, hour = general_utils.apply_time_delta(dt, hour, time_delta)
+        base_paths = []
+        for path in base_path:
+            for unique_format_args in format_args:
+                formatted_path = path.format(
+                    bucket=bucket, **unique_format_args).rstrip("/")
+                if "://" not in formatted_path:
+                    formatted_path = "file://" + os.path.abspath(
+                        formatted_path)
+                if formatted_path not in base_paths:
+                    base_paths.append(formatted_path)
+        # Get the hours of each date in the window
+        date_hours = {}
+        if not dt_delta or dt_delta["delta_type"] == "rolling":
+            for dt_object in self._get_dt_range(
+                dt, hour, dt_delta, exclude_hours
+            ):
+                date_hours.setdefault(
+                    dt_object.strftime(date_format), set()).add(
+                        dt_object.hour)
+        # Otherwise, get the latest date with a partition
+        elif dt_delta["delta_type"] == "latest":
+            latest_days = dt_delta.get("days", 1)
+            for day_diff in range(1 + latest_days):
+                date_str = (
+                    dt - datetime.timedelta(days=day_diff)).strftime(
+                        date_format)
+                if any(
+                    self._check_partition_path(
+                        f"{path}/{date_column}={date_str}", bucket,
+                        listing_cache)
+                    for path in base_paths
+                ):
+                    date_hours[date_str] = (
+                        set(range(24)) if hour == "*" else {int(hour)})
+                    break
+            else:
+                logging.error(
+                    f"No latest partition exists for {base_paths}\n")
+        else:
+            logging.error("Invalid dt_delta arguments provided.\n")
+        if not date_hours:
+            return [], None
+        # Glob over the dates so each base path is a single spark path
+        dates = sorted(date_hours)
+        date_glob = (
+            dates[0] if len(dates) == 1 else "{" + ",".join(dates) + "}")
+        paths = [f"{path}/{date_column}={date_glob}" for path in base_paths]
+        # Only filter the hours of dates partially covered by the window
+        full_dates = []
+        conditions = []
+        for date_str in dates:
+            hours = date_hours[date_str]
+            if not hour_column or len(hours) == 24:
+                full_dates.append(date_str)
+            else:
+                conditions.append(
+                    f"({date_column} = '{date_str}' AND {hour_column} IN "
+                    "({}))".format(", ".join(str(i) for i in sorted(hours))))
+        if full_dates:
+            conditions.insert(0, "{} IN ({})".format(
+                date_column, ", ".join(f"'{i}'" for i in full_dates)))
+
+        return paths, " OR ".join(conditions)
+
+    def _check_partition_path(self, path, bucket, listing_cache):
+        """
+        This method will check whether a partition directory exists.
+
+        Args:
+            path (str): s3 or local partition path
+            bucket (str): bucket name
+            listing_cache (s3_utils.S3ListingCache): cache of prefix listings
+
+        Returns:
+            whether the partition exists
+        """
+        if path.startswith("file://"):
+            return os.path.isdir(path[len("file://"):])
+        # Assume we are using IAM role to read from other buckets
+        if bucket in path:
+            args = (S3_ACCESS_KEY, S3_SECRET_KEY, path, bucket)
+        else:
+            args = (None, None, *s3_utils.parse_url(path))
+
+        return s3_utils.check_s3_path(*args, listing_cache=listing_cache)
+
+    def _get_dt_range(self, dt, hour, dt_delta, exclude_hours):
+        """
+        This method will get the hours covered by a rolling time window.
+
+        Args:
+            dt (datetime.datetime): datetime object
+            hour (int|str): input hour
+            dt_delta (dict): rolling day / hour range
+            exclude_hours (list): hours to leave out of the range
+
+        Returns:
+            list of datetimes
+        """
+        # Default input days to 0
+        input_days = 0
+        input_weeks = 0
+        # Setup input hour based on hour variable
+        if hour == "*":
+            input_hours = hour
+        else:
+            input_hours = 1
+        # Override values depending on dt_delta
+        if dt_delta and (dt_delta["delta_type"] == "rolling"):
+            if "days" in dt_delta:
+                input_days = dt_delta["days"]
+            if "hours" in dt_delta:
+                input_hours = dt_delta["hours"]
+            if "weeks" in dt_delta:
+                input_weeks = dt_delta["weeks"]
+        # Get dt range given assembled arguments
+        if hour == "*":
+            dt_range = general_utils.get_dt_range(
+                dt, days=input_days, hours=input_hours,
+                weeks=input_weeks)
+        else:
+            dt_range = general_utils.get_dt_range(
+                datetime.datetime(
+                    dt.year, dt.month, dt.day, hour=int(hour)),
+                days=input_days, hours=input_hours,
+                weeks=input_weeks)
+        # Exclude hours
+        if exclude_hours:
+            dt_range = general_utils.exclude_hours_from_range(
+                dt_range, exclude_hours)
+
+        return dt_range
 
-    def _load_data_from_s3(
-            self, schema, file_format, separator, header, rename={}):
+    def _resolve_s3_path(self, s3_path, bucket, listing_cache):
         """
-        This method will load the dataset into a pyspark DataFrame object
-        and set corresponding meta data.
+        This method will check whether an s3 path exists. With exact_files
+        the path is expanded to the files it matches, so Spark doesn't have
+        to list the globs again.
+
+        Args:
+            s3_path (str): s3 path, possibly containing globs
+            bucket (str): bucket name
+            listing_cache (s3_utils.S3ListingCache): cache of prefix listings
+
+        Returns:
+            list of the existing path or the files it matches
+        """
+        # Assume we are using IAM role to read from other buckets
+        # TODO: Update this once bucket asset is setup properly
+        if bucket in s3_path:
+            args = (S3_ACCESS_KEY, S3_SECRET_KEY, s3_path, bucket)
+        else:
+            args = (None, None, *s3_utils.parse_url(s3_path))
+        if not self.exact_files:
+            if s3_utils.check_s3_path(*args, listing_cache=listing_cache):
+                return [s3_path]
+            return []
+        bucket_name = args[3]
+        root = s3_path[:s3_path.index(bucket_name) + len(bucket_name)] + "/"
+
+        return [
+            root + key for key in s3_utils.glob_s3_path(
+                *args, listing_cache=listing_cache)]
+
+
+    def _load_data_with_spark(
+            self, file_path_list, schema, file_format, separator, header,
+            rename={}, base_path=None, partition_filter=None):
+        """
+        This method will load the dataset's s3 or local files into a pyspark
+        DataFrame object and set corresponding meta data. With a base path
+        spark discovers the partition columns of the directories below it,
+        the partition filter is applied before the columns are renamed.
 
         Returns:
             pyspark DataFrame
         """
         # Explicitely raise exception if no valid files were found
-        if not self.file_path_list:
+        if not file_path_list:
             logging.error("No valid data located.\n")
             raise Exception
+        options = {}
+        if base_path:
+            options["basePath"] = base_path
+        if file_format == "csv":
+            options.update({"sep": separator, "header": header})
+        # Use the registered schema unless one is declared, delta tables
+        # already read their schema from the transaction log
+        registry = _SCHEMA_REGISTRY
+        if registry and (schema or file_format == "delta"):
+            registry = None
+        registered_schema = None
+        if registry:
+            registered_schema = self._get_registered_schema(
+                registry, file_path_list, file_format, options)
         # Otherwise attempt to load data
         if file_format == "csv":
+            # Use the declared schema, otherwise let spark infer it
+            schema_args = {"inferSchema": True}
+            if schema:
+                schema_args = {"schema": spark_utils.create_spark_schema(
+                    schema.keys(), schema.values())}
+            elif registered_schema:
+                schema_args = {"schema": registered_schema}
+            df = self.spark.read.load(
+                file_path_list, format=file_format, **schema_args, **options)
+        elif registered_schema and file_format in ("parquet", "avro"):
             df = self.spark.read.load(
-                self.file_path_list, format=file_format, sep=separator,
-                header=header, schema=spark_utils.create_spark_schema(
-                    schema.keys(), schema.values()))
+                file_path_list, format=file_format, schema=registered_schema,
+                **options)
         elif file_format in ("parquet", "delta", "avro"):
             df = self.spark.read.load(
-                self.file_path_list, format=file_format, mergeSchema=True)
+                file_path_list, format=file_format, mergeSchema=True,
+                **options)
         elif file_format == "json":
-            df = self.spark.read.json(self.file_path_list)
+            df = self.spark.read.options(**options).json(
+                file_path_list, schema=registered_schema)
+        # Register the inferred or merged schema
+        if registry and not registered_schema:
+            registry.register(
+                self.asset_name, self.schema_version, df.schema,
+                file_path_list)
+        if partition_filter:
+            df = df.where(partition_filter)
         # Rename columns if applicable
         if rename:
-            df = spark_utils.rename_cols(self.df, rename)
+            df = spark_utils.rename_cols(df, rename)
+
+        return df
+
+    def _get_registered_schema(
+            self, registry, file_path_list, file_format, options):
+        """
+        This method will get the dataset's registered schema. Drift is
+        detected by reading the schema of a sample of the paths that weren't
+        checked before, any new or retyped column invalidates the registered
+        schema.
+
+        Args:
+            registry (SchemaRegistry): schema registry
+            file_path_list (list): dataset paths
+            file_format (str): file format
+            options (dict): spark reader options
+
+        Returns:
+            pyspark schema or None if it has to be inferred or merged again
+        """
+        registered_schema = registry.get(self.asset_name, self.schema_version)
+        if not registered_schema:
+            return None
+        sample_paths = registry.get_unchecked_paths(
+            self.asset_name, self.schema_version, file_path_list)
+        if not sample_paths:
+            return registered_schema
+        # Without mergeSchema spark only reads a single parquet footer
+        if file_format == "json":
+            sample_schema = self.spark.read.options(**options).json(
+                sample_paths).schema
+        elif file_format == "csv":
+            sample_schema = self.spark.read.load(
+                sample_paths, format=file_format, inferSchema=True,
+                **options).schema
+        else:
+            sample_schema = self.spark.read.load(
+                sample_paths, format=file_format, **options).schema
+        registered_types = {
+            field.name: field.dataType for field in registered_schema}
+        drifted_columns = [
+            field.name for field in sample_schema
+            if field.name not in registered_types or
+            registered_types[field.name] != field.dataType]
+        if drifted_columns:
+            logging.warning(
+                f"Schema drift detected for {self.asset_name} version "
+                f"{self.schema_version} in columns {drifted_columns}\n")
+            return None
+        registry.register(
+            self.asset_name, self.schema_version, registered_schema,
+            sample_paths)
+
+        return registered_schema
+
+
+def prefetch_datasets(datasets, worker_count=8):
+    """
+    This method will discover the s3 files of several datasets in parallel.
+    The datasets share one listing cache and datasets with equal load plans
+    are only resolved once.
+
+    Args:
+        datasets (list): Dataset objects
+        worker_count (int): number of datasets resolved concurrently
+
+    Returns:
+        list of the datasets
+    """
+    listing_cache = s3_utils.S3ListingCache()
+    unique_datasets = {}
+    for dataset in datasets:
+        unique_datasets.setdefault(
+            get_plan_key(dataset), []).append(dataset)
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        list(executor.map(
+            lambda group: group[0].prefetch(listing_cache),
+            unique_datasets.values()))
+    # Share the resolved files with the duplicate datasets
+    for group in unique_datasets.values():
+        for dataset in group[1:]:
+            dataset.file_path_list = list(group[0].file_path_list)
+            dataset.partition_filter = group[0].partition_filter
+            dataset.resolved = True
+
+    return datasets
+
+
+def get_plan_key(dataset, transforms=False):
+    """
+    This method will get a hashable key of a dataset's load plan.
+
+    Args:
+        dataset (Dataset): dataset object
+        transforms (bool): whether to include the renames and timestamp
+            conversions applied to the loaded DataFrame
+
+    Returns:
+        load plan key str
+    """
+    plan = dataset.get_plan()
+    if transforms:
+        plan.update({
+            "rename": dataset.rename,
+            "timestamp_conversion": dataset.timestamp_conversion})
+
+    return repr(sorted(plan.items()))
+
+
+class DataFrameCache(object):
+    """
+    Run level cache of dataset DataFrames. Consumers are registered up front
+    so inputs shared by several queries are read once, persisted, and
+    unpersisted as soon as the last consumer releases them.
+    """
+    def __init__(self, storage_level="MEMORY_AND_DISK"):
+        """
+        Cache constructor.
+
+        Args:
+            storage_level (str): pyspark StorageLevel of shared DataFrames
+        """
+        self.storage_level = getattr(StorageLevel, storage_level)
+        self.lock = threading.Lock()
+        # Loads only wait on concurrent consumers of the same dataset
+        self.key_locks = {}
+        self.ref_counts = {}
+        self.dfs = {}
+
+    def add_consumers(self, datasets):
+        """
+        This method will register a consumer for each of the datasets.
+
+        Args:
+            datasets (list): Dataset objects the run's queries depend on
+        """
+        with self.lock:
+            for dataset in datasets:
+                key = get_plan_key(dataset, transforms=True)
+                self.ref_counts[key] = self.ref_counts.get(key, 0) + 1
+
+    def get_df(self, dataset):
+        """
+        This method will get a dataset's DataFrame, loading it for the first
+        consumer and persisting it if more consumers are registered.
+
+        Args:
+            dataset (Dataset): dataset object
+
+        Returns:
+            pyspark DataFrame
+        """
+        key = get_plan_key(dataset, transforms=True)
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            df = self.dfs.get(key)
+            if df is None:
+                df = dataset.df
+                with self.lock:
+                    if self.ref_counts.get(key, 0) > 1:
+                        df = df.persist(self.storage_level)
+                    self.dfs[key] = df
+        dataset.df = df
 
         return df
+
+    def release(self, dataset):
+        """
+        This method will release a consumer of a dataset and unpersist the
+        DataFrame once it has no consumers left.
+
+        Args:
+            dataset (Dataset): dataset object
+        """
+        key = get_plan_key(dataset, transforms=True)
+        with self.lock:
+            if self.ref_counts.get(key, 0) <= 0:
+                logging.error(
+                    f"Dataset {dataset.asset_name} released more often than "
+                    "consumers were registered.\n")
+                return
+            self.ref_counts[key] -= 1
+            if self.ref_counts[key] == 0:
+                del self.ref_counts[key]
+                self.key_locks.pop(key, None)
+                df = self.dfs.pop(key, None)
+                if df is not None and df.is_cached:
+                    df.unpersist()
+
+    def clear(self):
+        """
+        This method will unpersist all cached DataFrames.
+        """
+        with self.lock:
+            for df in self.dfs.values():
+                if df.is_cached:
+                    df.unpersist()
+            self.dfs = {}
+            self.key_locks = {}
+            self.ref_counts = {}
@@ -74,6 +74,10 @@ class DependencySchema(Schema):
         fields.Nested(dataset.TimestampConversionSchema))
     dt_delta = fields.Nested(dataset.DtDeltaSchema)
     exclude_hours = fields.List(fields.String())
+    exact_files = fields.Boolean()
+    use_pandas = fields.Boolean()
+    partitioning = fields.Nested(dataset.PartitioningSchema)
+    schema_version = fields.String()
 
 
 class DeleteInfoSchema(Schema):
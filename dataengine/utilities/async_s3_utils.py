@@ -0,0 +1,249 @@
+"""
+Asyncio AWS S3 Blob Storage Utility Methods
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from . import s3_utils
+
+
+class AsyncS3Client(object):
+    """
+    Asyncio counterpart of the s3_utils read, write, list, head, copy and
+    delete methods. Blocking boto3 calls run on a dedicated thread pool that
+    shares one client and connection pool, and a semaphore bounds the number
+    of requests in flight, so thousands of operations can be awaited
+    alongside other async I/O. Object bodies are read in chunks so cancelled
+    reads stop at the next chunk and release their connection. The client
+    may be created outside of the event loop it is used in.
+
+    Usage:
+        async with AsyncS3Client(access_key, secret_key) as s3:
+            results = await asyncio.gather(*[
+                s3.read_file(key, bucket_name) for key in keys])
+    """
+    def __init__(
+            self, access_key, secret_key, max_concurrency=64,
+            endpoint_url=None):
+        self.client = s3_utils.get_client(
+            access_key, secret_key, max_pool_connections=max_concurrency,
+            endpoint_url=endpoint_url)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.max_concurrency = max_concurrency
+        # Created in the running loop, older pythons bind it on creation
+        self.semaphore = None
+        self.semaphore_loop = None
+        self.limiter = s3_utils.AdaptiveLimiter(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        This method will shut down the thread pool, cancelling queued calls.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func, *args, **kwargs):
+        """
+        This method will run a blocking call on the thread pool.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs))
+
+    def _get_semaphore(self):
+        """
+        This method will get the request semaphore of the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self.semaphore_loop is not loop:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.semaphore_loop = loop
+
+        return self.semaphore
+
+    async def _call(self, func, *args, **kwargs):
+        """
+        This method will run a blocking call once a request slot is free.
+        """
+        async with self._get_semaphore():
+            return await self._run(func, *args, **kwargs)
+
+    async def head_object(self, s3_prefix, bucket_name):
+        """
+        This method will get the metadata of an s3 object.
+
+        Args:
+            s3_prefix (str): AWS s3 prefix to file
+            bucket_name (str): AWS s3 bucket name
+
+        Returns:
+            head_object response or None if the object doesn't exist
+        """
+        try:
+            return await self._call(
+                self.client.head_object, Bucket=bucket_name, Key=s3_prefix)
+        except ClientError as e:
+            if s3_utils.get_error_code(e) in ("404", "NoSuchKey"):
+                return None
+            raise
+
+    async def read_file(
+            self, s3_prefix, bucket_name,
+            chunk_size=s3_utils.READ_CHUNK_SIZE):
+        """
+        This method will read an s3 object.
+
+        Args:
+            s3_prefix (str): AWS s3 prefix to file
+            bucket_name (str): AWS s3 bucket name
+            chunk_size (int): size in bytes of each body read
+
+        Returns:
+            bytes object
+        """
+        cancelled = threading.Event()
+        async with self._get_semaphore():
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, self._read_object, s3_prefix, bucket_name,
+                chunk_size, cancelled)
+            try:
+                return await asyncio.shield(future)
+            # Stop the read at the next chunk and wait for the worker to
+            # close the body before releasing the request slot
+            except asyncio.CancelledError:
+                cancelled.set()
+                await asyncio.wait([future])
+                raise
+
+    def _read_object(self, s3_prefix, bucket_name, chunk_size, cancelled):
+        """
+        This method will read an object in chunks on a worker thread until
+        it is read completely or the read is cancelled.
+
+        Returns:
+            bytes object or None if the read was cancelled
+        """
+        response = self.client.get_object(Bucket=bucket_name, Key=s3_prefix)
+        body = response["Body"]
+        chunks = []
+        try:
+            while not cancelled.is_set():
+                chunk = body.read(chunk_size)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+        finally:
+            body.close()
+
+        return None
+
+    async def write_bytes(self, s3_prefix, bucket_name, bytes_object):
+        """
+        This method will write a bytes object to s3, large objects are
+        uploaded in multipart upload parts like s3_utils.write_bytes.
+
+        Args:
+            s3_prefix (str): AWS s3 prefix to file
+            bucket_name (str): AWS s3 bucket name
+            bytes_object (bytes|file): object that will be written
+
+        Returns:
+            success boolean
+        """
+        return await self._call(
+            s3_utils._write_bytes, self.client, s3_prefix, bucket_name,
+            bytes_object)
+
+    async def iter_objects(self, s3_prefix, bucket_name):
+        """
+        This method will list the objects under an s3 prefix one page at a
+        time.
+
+        Args:
+            s3_prefix (str): AWS s3 prefix
+            bucket_name (str): AWS s3 bucket name
+
+        Yields:
+            list_objects_v2 object dicts
+        """
+        pages = s3_utils._iter_pages(self.client, bucket_name, s3_prefix)
+        while True:
+            page = await self._call(next, pages, None)
+            if page is None:
+                break
+            for obj in page.get("Contents", []):
+                yield obj
+
+    async def list_objects(self, s3_prefix, bucket_name):
+        """
+        This method will list the objects under an s3 prefix.
+
+        Args:
+            s3_prefix (str): AWS s3 prefix
+            bucket_name (str): AWS s3 bucket name
+
+        Returns:
+            list of list_objects_v2 object dicts
+        """
+        return [obj async for obj in self.iter_objects(s3_prefix, bucket_name)]
+
+    async def copy_object(
+            self, old_prefix, new_prefix, bucket_name,
+            destination_bucket=None, max_retries=5):
+        """
+        This method will copy an s3 object, retrying throttled requests and
+        copying objects over 5 GB in parts.
+
+        Args:
+            old_prefix (str): source s3 key
+            new_prefix (str): destination s3 key
+            bucket_name (str): source bucket name
+            destination_bucket (str): destination bucket, defaults to the
+                source bucket
+            max_retries (int): maximum number of retries
+
+        Returns:
+            dict with the new key, success, number of attempts and error
+        """
+        _, result = await self._call(
+            s3_utils._copy_object_with_retries, self.client, self.limiter,
+            bucket_name, old_prefix, destination_bucket or bucket_name,
+            new_prefix, None, max_retries, s3_utils.MULTIPART_COPY_THRESHOLD,
+            s3_utils.COPY_PART_SIZE)
+
+        return result
+
+    async def delete_objects(self, keys, bucket_name, max_retries=3):
+        """
+        This method will delete s3 objects in concurrent batches of 1000.
+
+        Args:
+            keys (iterable): keys or (key, version id) pairs to delete
+            bucket_name (str): AWS s3 bucket name
+            max_retries (int): maximum number of retries per batch
+
+        Returns:
+            dict with the number of matched and deleted objects and a list
+            of per-key errors
+        """
+        batches = list(s3_utils._iter_batches(
+            keys, s3_utils.DELETE_BATCH_SIZE))
+        results = await asyncio.gather(*[
+            self._call(
+                s3_utils._delete_batch, self.client, bucket_name, batch,
+                max_retries)
+            for batch in batches])
+        report = {
+            "matched": sum(len(batch) for batch in batches), "deleted": 0,
+            "errors": []}
+        for result in results:
+            report["deleted"] += result["deleted"]
+            report["errors"] += result["errors"]
+
+        return report
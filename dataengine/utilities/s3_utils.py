@@ -2,15 +2,45 @@
 AWS S3 Blob Storage Utility Methods
 """
 import io
+import os
+import gzip
+import zlib
+import time
+import math
+import random
+import queue
+import threading
+import tempfile
+import mmap
+import hashlib
 import logging
-from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor
+import itertools
+import struct
+import functools
+import inspect
+import bisect
+import uuid
+from operator import itemgetter
+from collections import OrderedDict
+from urllib.parse import urlparse, unquote_plus
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import re
 import json
+import datetime
 import zipfile
 import yaml
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Setup logging
 logging.basicConfig(
@@ -21,6 +51,480 @@ logging.getLogger("py4j").setLevel(logging.ERROR)
 # https://stackoverflow.com/questions/51272814
 yaml.Dumper.ignore_aliases = lambda *args: True
 
+# Transfer settings for ranged / multipart operations
+DEFAULT_PART_SIZE = 8 * 1024 ** 2
+READ_CHUNK_SIZE = 1024 ** 2
+MULTIPART_THRESHOLD = 64 * 1024 ** 2
+MIN_PART_SIZE = 5 * 1024 ** 2
+MAX_PART_COUNT = 10000
+PARQUET_TAIL_SIZE = 64 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+# Largest object that can be copied with a single request
+MULTIPART_COPY_THRESHOLD = 5 * 1024 ** 3
+COPY_PART_SIZE = 256 * 1024 ** 2
+# Object settings carried over to multipart copies
+MULTIPART_COPY_FIELDS = (
+    "ContentType", "CacheControl", "ContentEncoding", "ContentDisposition",
+    "ContentLanguage", "Expires", "ServerSideEncryption", "SSEKMSKeyId",
+    "BucketKeyEnabled")
+THROTTLING_ERROR_CODES = (
+    "SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded",
+    "TooManyRequestsException", "RequestThrottled", "503")
+NON_RETRYABLE_ERROR_CODES = (
+    "NoSuchKey", "NoSuchBucket", "AccessDenied", "InvalidObjectState",
+    "404", "403")
+DELETE_BATCH_SIZE = 1000
+ZIP64_LIMIT = (1 << 31) - 1
+# Block / readahead settings for seekable S3File reads
+FILE_BLOCK_SIZE = 1024 ** 2
+FILE_MAX_READAHEAD = 16 * 1024 ** 2
+FILE_CACHE_SIZE = 32 * 1024 ** 2
+# Target size of PackedStore segment objects
+SEGMENT_SIZE = 64 * 1024 ** 2
+# Characters that start a glob pattern
+GLOB_PATTERN = re.compile(r"[*?\[{]")
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+# Column chunks closer than this are fetched with a single ranged GET
+RANGE_COALESCE_GAP = 1024 ** 2
+
+
+def get_client(
+        access_key, secret_key, max_pool_connections=None, endpoint_url=None):
+    """
+    This method will create a boto3 s3 client. Clients are thread safe, so
+    a single client should be shared between the workers of a thread pool
+    rather than creating one per task.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        max_pool_connections (int): size of the client connection pool,
+            this should be at least the number of concurrent workers
+        endpoint_url (str): optional s3 compatible endpoint, e.g. a local
+            moto server
+
+    Returns:
+        boto3 s3 client
+    """
+    config = None
+    if max_pool_connections:
+        config = Config(max_pool_connections=max_pool_connections)
+
+    client = boto3.client(
+        's3', aws_access_key_id=access_key, aws_secret_access_key=secret_key,
+        config=config, endpoint_url=endpoint_url)
+    # Instrument the client when metrics are enabled
+    if _METRICS is not None:
+        _METRICS.instrument(client, _get_caller())
+
+    return client
+
+
+def calculate_etag(bytes_object, part_size=None, part_count=None):
+    """
+    This method will calculate the s3 ETag of a bytes-like object. Objects
+    uploaded in a single request have the MD5 of their content as ETag while
+    multipart uploads have the MD5 of the concatenated part MD5s suffixed
+    with the number of parts.
+
+    Args:
+        bytes_object (bytes-like): object content
+        part_size (int): part size used for the upload, if provided and a
+            part count isn't then a multipart ETag is calculated
+        part_count (int): number of parts the object was uploaded with
+
+    Returns:
+        quoted ETag string
+    """
+    view = memoryview(bytes_object)
+    if part_count is None and part_size:
+        part_count = max(1, math.ceil(len(view) / part_size))
+    # Objects written in a single request
+    if not part_count:
+        return '"{}"'.format(hashlib.md5(view).hexdigest())
+    # Multipart objects, every part but the last has the same size
+    if not part_size:
+        part_size = max(1, math.ceil(len(view) / part_count))
+    digests = b"".join(
+        hashlib.md5(view[i * part_size:(i + 1) * part_size]).digest()
+        for i in range(part_count))
+
+    return '"{}-{}"'.format(hashlib.md5(digests).hexdigest(), part_count)
+
+
+def calculate_file_etag(local_filepath, part_size=None, part_count=None):
+    """
+    This method will calculate the s3 ETag of a local file without reading
+    it into memory, see calculate_etag.
+
+    Args:
+        local_filepath (str): local filepath
+        part_size (int): part size used for the upload
+        part_count (int): number of parts the object was uploaded with
+
+    Returns:
+        quoted ETag string
+    """
+    with open(local_filepath, "rb") as local_file:
+        if os.fstat(local_file.fileno()).st_size == 0:
+            return calculate_etag(b"", part_size, part_count)
+        with mmap.mmap(
+            local_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped_file:
+            return calculate_etag(mapped_file, part_size, part_count)
+
+
+def get_part_ranges(size, part_size):
+    """
+    This method will split an object of a given size into byte ranges.
+
+    Args:
+        size (int): total size in bytes
+        part_size (int): size of each part in bytes
+
+    Returns:
+        list of (start, end) tuples where end is exclusive
+    """
+    return [
+        (start, min(start + part_size, size))
+        for start in range(0, size, part_size)]
+
+
+def call_with_retries(func, *args, max_retries=3, base_delay=0.1,
+                      max_delay=20, **kwargs):
+    """
+    This method will call a function and retry it when it raises, sleeping
+    with exponential backoff and full jitter between attempts.
+
+    Args:
+        func (callable): function to call
+        max_retries (int): maximum number of retries after the first attempt
+        base_delay (float): delay in seconds before the first retry
+        max_delay (float): upper bound of the delay in seconds
+
+    Returns:
+        result of the function call
+    """
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            if attempt >= max_retries:
+                raise
+            time.sleep(get_backoff_delay(attempt, base_delay, max_delay))
+            attempt += 1
+
+
+def get_backoff_delay(attempt, base_delay=0.1, max_delay=20):
+    """
+    This method will get an exponential backoff delay with full jitter.
+
+    Args:
+        attempt (int): number of previous retries
+        base_delay (float): delay in seconds before the first retry
+        max_delay (float): upper bound of the delay in seconds
+
+    Returns:
+        delay in seconds
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def get_error_code(exception):
+    """
+    This method will get the s3 error code of an exception.
+
+    Returns:
+        error code string or None for non client errors
+    """
+    if isinstance(exception, ClientError):
+        return str(exception.response.get("Error", {}).get("Code"))
+
+    return None
+
+
+class AdaptiveLimiter(object):
+    """
+    Concurrency limiter that backs off multiplicatively when requests are
+    throttled and recovers additively as requests succeed (AIMD). Used as a
+    context manager around each request.
+    """
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = max_limit
+        self.active = 0
+        self.successes = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+        return self
+
+    def __exit__(self, *args):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def record_success(self):
+        """
+        This method will raise the limit by one after a full window of
+        successful requests.
+        """
+        with self.condition:
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1)
+                self.successes = 0
+                self.condition.notify_all()
+
+    def record_throttle(self):
+        """
+        This method will halve the limit after a throttled request.
+        """
+        with self.condition:
+            self.limit = max(self.min_limit, self.limit / 2)
+            self.successes = 0
+
+
+class S3Metrics(object):
+    """
+    Thread safe in-process metrics of s3 requests. Clients are instrumented
+    with botocore event handlers that record the count, errors, latency
+    histogram, bytes in and out, retries and throttles of every request,
+    broken down by calling s3_utils function, bucket and operation.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def instrument(self, client, caller):
+        """
+        This method will register the metrics event handlers on a client.
+
+        Args:
+            client (botocore.client.S3): s3 client
+            caller (str): name of the function that created the client
+        """
+        events = client.meta.events
+        events.register(
+            "before-parameter-build.s3",
+            functools.partial(self._before_call, caller))
+        events.register("needs-retry.s3", self._needs_retry)
+        events.register("after-call.s3", self._after_call)
+        events.register("after-call-error.s3", self._after_call_error)
+
+    def snapshot(self):
+        """
+        This method will get the current metrics.
+
+        Returns:
+            list of metric dicts, one per caller, bucket and operation
+        """
+        with self.lock:
+            return [
+                dict(
+                    caller=caller, bucket=bucket, operation=operation,
+                    **dict(values, latency_buckets=dict(
+                        values["latency_buckets"])))
+                for (caller, bucket, operation), values in sorted(
+                    self.metrics.items())]
+
+    def reset(self):
+        """
+        This method will clear the recorded metrics.
+        """
+        with self.lock:
+            self.metrics = {}
+
+    def record(
+            self, caller, bucket, operation, latency, bytes_in=0,
+            bytes_out=0, retries=0, error=False):
+        """
+        This method will record a completed request.
+        """
+        with self.lock:
+            values = self._get_values(caller, bucket, operation)
+            values["count"] += 1
+            values["errors"] += int(error)
+            values["retries"] += retries
+            values["bytes_in"] += bytes_in
+            values["bytes_out"] += bytes_out
+            values["latency_total"] += latency
+            values["latency_max"] = max(values["latency_max"], latency)
+            bucket_bound = LATENCY_BUCKETS[
+                bisect.bisect_left(LATENCY_BUCKETS, latency)]
+            values["latency_buckets"][bucket_bound] += 1
+
+    def _get_values(self, caller, bucket, operation):
+        """
+        This method will get the metric values of a caller, bucket and
+        operation, the lock must be held.
+        """
+        key = (caller, bucket, operation)
+        if key not in self.metrics:
+            self.metrics[key] = {
+                "count": 0, "errors": 0, "retries": 0, "throttles": 0,
+                "bytes_in": 0, "bytes_out": 0, "latency_total": 0.0,
+                "latency_max": 0.0,
+                "latency_buckets": {bound: 0 for bound in LATENCY_BUCKETS}}
+
+        return self.metrics[key]
+
+    def _before_call(self, caller, params, model, context, **kwargs):
+        context["metrics"] = {
+            "caller": caller, "bucket": params.get("Bucket"),
+            "operation": model.name, "start": time.monotonic(),
+            "bytes_out": _get_size(params.get("Body", b"")) or 0}
+
+    def _needs_retry(self, response, request_dict, **kwargs):
+        # Count throttled attempts, the retry handler decides on retries
+        if response is None:
+            return
+        context = request_dict.get("context", {}).get("metrics")
+        code = response[1].get("Error", {}).get("Code")
+        if context is not None and code in THROTTLING_ERROR_CODES:
+            with self.lock:
+                self._get_values(
+                    context["caller"], context["bucket"],
+                    context["operation"])["throttles"] += 1
+
+    def _after_call(self, http_response, parsed, context, **kwargs):
+        context = context.get("metrics")
+        if context is None:
+            return
+        bytes_in = 0
+        if context["operation"] != "HeadObject":
+            bytes_in = int(http_response.headers.get("content-length", 0))
+        self.record(
+            context["caller"], context["bucket"], context["operation"],
+            time.monotonic() - context["start"], bytes_in,
+            context["bytes_out"],
+            parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+            http_response.status_code >= 300)
+
+    def _after_call_error(self, context, **kwargs):
+        context = context.get("metrics")
+        if context is not None:
+            self.record(
+                context["caller"], context["bucket"], context["operation"],
+                time.monotonic() - context["start"],
+                bytes_out=context["bytes_out"], error=True)
+
+
+class MetricsExporter(object):
+    """
+    Background thread that periodically passes a metrics snapshot to an
+    export function, e.g. one that logs it or submits it to DataDog.
+    """
+    def __init__(self, metrics, export, interval=60):
+        self.metrics = metrics
+        self.export = export
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        This method will stop the exporter after a final export.
+        """
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self._export()
+        self._export()
+
+    def _export(self):
+        try:
+            self.export(self.metrics.snapshot())
+        except Exception:
+            logging.error("Exporting s3 metrics failed.", exc_info=True)
+
+
+_METRICS = None
+_METRICS_EXPORTER = None
+
+
+def enable_metrics(export=None, interval=60):
+    """
+    This method will enable metrics for s3 clients created from now on.
+
+    Args:
+        export (callable): optional function that is periodically passed a
+            metrics snapshot
+        interval (float): seconds between exports
+
+    Returns:
+        S3Metrics object
+    """
+    global _METRICS, _METRICS_EXPORTER
+    disable_metrics()
+    _METRICS = S3Metrics()
+    if export is not None:
+        _METRICS_EXPORTER = MetricsExporter(_METRICS, export, interval)
+
+    return _METRICS
+
+
+def disable_metrics():
+    """
+    This method will disable metrics for new clients and stop the exporter.
+    """
+    global _METRICS, _METRICS_EXPORTER
+    if _METRICS_EXPORTER is not None:
+        _METRICS_EXPORTER.stop()
+    _METRICS = None
+    _METRICS_EXPORTER = None
+
+
+def get_metrics_snapshot():
+    """
+    This method will get the current s3 metrics.
+
+    Returns:
+        list of metric dicts, empty when metrics are disabled
+    """
+    return _METRICS.snapshot() if _METRICS is not None else []
+
+
+def _get_caller():
+    """
+    This method will get the name of the outermost public s3_utils function
+    on the stack, or of the external function that created a client.
+
+    Returns:
+        caller name
+    """
+    caller = None
+    frame = inspect.currentframe().f_back
+    while frame is not None:
+        code = frame.f_code
+        name = getattr(code, "co_qualname", code.co_name)
+        # Constructors are named after their class
+        if code.co_name == "__init__":
+            name = name.rsplit(".", 1)[0]
+        if frame.f_globals.get("__name__") == __name__:
+            if not name.startswith("_") and name != "get_client":
+                caller = name
+        elif caller is None:
+            module = frame.f_globals.get("__name__", "").rsplit(".", 1)[-1]
+            return f"{module}.{name}"
+        else:
+            break
+        frame = frame.f_back
+
+    return caller
+
 
 def is_valid_s3_url(s3_url):
     """
@@ -58,7 +562,232 @@ def parse_url(s3_url):
     return parse_result.path[1:], parse_result.netloc
 
 
-def read_file(access_key, secret_key, s3_prefix, bucket_name):
+class S3Cache(object):
+    """
+    Local read-through disk cache for s3 objects. Entries are keyed by
+    bucket, key and ETag and are validated with a head_object request, or
+    trusted for ttl seconds after they were last validated. Files are
+    written to a temporary file and atomically renamed into place, so
+    several processes can safely share a cache directory. The least recently
+    used entries are evicted once the cache grows beyond max_size bytes,
+    objects larger than max_size are read without being cached.
+    """
+    def __init__(self, cache_dir, max_size=10 * 1024 ** 3, ttl=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.ttl = ttl
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_dir = os.path.join(cache_dir, "index")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def read(self, client, bucket_name, s3_prefix):
+        """
+        This method will read an object through the cache.
+
+        Returns:
+            bytes object
+        """
+        path = self.get_path(client, bucket_name, s3_prefix)
+        if path is None:
+            return client.get_object(
+                Bucket=bucket_name, Key=s3_prefix)["Body"].read()
+        try:
+            with open(path, "rb") as cached_file:
+                return cached_file.read()
+        # Another process may have evicted the entry in the meantime
+        except FileNotFoundError:
+            path = self.get_path(
+                client, bucket_name, s3_prefix, validate=True)
+            with open(path, "rb") as cached_file:
+                return cached_file.read()
+
+    def get_path(self, client, bucket_name, s3_prefix, validate=False):
+        """
+        This method will get the local path of a cached object, downloading
+        it if the cache doesn't hold its current version.
+
+        Args:
+            client (botocore.client.S3): s3 client
+            bucket_name (str): AWS s3 bucket name
+            s3_prefix (str): AWS s3 prefix to file
+            validate (bool): whether to validate the entry even within ttl
+
+        Returns:
+            local filepath, or None if the object is too large to cache
+        """
+        index_path = os.path.join(
+            self.index_dir, _hash_key(bucket_name, s3_prefix) + ".json")
+        # Trust entries that were validated within the ttl
+        if self.ttl is not None and not validate:
+            try:
+                with open(index_path, "r") as f:
+                    entry = json.load(f)
+                path = self._get_object_path(
+                    bucket_name, s3_prefix, entry["etag"])
+                if time.time() - entry["validated"] < self.ttl and (
+                    self._touch(path)
+                ):
+                    return path
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+        head = client.head_object(Bucket=bucket_name, Key=s3_prefix)
+        if head["ContentLength"] > self.max_size:
+            return None
+        path = self._get_object_path(bucket_name, s3_prefix, head["ETag"])
+        if not self._touch(path):
+            self._download(client, bucket_name, s3_prefix, head, path)
+            self.evict(keep=path)
+        if self.ttl is not None:
+            _write_atomic(index_path, json.dumps(
+                {"etag": head["ETag"], "validated": time.time()}).encode())
+
+        return path
+
+    def evict(self, keep=None):
+        """
+        This method will remove the least recently used entries until the
+        cache is no larger than its maximum size.
+
+        Args:
+            keep (str): path of an entry that is about to be read and must
+                not be evicted
+        """
+        entries = []
+        for entry in os.scandir(self.objects_dir):
+            # Skip in-progress downloads and the entry being served
+            if entry.name.startswith(".") or entry.path == keep:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        if keep is not None:
+            try:
+                total_size += os.path.getsize(keep)
+            except FileNotFoundError:
+                pass
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        """
+        This method will remove every cached object.
+        """
+        for directory in (self.objects_dir, self.index_dir):
+            for entry in os.scandir(directory):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def _get_object_path(self, bucket_name, s3_prefix, etag):
+        return os.path.join(
+            self.objects_dir, _hash_key(bucket_name, s3_prefix, etag))
+
+    def _touch(self, path):
+        """
+        This method will mark an entry as recently used.
+
+        Returns:
+            boolean for whether the entry exists
+        """
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _download(self, client, bucket_name, s3_prefix, head, path):
+        """
+        This method will download an object into the cache.
+        """
+        _download_atomic(client, bucket_name, s3_prefix, head, path)
+
+
+_DEFAULT_CACHE = None
+
+
+def enable_cache(cache_dir, max_size=10 * 1024 ** 3, ttl=None):
+    """
+    This method will enable a default S3Cache for read_file and read_df.
+
+    Args:
+        cache_dir (str): local cache directory
+        max_size (int): maximum cache size in bytes
+        ttl (float): seconds an entry is trusted without a head_object
+
+    Returns:
+        S3Cache object
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = S3Cache(cache_dir, max_size, ttl)
+
+    return _DEFAULT_CACHE
+
+
+def disable_cache():
+    """
+    This method will disable the default S3Cache.
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = None
+
+
+def _hash_key(*parts):
+    """
+    This method will hash cache key parts into a file name.
+    """
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def _download_atomic(
+        client, bucket_name, s3_prefix, head, path,
+        part_size=DEFAULT_PART_SIZE, worker_count=8):
+    """
+    This method will download an object to a temporary file next to the
+    target path and atomically move it into place.
+
+    Args:
+        head (dict): ContentLength and ETag of the object
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.truncate(head["ContentLength"])
+        _download_ranges(
+            client, bucket_name, s3_prefix, head, tmp_path, part_size,
+            worker_count)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_atomic(path, bytes_object):
+    """
+    This method will write a file through a temporary file and a rename so
+    readers never see a partial file.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=".")
+    with os.fdopen(fd, "wb") as f:
+        f.write(bytes_object)
+    os.replace(tmp_path, path)
+
+
+def read_file(
+        access_key, secret_key, s3_prefix, bucket_name, parallel=False,
+        part_size=DEFAULT_PART_SIZE, worker_count=8, verify=True, cache=None):
     """
         This method will read files from s3 using a boto3 client.
 
@@ -67,203 +796,2622 @@ def read_file(access_key, secret_key, s3_prefix, bucket_name):
             secret_key (str): AWS s3 Secret Key
             s3_prefix (str): AWS s3 prefix to file
             bucket_name (str): AWS s3 bucket name
+            parallel (bool): whether to download the object with concurrent
+                ranged GETs into a preallocated buffer, objects no larger
+                than a single part are still read in one request
+            part_size (int): size in bytes of each ranged GET
+            worker_count (int): number of concurrent ranged GETs
+            verify (bool): whether to verify the size and ETag of a parallel
+                download
+            cache (S3Cache): read through this cache, defaults to the cache
+                set with enable_cache if any
 
         Returns:
-            bytes object
+            bytes object, parallel downloads return the preallocated
+            bytearray to avoid copying it
     """
-    client = boto3.client(
-        's3', aws_access_key_id=access_key, aws_secret_access_key=secret_key)
+    client = get_client(
+        access_key, secret_key,
+        max_pool_connections=worker_count if parallel else None)
+    cache = cache or _DEFAULT_CACHE
+    if cache is not None:
+        return cache.read(client, bucket_name, s3_prefix)
+    if parallel:
+        head = client.head_object(Bucket=bucket_name, Key=s3_prefix)
+        if head["ContentLength"] > part_size:
+            buffer = bytearray(head["ContentLength"])
+            _download_ranges(
+                client, bucket_name, s3_prefix, head, memoryview(buffer),
+                part_size, worker_count)
+            if verify:
+                _verify_download(client, bucket_name, s3_prefix, head, buffer)
+            return buffer
     file = client.get_object(Bucket=bucket_name, Key=s3_prefix)
 
     return file['Body'].read()
 
 
-def read_df(access_key, secret_key, s3_prefix, bucket_name, **kwargs):
-    """
-        This method will read in data from s3 into a pandas DataFrame.
-        TODO: Add support for parquet
+def download_file(
+        access_key, secret_key, s3_prefix, bucket_name, local_filepath,
+        part_size=DEFAULT_PART_SIZE, worker_count=8, verify=True):
+    """
+    This method will download an s3 object to a local file with concurrent
+    ranged GETs. Each part is streamed straight to its offset within the
+    file so the object is never held in memory.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_prefix (str): AWS s3 prefix to file
+        bucket_name (str): AWS s3 bucket name
+        local_filepath (str): local filepath
+        part_size (int): size in bytes of each ranged GET
+        worker_count (int): number of concurrent ranged GETs
+        verify (bool): whether to verify the size and ETag of the download
+
+    Returns:
+        number of bytes written
+    """
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    head = client.head_object(Bucket=bucket_name, Key=s3_prefix)
+    size = head["ContentLength"]
+    # Preallocate the file so every worker can write at its own offset
+    with open(local_filepath, "wb") as local_file:
+        local_file.truncate(size)
+    _download_ranges(
+        client, bucket_name, s3_prefix, head, local_filepath, part_size,
+        worker_count)
+    if verify:
+        with open(local_filepath, "rb") as local_file:
+            # Map the file rather than reading it back into memory
+            if size:
+                with mmap.mmap(
+                    local_file.fileno(), 0, access=mmap.ACCESS_READ
+                ) as mapped_file:
+                    _verify_download(
+                        client, bucket_name, s3_prefix, head, mapped_file)
+
+    return size
+
+
+def _download_range(client, bucket_name, s3_prefix, etag, target, start, end):
+    """
+    This method will download a single byte range of an object into either a
+    memoryview or a local file at the range offset. The request is pinned to
+    the ETag so a concurrent overwrite can't produce a mixed download.
+
+    Returns:
+        number of bytes written
+    """
+    response = client.get_object(
+        Bucket=bucket_name, Key=s3_prefix, IfMatch=etag,
+        Range=f"bytes={start}-{end - 1}")
+    offset = start
+    if isinstance(target, memoryview):
+        for chunk in response["Body"].iter_chunks(READ_CHUNK_SIZE):
+            target[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+    else:
+        with open(target, "r+b") as local_file:
+            local_file.seek(start)
+            for chunk in response["Body"].iter_chunks(READ_CHUNK_SIZE):
+                local_file.write(chunk)
+                offset += len(chunk)
+    if offset != end:
+        raise IOError(
+            f"Ranged GET of s3://{bucket_name}/{s3_prefix} returned "
+            f"{offset - start} bytes, expected {end - start}")
+
+    return offset - start
+
+
+def _download_ranges(
+        client, bucket_name, s3_prefix, head, target, part_size,
+        worker_count):
+    """
+    This method will download every part of an object on a thread pool.
+    """
+    ranges = get_part_ranges(head["ContentLength"], part_size)
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        futures = [
+            executor.submit(
+                _download_range, client, bucket_name, s3_prefix,
+                head["ETag"], target, start, end)
+            for start, end in ranges]
+        total = sum(future.result() for future in futures)
+    if total != head["ContentLength"]:
+        raise IOError(
+            f"Downloaded {total} bytes of s3://{bucket_name}/{s3_prefix}, "
+            f"expected {head['ContentLength']}")
+
+
+def _verify_download(client, bucket_name, s3_prefix, head, bytes_object):
+    """
+    This method will verify a downloaded object against its ETag. KMS
+    encrypted objects don't have an MD5 based ETag so only their size is
+    checked.
+    """
+    if len(bytes_object) != head["ContentLength"]:
+        raise IOError(
+            f"Size mismatch for s3://{bucket_name}/{s3_prefix}: "
+            f"{len(bytes_object)} != {head['ContentLength']}")
+    if head.get("ServerSideEncryption") == "aws:kms":
+        return
+    etag = head["ETag"]
+    part_size = None
+    part_count = None
+    if "-" in etag:
+        # The size of the first part gives the part size of the upload
+        part_count = int(etag.strip('"').split("-")[1])
+        part_size = client.head_object(
+            Bucket=bucket_name, Key=s3_prefix, PartNumber=1
+        )["ContentLength"]
+    local_etag = calculate_etag(bytes_object, part_size, part_count)
+    if local_etag != etag:
+        raise IOError(
+            f"ETag mismatch for s3://{bucket_name}/{s3_prefix}: "
+            f"{local_etag} != {etag}")
+
+
+def read_df(
+        access_key, secret_key, s3_prefix, bucket_name, file_format="csv",
+        engine=None, dtype=None, usecols=None, cache=None, **kwargs):
+    """
+        This method will read in data from s3 into a pandas DataFrame. The
+        streaming response body is handed straight to the parser so the
+        object is never materialized as bytes or a decoded string.
+
+        Args:
+            access_key (str): AWS s3 Access Key
+            secret_key (str): AWS s3 Secret Key
+            s3_prefix (str): AWS s3 prefix to file
+            bucket_name (str): AWS s3 bucket name
+            file_format (str): either csv or parquet, parquet files are read
+                with read_parquet using usecols as the column projection
+            engine (str): pandas csv parser engine, "pyarrow" parses with
+                multiple threads and has the lowest peak memory
+            dtype (dict): column types, avoids type inference
+            usecols (list): subset of columns to parse
+            cache (S3Cache): parse the csv from this cache, defaults to the
+                cache set with enable_cache if any
+
+        Returns:
+            pandas DataFrame
+    """
+    if file_format == "parquet":
+        return read_parquet(
+            access_key, secret_key, s3_prefix, bucket_name, columns=usecols,
+            **kwargs)
+    client = get_client(access_key, secret_key)
+    # Only pass parser hints that were provided
+    parser_args = {
+        key: value for key, value in (
+            ("engine", engine), ("dtype", dtype), ("usecols", usecols))
+        if value is not None}
+    cache = cache or _DEFAULT_CACHE
+    path = None
+    if cache is not None:
+        path = cache.get_path(client, bucket_name, s3_prefix)
+    if path is not None:
+        return pd.read_csv(path, **parser_args, **kwargs)
+    response = client.get_object(Bucket=bucket_name, Key=s3_prefix)
+    with response["Body"] as body:
+        return pd.read_csv(
+            body,
+            # Pass additional keyword arguments to pandas read_csv method
+            **parser_args, **kwargs)
+
+
+def iter_df(
+        access_key, secret_key, s3_prefix, bucket_name, chunksize=100000,
+        compression="infer", **kwargs):
+    """
+    This method will stream a csv object from s3 and yield it as pandas
+    DataFrame chunks, so memory stays bounded by the chunk size no matter
+    how large the object is. Compressed objects are decompressed on the fly.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_prefix (str): AWS s3 prefix to file
+        bucket_name (str): AWS s3 bucket name
+        chunksize (int): number of rows per DataFrame
+        compression (str): "gzip", "zstd", None or "infer" to detect it from
+            the key suffix, content encoding or magic bytes
+        kwargs: additional pandas read_csv arguments
+
+    Yields:
+        pandas DataFrame chunks
+    """
+    client = get_client(access_key, secret_key)
+    response = client.get_object(Bucket=bucket_name, Key=s3_prefix)
+    with open_stream(response, s3_prefix, compression) as stream:
+        with pd.read_csv(stream, chunksize=chunksize, **kwargs) as reader:
+            yield from reader
+
+
+def open_stream(response, s3_prefix="", compression="infer"):
+    """
+    This method will wrap a get_object response body in a buffered file
+    object, transparently decompressing gzip or zstd content.
+
+    Args:
+        response (dict): get_object response
+        s3_prefix (str): AWS s3 prefix to file, used to infer compression
+        compression (str): "gzip", "zstd", None or "infer"
+
+    Returns:
+        readable file object
+    """
+    stream = io.BufferedReader(
+        _StreamingBodyReader(response["Body"]), READ_CHUNK_SIZE)
+    if compression == "infer":
+        compression = _infer_compression(
+            s3_prefix, response.get("ContentEncoding"), stream.peek(4)[:4])
+    if compression == "gzip":
+        return _GzipStreamReader(fileobj=stream, mode="rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError(
+                "The zstandard package is required to read zstd objects.")
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(
+                stream, read_size=READ_CHUNK_SIZE, closefd=True),
+            READ_CHUNK_SIZE)
+    if compression is not None:
+        raise ValueError(f"Unsupported compression '{compression}'.")
+
+    return stream
+
+
+def _infer_compression(s3_prefix, content_encoding, magic):
+    """
+    This method will infer the compression of an object.
+
+    Returns:
+        "gzip", "zstd" or None
+    """
+    if (
+        s3_prefix.endswith((".gz", ".gzip")) or
+        content_encoding == "gzip" or magic.startswith(GZIP_MAGIC)
+    ):
+        return "gzip"
+    if (
+        s3_prefix.endswith((".zst", ".zstd")) or
+        content_encoding == "zstd" or magic == ZSTD_MAGIC
+    ):
+        return "zstd"
+
+    return None
+
+
+class _StreamingBodyReader(io.RawIOBase):
+    """
+    Raw file object over a botocore StreamingBody so it can be buffered.
+    """
+    def __init__(self, body):
+        self.body = body
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.body.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self.body.close()
+        super().close()
+
+
+class _GzipStreamReader(gzip.GzipFile):
+    """
+    Gzip file object that also closes the stream it decompresses, so the
+    response body and its connection are released.
+    """
+    def close(self):
+        stream = self.fileobj
+        try:
+            super().close()
+        finally:
+            if stream is not None:
+                stream.close()
+
+
+def read_parquet(
+        access_key, secret_key, s3_prefix, bucket_name, columns=None,
+        filters=None, as_arrow=False, worker_count=8):
+    """
+    This method will read a parquet file from s3 while transferring as few
+    bytes as possible. The footer is fetched with a suffix ranged GET, row
+    groups whose min / max statistics can't satisfy the filters are skipped
+    and only the column chunks of the projected columns are downloaded,
+    concurrently, before being decoded by pyarrow.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_prefix (str): AWS s3 prefix to file
+        bucket_name (str): AWS s3 bucket name
+        columns (list): top level columns to read, defaults to all
+        filters (list): filters in disjunctive normal form like pyarrow,
+            either a list of (column, op, value) tuples that are combined
+            with AND or a list of such lists that are combined with OR
+        as_arrow (bool): whether to return a pyarrow Table
+        worker_count (int): number of concurrent ranged GETs
+
+    Returns:
+        pandas DataFrame or pyarrow Table
+    """
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    metadata, size, tail_start, tail = read_parquet_metadata(
+        client, bucket_name, s3_prefix)
+    filters = _normalize_filters(filters)
+    # Filter columns have to be read to apply the filters to the rows
+    read_columns = None
+    if columns is not None:
+        read_columns = list(dict.fromkeys(list(columns) + [
+            column for conjunction in filters
+            for column, _, _ in conjunction]))
+    # Prune row groups using their column statistics
+    row_groups = [
+        i for i in range(metadata.num_row_groups)
+        if statistics_may_match(
+            get_row_group_statistics(metadata.row_group(i)), filters)]
+    # Fetch the byte ranges of the projected column chunks in parallel
+    ranges = _coalesce_ranges([
+        chunk_range for i in row_groups
+        for chunk_range in _get_column_chunk_ranges(
+            metadata.row_group(i), read_columns)])
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        chunks = list(executor.map(
+            lambda byte_range: _read_range(
+                client, bucket_name, s3_prefix, *byte_range),
+            ranges))
+    logging.debug(
+        f"Read {sum(len(chunk) for chunk in chunks) + len(tail)} of {size} "
+        f"bytes from s3://{bucket_name}/{s3_prefix}")
+    prefetched = dict(zip([start for start, _ in ranges], chunks))
+    prefetched[tail_start] = tail
+    range_file = _RangeFile(
+        client, bucket_name, s3_prefix, size, prefetched)
+    parquet_file = pq.ParquetFile(range_file, metadata=metadata)
+    if row_groups:
+        table = parquet_file.read_row_groups(row_groups, columns=read_columns)
+    else:
+        table = parquet_file.schema_arrow.empty_table()
+        if read_columns is not None:
+            table = table.select(read_columns)
+    # Apply the filters to the remaining rows
+    if filters:
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(list(columns))
+
+    return table if as_arrow else table.to_pandas()
+
+
+def read_parquet_metadata(client, bucket_name, s3_prefix):
+    """
+    This method will read the footer of a parquet file on s3. A suffix
+    ranged GET of the file tail usually contains the whole footer, larger
+    footers take one additional request.
+
+    Args:
+        client (botocore.client.S3): s3 client
+        bucket_name (str): AWS s3 bucket name
+        s3_prefix (str): AWS s3 prefix to file
+
+    Returns:
+        parquet FileMetaData, file size, tail offset and tail bytes
+    """
+    response = client.get_object(
+        Bucket=bucket_name, Key=s3_prefix,
+        Range=f"bytes=-{PARQUET_TAIL_SIZE}")
+    tail = response["Body"].read()
+    # Content range has the form "bytes start-end/size"
+    size = int(response.get(
+        "ContentRange", f"/{len(tail)}").split("/")[-1])
+    if tail[-4:] != b"PAR1":
+        raise IOError(f"s3://{bucket_name}/{s3_prefix} is not a parquet file")
+    footer_size = int.from_bytes(tail[-8:-4], "little") + 8
+    if footer_size > len(tail):
+        tail = _read_range(
+            client, bucket_name, s3_prefix, size - footer_size,
+            size - len(tail)) + tail
+    metadata = pq.read_metadata(pa.BufferReader(tail[-footer_size:]))
+
+    return metadata, size, size - len(tail), tail
+
+
+def get_row_group_statistics(row_group):
+    """
+    This method will get the min / max statistics of every top level
+    column of a parquet row group.
+
+    Args:
+        row_group (pyarrow.parquet.RowGroupMetaData): row group metadata
+
+    Returns:
+        dict of column name to (min, max), None if statistics are missing
+    """
+    statistics = {}
+    for i in range(row_group.num_columns):
+        column = row_group.column(i)
+        # Only flat columns have statistics that can be compared
+        if "." in column.path_in_schema:
+            continue
+        stats = column.statistics
+        if stats is not None and stats.has_min_max:
+            statistics[column.path_in_schema] = (stats.min, stats.max)
+        else:
+            statistics[column.path_in_schema] = None
+
+    return statistics
+
+
+def statistics_may_match(statistics, filters):
+    """
+    This method will check whether rows with the given column statistics
+    could satisfy filters in disjunctive normal form. Comparisons that can't
+    be evaluated are assumed to match.
+
+    Args:
+        statistics (dict): column name to (min, max)
+        filters (list): normalized list of lists of (column, op, value)
+
+    Returns:
+        boolean for whether any row may match
+    """
+    if not filters:
+        return True
+
+    return any(
+        all(_predicate_may_match(statistics.get(column), op, value)
+            for column, op, value in conjunction)
+        for conjunction in filters)
+
+
+def _predicate_may_match(min_max, op, value):
+    """
+    This method will check whether a value range may satisfy a predicate.
+    """
+    if min_max is None:
+        return True
+    minimum, maximum = min_max
+    try:
+        if op in ("=", "=="):
+            return minimum <= value <= maximum
+        if op == "!=":
+            return not (minimum == maximum == value)
+        if op == "<":
+            return minimum < value
+        if op == "<=":
+            return minimum <= value
+        if op == ">":
+            return maximum > value
+        if op == ">=":
+            return maximum >= value
+        if op == "in":
+            return any(minimum <= item <= maximum for item in value)
+        if op == "not in":
+            return not (minimum == maximum and minimum in value)
+    except TypeError:
+        return True
+
+    return True
+
+
+def _normalize_filters(filters):
+    """
+    This method will convert filters to a list of lists of predicates.
+    """
+    if not filters:
+        return []
+    if isinstance(filters[0], tuple):
+        return [list(filters)]
+
+    return [list(conjunction) for conjunction in filters]
+
+
+def _get_column_chunk_ranges(row_group, columns=None):
+    """
+    This method will get the byte ranges of the column chunks of a row group,
+    optionally limited to a set of top level columns.
+
+    Returns:
+        list of (start, end) tuples where end is exclusive
+    """
+    ranges = []
+    for i in range(row_group.num_columns):
+        column = row_group.column(i)
+        if (
+            columns is not None and
+            column.path_in_schema.split(".")[0] not in columns
+        ):
+            continue
+        # The dictionary page precedes the data pages when there is one
+        start = column.data_page_offset
+        if column.has_dictionary_page and column.dictionary_page_offset:
+            start = min(start, column.dictionary_page_offset)
+        ranges.append((start, start + column.total_compressed_size))
+
+    return ranges
+
+
+def _coalesce_ranges(ranges, max_gap=RANGE_COALESCE_GAP,
+                     max_size=DEFAULT_PART_SIZE * 4):
+    """
+    This method will merge nearby byte ranges to reduce the number of GET
+    requests without making any single request too large.
+
+    Returns:
+        sorted list of (start, end) tuples where end is exclusive
+    """
+    coalesced = []
+    for start, end in sorted(ranges):
+        if (
+            coalesced and
+            start - coalesced[-1][1] <= max_gap and
+            end - coalesced[-1][0] <= max_size
+        ):
+            coalesced[-1] = (coalesced[-1][0], max(end, coalesced[-1][1]))
+        else:
+            coalesced.append((start, end))
+
+    return coalesced
+
+
+def _read_range(client, bucket_name, s3_prefix, start, end):
+    """
+    This method will read a byte range of an s3 object.
+
+    Returns:
+        bytes object
+    """
+    response = client.get_object(
+        Bucket=bucket_name, Key=s3_prefix, Range=f"bytes={start}-{end - 1}")
+
+    return response["Body"].read()
+
+
+class _RangeFile(io.RawIOBase):
+    """
+    Read-only file object over a set of prefetched byte ranges of an s3
+    object. Reads outside the prefetched ranges fall back to a ranged GET.
+    """
+    def __init__(self, client, bucket_name, s3_prefix, size, ranges):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.s3_prefix = s3_prefix
+        self.size = size
+        self.ranges = sorted(ranges.items())
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        end = min(self.position + len(view), self.size)
+        if end <= self.position:
+            return 0
+        data = None
+        for start, chunk in self.ranges:
+            if start <= self.position and end <= start + len(chunk):
+                data = chunk[self.position - start:end - start]
+                break
+        if data is None:
+            data = _read_range(
+                self.client, self.bucket_name, self.s3_prefix, self.position,
+                end)
+        view[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+class S3File(io.RawIOBase):
+    """
+    Seekable read-only file object over an s3 object. Data is fetched with
+    ranged GETs in fixed size blocks which are kept in a small LRU block
+    cache. Sequential reads double the readahead up to max_readahead while
+    random reads reset it to a single block, so libraries such as pyarrow,
+    zipfile, tarfile and pandas only download the parts of an object they
+    actually read. Reads are pinned to the ETag the file was opened with.
+    """
+    def __init__(
+            self, access_key, secret_key, s3_prefix, bucket_name,
+            block_size=FILE_BLOCK_SIZE, max_readahead=FILE_MAX_READAHEAD,
+            cache_size=FILE_CACHE_SIZE):
+        self.client = get_client(access_key, secret_key)
+        self.bucket_name = bucket_name
+        self.s3_prefix = s3_prefix
+        self.name = f"s3://{bucket_name}/{s3_prefix}"
+        head = self.client.head_object(Bucket=bucket_name, Key=s3_prefix)
+        self.size = head["ContentLength"]
+        self.etag = head["ETag"]
+        self.block_size = block_size
+        self.max_readahead = max(max_readahead, block_size)
+        # The cache must hold at least one full readahead
+        self.cache_size = max(cache_size, self.max_readahead)
+        self.readahead = block_size
+        self.blocks = OrderedDict()
+        self.position = 0
+        self.last_end = None
+        self.request_count = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast("B")
+        start = self.position
+        end = min(start + len(view), self.size)
+        if end <= start:
+            return 0
+        # Grow the readahead on sequential reads, reset it on random ones
+        if start == self.last_end:
+            self.readahead = min(self.readahead * 2, self.max_readahead)
+        else:
+            self.readahead = self.block_size
+        self.last_end = end
+        # Reads larger than the cache bypass it
+        if end - start >= self.cache_size:
+            data = self._get_range(start, end)
+            view[:len(data)] = data
+            self.position += len(data)
+            return len(data)
+        offset = start
+        while offset < end:
+            index = offset // self.block_size
+            block = self.blocks.get(index)
+            if block is None:
+                block = self._fetch_blocks(index, end)
+            else:
+                self.blocks.move_to_end(index)
+            block_offset = offset - index * self.block_size
+            chunk = block[block_offset:block_offset + end - offset]
+            view[offset - start:offset - start + len(chunk)] = chunk
+            offset += len(chunk)
+        self.position = end
+        return end - start
+
+    def readall(self):
+        return self.read(max(self.size - self.position, 0))
+
+    def _fetch_blocks(self, index, end):
+        """
+        This method will fetch the blocks needed to read up to end, plus the
+        current readahead, with a single ranged GET.
+
+        Returns:
+            first fetched block
+        """
+        last_index = max(
+            (end - 1) // self.block_size,
+            index + self.readahead // self.block_size - 1)
+        last_index = min(last_index, (self.size - 1) // self.block_size)
+        # Stop at the first block that is already cached
+        stop = index + 1
+        while stop <= last_index and stop not in self.blocks:
+            stop += 1
+        start = index * self.block_size
+        data = self._get_range(
+            start, min(stop * self.block_size, self.size))
+        for i in range(index, stop):
+            offset = (i - index) * self.block_size
+            self.blocks[i] = data[offset:offset + self.block_size]
+        # Evict the least recently used blocks
+        block = self.blocks[index]
+        while len(self.blocks) * self.block_size > self.cache_size:
+            self.blocks.popitem(last=False)
+
+        return block
+
+    def _get_range(self, start, end):
+        """
+        This method will read a byte range of the object version this file
+        was opened with.
+
+        Returns:
+            bytes object
+        """
+        self.request_count += 1
+        response = self.client.get_object(
+            Bucket=self.bucket_name, Key=self.s3_prefix, IfMatch=self.etag,
+            Range=f"bytes={start}-{end - 1}")
+
+        return response["Body"].read()
+
+
+def write_bytes(
+        access_key, secret_key, s3_prefix, bucket_name, bytes_object,
+        multipart_threshold=MULTIPART_THRESHOLD, part_size=DEFAULT_PART_SIZE,
+        worker_count=8, max_retries=3, skip_unchanged=False):
+    """
+        This method will write a bytes object to s3 provided a prefix.
+        Objects at or above the multipart threshold are uploaded as
+        concurrent multipart upload parts, file objects are read one part
+        at a time so they are never fully loaded into memory. When
+        skip_unchanged is set the content is compared with the existing
+        object's ETag first and identical objects aren't rewritten.
+
+        Args:
+            access_key (str): AWS s3 Access Key
+            secret_key (str): AWS s3 Secret Key
+            s3_prefix (str): AWS s3 prefix to file
+            bucket_name (str): AWS s3 bucket name
+            bytes_object (bytes|file): object that will be written
+            multipart_threshold (int): size in bytes from which a multipart
+                upload is used
+            part_size (int): size in bytes of each multipart upload part
+            worker_count (int): number of concurrent part uploads
+            max_retries (int): maximum number of retries per failed part
+            skip_unchanged (bool): whether to skip writing identical objects
+
+        Returns:
+            Success boolean
+    """
+    # Setup boto3 s3 client
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    if skip_unchanged and _is_object_unchanged(
+        client, bucket_name, s3_prefix, bytes_object, part_size
+    ):
+        logging.info(f"s3://{bucket_name}/{s3_prefix} is unchanged.")
+        return True
+
+    return _write_bytes(
+        client, s3_prefix, bucket_name, bytes_object, multipart_threshold,
+        part_size, worker_count, max_retries)
+
+
+def _write_bytes(
+        client, s3_prefix, bucket_name, bytes_object,
+        multipart_threshold=MULTIPART_THRESHOLD, part_size=DEFAULT_PART_SIZE,
+        worker_count=8, max_retries=3):
+    """
+    This method will write a bytes object to s3 with an existing client,
+    see write_bytes.
+
+    Returns:
+        Success boolean
+    """
+    size = _get_size(bytes_object)
+    # Upload large or unsized objects in parts
+    if size is None or size >= multipart_threshold:
+        return upload_parts(
+            client, bucket_name, s3_prefix,
+            _iter_parts(bytes_object, get_upload_part_size(size, part_size)),
+            worker_count=worker_count, max_retries=max_retries)
+    # Write object to s3
+    response = client.put_object(
+        Body=bytes_object, Bucket=bucket_name, Key=s3_prefix)
+    # Return success
+    return response["ResponseMetadata"]["HTTPStatusCode"] == 200
+
+
+def write_objects(
+        access_key, secret_key, object_dict, bucket_name, skip_unchanged=True,
+        worker_count=8):
+    """
+    This method will write many bytes objects to s3 concurrently. When
+    skip_unchanged is set, the existing objects are fetched with one
+    delimited listing per parent directory of the keys and objects whose
+    ETag matches their content aren't rewritten.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        object_dict (dict): s3 keys and the bytes objects to write to them
+        bucket_name (str): AWS s3 bucket name
+        skip_unchanged (bool): whether to skip writing identical objects
+        worker_count (int): number of concurrent writes
+
+    Returns:
+        dict with the written and unchanged keys and the errors per key
+    """
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    existing_objects = {}
+    if skip_unchanged and object_dict:
+        # List each directory once instead of the keys' common prefix, which
+        # may be the whole bucket for keys under unrelated prefixes
+        parent_prefixes = {
+            s3_prefix[:s3_prefix.rfind("/") + 1] for s3_prefix in object_dict}
+        existing_objects = {
+            obj["Key"]: obj
+            for parent_prefix in sorted(parent_prefixes)
+            for page in _iter_pages(
+                client, bucket_name, parent_prefix, delimiter="/")
+            for obj in page.get("Contents", []) if obj["Key"] in object_dict}
+    report = {"written": [], "unchanged": [], "errors": {}}
+
+    def write(s3_prefix):
+        bytes_object = object_dict[s3_prefix]
+        obj = existing_objects.get(s3_prefix)
+        if obj is not None and _is_object_unchanged(
+            client, bucket_name, s3_prefix, bytes_object, obj=obj
+        ):
+            return False
+        if not _write_bytes(client, s3_prefix, bucket_name, bytes_object):
+            raise IOError(f"Write to s3://{bucket_name}/{s3_prefix} failed.")
+        return True
+
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        futures = {
+            executor.submit(write, s3_prefix): s3_prefix
+            for s3_prefix in object_dict}
+        for future, s3_prefix in futures.items():
+            try:
+                if future.result():
+                    report["written"].append(s3_prefix)
+                else:
+                    report["unchanged"].append(s3_prefix)
+            except Exception as e:
+                report["errors"][s3_prefix] = str(e)
+    if report["errors"]:
+        logging.error(
+            f"{len(report['errors'])} objects failed to write to "
+            f"s3://{bucket_name}.")
+
+    return report
+
+
+def _is_object_unchanged(
+        client, bucket_name, s3_prefix, bytes_object,
+        part_size=DEFAULT_PART_SIZE, obj=None):
+    """
+    This method will compare content that is about to be written with the
+    existing s3 object's size and ETag. The object is fetched with a
+    head_object request unless a listed object is provided. Content that
+    can't be hashed without consuming it, missing objects and objects that
+    can't be read count as changed.
+
+    Returns:
+        boolean for whether the object is unchanged
+    """
+    if isinstance(bytes_object, (bytes, bytearray, memoryview)):
+        size = memoryview(bytes_object).nbytes
+        calculate = functools.partial(calculate_etag, bytes_object)
+    elif isinstance(getattr(bytes_object, "name", None), str) and (
+        os.path.isfile(bytes_object.name)
+    ):
+        size = os.path.getsize(bytes_object.name)
+        calculate = functools.partial(calculate_file_etag, bytes_object.name)
+    else:
+        return False
+    if obj is None:
+        try:
+            head = client.head_object(Bucket=bucket_name, Key=s3_prefix)
+        except ClientError:
+            return False
+        obj = {"Size": head["ContentLength"], "ETag": head["ETag"]}
+
+    return size == obj["Size"] and _matches_etag(
+        size, obj["ETag"], calculate, part_size)
+
+
+def get_upload_part_size(size, part_size=DEFAULT_PART_SIZE):
+    """
+    This method will get the multipart upload part size for an object,
+    growing it when the object would otherwise exceed the part limit.
+
+    Args:
+        size (int): object size in bytes, None if unknown
+        part_size (int): requested part size in bytes
+
+    Returns:
+        part size in bytes
+    """
+    part_size = max(part_size, MIN_PART_SIZE)
+    if size is not None:
+        part_size = max(part_size, math.ceil(size / MAX_PART_COUNT))
+
+    return part_size
+
+
+def upload_parts(
+        client, bucket_name, s3_prefix, parts, worker_count=8, max_retries=3,
+        **kwargs):
+    """
+    This method will upload an iterable of parts as an s3 multipart upload.
+    Parts are consumed lazily and at most twice the worker count are held
+    in memory at once. Failed parts are retried individually and the upload
+    is aborted if any part ultimately fails so no orphaned parts remain.
+    A single part is written with one put_object request instead.
+
+    Args:
+        client (botocore.client.S3): s3 client
+        bucket_name (str): AWS s3 bucket name
+        s3_prefix (str): AWS s3 prefix to file
+        parts (iterable): bytes objects of at least 5 MiB, except the last
+        worker_count (int): number of concurrent part uploads
+        max_retries (int): maximum number of retries per failed part
+        kwargs: additional create_multipart_upload / put_object arguments
+
+    Returns:
+        Success boolean
+    """
+    parts = iter(parts)
+    try:
+        first_parts = list(itertools.islice(parts, 2))
+    except Exception:
+        logging.error(
+            f"Upload to s3://{bucket_name}/{s3_prefix} failed.", exc_info=True)
+        return False
+    # Objects that fit in a single part don't need a multipart upload
+    if len(first_parts) < 2:
+        response = client.put_object(
+            Body=first_parts[0] if first_parts else b"", Bucket=bucket_name,
+            Key=s3_prefix, **kwargs)
+        return response["ResponseMetadata"]["HTTPStatusCode"] == 200
+    parts = itertools.chain(first_parts, parts)
+    upload_id = client.create_multipart_upload(
+        Bucket=bucket_name, Key=s3_prefix, **kwargs)["UploadId"]
+    completed_parts = []
+    try:
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            pending = set()
+            for part_number, body in enumerate(parts, 1):
+                # Wait for a free slot before reading the next part
+                if len(pending) >= 2 * worker_count:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    completed_parts += [future.result() for future in done]
+                pending.add(executor.submit(
+                    call_with_retries, _upload_part, client, bucket_name,
+                    s3_prefix, upload_id, part_number, body,
+                    max_retries=max_retries))
+            completed_parts += [future.result() for future in pending]
+        response = client.complete_multipart_upload(
+            Bucket=bucket_name, Key=s3_prefix, UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(
+                completed_parts, key=lambda part: part["PartNumber"])})
+    except Exception:
+        logging.error(
+            f"Multipart upload to s3://{bucket_name}/{s3_prefix} failed.",
+            exc_info=True)
+        client.abort_multipart_upload(
+            Bucket=bucket_name, Key=s3_prefix, UploadId=upload_id)
+        return False
+
+    return response["ResponseMetadata"]["HTTPStatusCode"] == 200
+
+
+def _upload_part(client, bucket_name, s3_prefix, upload_id, part_number, body):
+    """
+    This method will upload a single multipart upload part.
+
+    Returns:
+        completed part dict
+    """
+    response = client.upload_part(
+        Body=body, Bucket=bucket_name, Key=s3_prefix, UploadId=upload_id,
+        PartNumber=part_number)
+
+    return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+
+def _get_size(bytes_object):
+    """
+    This method will get the number of remaining bytes in a bytes-like or
+    file object.
+
+    Returns:
+        size in bytes or None if it can't be determined
+    """
+    if not hasattr(bytes_object, "read"):
+        return memoryview(bytes_object).nbytes
+    try:
+        position = bytes_object.tell()
+    except (AttributeError, OSError):
+        return None
+    try:
+        size = os.fstat(bytes_object.fileno()).st_size
+    except (AttributeError, OSError):
+        try:
+            size = bytes_object.seek(0, io.SEEK_END)
+            bytes_object.seek(position)
+        except (AttributeError, OSError):
+            return None
+
+    return size - position
+
+
+def _iter_parts(bytes_object, part_size):
+    """
+    This method will split a bytes-like or file object into parts, file
+    objects are read lazily one part at a time.
+    """
+    if hasattr(bytes_object, "read"):
+        while True:
+            part = bytes_object.read(part_size)
+            if not part:
+                break
+            yield part
+    else:
+        view = memoryview(bytes_object)
+        for start, end in get_part_ranges(view.nbytes, part_size):
+            yield bytes(view[start:end])
+
+
+def write_pandas_df(
+        access_key, secret_key, s3_url, pandas_df, file_format="csv",
+        **kwargs):
+    """
+    This method will save a DataFrame to S3 provided the filename.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_url (str): s3 url where data will be written
+        pandas_df (pandas.DataFrame): DataFrame object
+        file_format (str): desired file format, default is csv
+
+    Returns:
+        success boolean
+    """
+    # Encode pandas DataFrame to bytes object
+    if file_format == "csv":
+        bytes_object = pandas_df.to_csv(None, index=False, **kwargs).encode()
+    elif file_format == "parquet":
+        bytes_object = pandas_df.to_parquet(None, index=False)
+    else:
+        return False
+    # Write bytes to s3
+    return write_bytes(
+        access_key, secret_key,
+        # Parse s3 URL for bucket name and s3 key
+        *parse_url(s3_url),
+        bytes_object)
+
+
+def write_pandas_df_stream(
+        access_key, secret_key, s3_url, pandas_df, file_format="csv",
+        compression=None, chunksize=100000, part_size=DEFAULT_PART_SIZE,
+        worker_count=8, **kwargs):
+    """
+    This method will stream a DataFrame to S3 as a multipart upload. Rows are
+    serialized chunk by chunk and cut into upload parts as they are
+    produced, so peak memory is a few part sizes instead of multiple copies
+    of the whole serialized DataFrame.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_url (str): s3 url where data will be written
+        pandas_df (pandas.DataFrame): DataFrame object
+        file_format (str): desired file format, either csv or parquet
+        compression (str): csv files are compressed on the fly with "gzip"
+            or "zstd", for parquet files this is the column codec
+        chunksize (int): number of rows serialized at a time, for parquet
+            files this is the row group size
+        part_size (int): size in bytes of each multipart upload part
+        worker_count (int): number of concurrent part uploads
+        kwargs: additional pandas to_csv arguments
+
+    Returns:
+        success boolean
+    """
+    part_size = max(part_size, MIN_PART_SIZE)
+    if file_format == "csv":
+        parts = _iter_csv_parts(
+            pandas_df, chunksize, part_size, compression, **kwargs)
+    elif file_format == "parquet":
+        parts = _iter_parquet_parts(
+            pandas_df, chunksize, part_size, compression)
+    else:
+        return False
+    s3_prefix, bucket_name = parse_url(s3_url)
+
+    return upload_parts(
+        get_client(access_key, secret_key, max_pool_connections=worker_count),
+        bucket_name, s3_prefix, parts, worker_count=worker_count)
+
+
+def _iter_csv_parts(pandas_df, chunksize, part_size, compression, **kwargs):
+    """
+    This method will serialize a DataFrame to csv in row chunks and yield
+    upload parts, optionally compressing the chunks on the fly.
+    """
+    header = kwargs.pop("header", True)
+    kwargs.pop("index", None)
+    if compression == "gzip":
+        compressor = zlib.compressobj(wbits=31)
+    elif compression == "zstd":
+        if zstandard is None:
+            raise ImportError(
+                "The zstandard package is required to write zstd objects.")
+        compressor = zstandard.ZstdCompressor().compressobj()
+    elif compression is None:
+        compressor = None
+    else:
+        raise ValueError(f"Unsupported compression '{compression}'.")
+    buffer = _PartBuffer()
+    # Always serialize at least one chunk so the header gets written
+    for start in range(0, max(len(pandas_df), 1), chunksize):
+        data = pandas_df.iloc[start:start + chunksize].to_csv(
+            None, index=False, header=header if start == 0 else False,
+            **kwargs).encode()
+        buffer.write(compressor.compress(data) if compressor else data)
+        yield from buffer.pop_parts(part_size)
+    if compressor:
+        buffer.write(compressor.flush())
+    yield from buffer.pop_parts(part_size, final=True)
+
+
+def _iter_parquet_parts(pandas_df, chunksize, part_size, compression):
+    """
+    This method will write a DataFrame to parquet one row group at a time
+    and yield upload parts as the file is produced.
+    """
+    buffer = _PartBuffer()
+    schema = pa.Schema.from_pandas(pandas_df, preserve_index=False)
+    with pq.ParquetWriter(
+        buffer, schema, compression=compression or "snappy"
+    ) as writer:
+        for start in range(0, len(pandas_df), chunksize):
+            writer.write_table(pa.Table.from_pandas(
+                pandas_df.iloc[start:start + chunksize], schema=schema,
+                preserve_index=False))
+            yield from buffer.pop_parts(part_size)
+    yield from buffer.pop_parts(part_size, final=True)
+
+
+class _PartBuffer(object):
+    """
+    Write-only file object that accumulates bytes until they can be handed
+    out as multipart upload parts.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(memoryview(data).cast("B"))
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def pop_parts(self, part_size, final=False):
+        """
+        This method will yield full parts, and the remainder if final.
+        """
+        while len(self.buffer) >= part_size:
+            part = bytes(self.buffer[:part_size])
+            del self.buffer[:part_size]
+            yield part
+        if final and self.buffer:
+            yield bytes(self.buffer)
+            self.buffer.clear()
+
+
+def write_dict(
+        access_key, secret_key, s3_url, dict_object, skip_unchanged=False):
+    """
+    This method will convert a dict to bytes using YAML and write them to
+    a specified s3 location.
+
+    TODO: Add other file format options like JSON
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_url (str): s3 url where data will be written
+        dict_object (dict): python dictionary
+        skip_unchanged (bool): whether to skip writing an identical object
+
+    Returns:
+        success boolean
+    """
+    return write_bytes(
+        access_key, secret_key,
+        # Parse s3 URL for bucket name and s3 key
+        *parse_url(s3_url),
+        # Encode dictionary
+        yaml.dump(dict_object).encode(),
+        skip_unchanged=skip_unchanged)
+
+
+def write_zip(access_key, secret_key, s3_url, file_dict):
+    """
+    This method will zip a dictionary of byte objects and save the file
+    on s3.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_url (str): s3 url where data will be written
+        file_dict (dict): filenames and their corresponding bytes
+
+    Returns:
+        success boolean
+    """
+    return write_zip_stream(access_key, secret_key, s3_url, file_dict.items())
+
+
+def write_zip_stream(
+        access_key, secret_key, s3_url, members, worker_count=8,
+        compresslevel=6, part_size=DEFAULT_PART_SIZE):
+    """
+    This method will stream a zip archive to s3. Members are deflated in
+    parallel on a thread pool and written in order, along with the central
+    directory at the end, into multipart upload parts. Only the members
+    being compressed and the upload parts in flight are held in memory.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_url (str): s3 url where data will be written
+        members (iterable): (name, data) pairs where data is bytes or a lazy
+            iterator of bytes chunks
+        worker_count (int): number of members compressed concurrently
+        compresslevel (int): deflate compression level
+        part_size (int): size in bytes of each multipart upload part
+
+    Returns:
+        success boolean
+    """
+    s3_prefix, bucket_name = parse_url(s3_url)
+
+    return upload_parts(
+        get_client(access_key, secret_key, max_pool_connections=worker_count),
+        bucket_name, s3_prefix,
+        _iter_zip_parts(
+            members, worker_count, compresslevel,
+            max(part_size, MIN_PART_SIZE)),
+        worker_count=worker_count)
+
+
+def _iter_zip_parts(members, worker_count, compresslevel, part_size):
+    """
+    This method will yield the upload parts of a zip archive.
+    """
+    buffer = _PartBuffer()
+    entries = []
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        pending = []
+        for name, data in members:
+            pending.append(executor.submit(
+                _compress_member, name, data, compresslevel))
+            # Write the oldest member once enough are being compressed
+            if len(pending) >= worker_count:
+                entries.append(_write_member(buffer, pending.pop(0).result()))
+                yield from buffer.pop_parts(part_size)
+        for future in pending:
+            entries.append(_write_member(buffer, future.result()))
+            yield from buffer.pop_parts(part_size)
+    _write_central_directory(buffer, entries)
+    yield from buffer.pop_parts(part_size, final=True)
+
+
+def _compress_member(name, data, compresslevel):
+    """
+    This method will deflate a zip member.
+
+    Returns:
+        ZipInfo with the CRC and sizes set and the compressed chunks
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = [data]
+    zinfo = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    # Use the same permissions as zipfile.writestr
+    if name.endswith("/"):
+        zinfo.external_attr = 0o40775 << 16 | 0x10
+    else:
+        zinfo.external_attr = 0o600 << 16
+    zinfo.CRC = 0
+    zinfo.file_size = 0
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    chunks = []
+    for chunk in data:
+        zinfo.CRC = zlib.crc32(chunk, zinfo.CRC)
+        zinfo.file_size += len(chunk)
+        chunks.append(compressor.compress(chunk))
+    chunks.append(compressor.flush())
+    zinfo.compress_size = sum(len(chunk) for chunk in chunks)
+
+    return zinfo, chunks
+
+
+def _write_member(buffer, member):
+    """
+    This method will write a local file header and compressed data.
+
+    Returns:
+        ZipInfo with the header offset set
+    """
+    zinfo, chunks = member
+    zinfo.header_offset = buffer.tell()
+    buffer.write(zinfo.FileHeader())
+    for chunk in chunks:
+        buffer.write(chunk)
+
+    return zinfo
+
+
+def _write_central_directory(buffer, entries):
+    """
+    This method will write the zip central directory and end records,
+    using zip64 records where the sizes or offsets require them.
+    """
+    start = buffer.tell()
+    for zinfo in entries:
+        dt = zinfo.date_time
+        dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
+        dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+        file_size = zinfo.file_size
+        compress_size = zinfo.compress_size
+        header_offset = zinfo.header_offset
+        zip64_fields = []
+        if file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+            zip64_fields += [file_size, compress_size]
+            file_size = compress_size = 0xffffffff
+        if header_offset > ZIP64_LIMIT:
+            zip64_fields.append(header_offset)
+            header_offset = 0xffffffff
+        extra = zinfo.extra
+        version = zinfo.extract_version
+        if zip64_fields:
+            extra = struct.pack(
+                "<HH" + "Q" * len(zip64_fields), 1, 8 * len(zip64_fields),
+                *zip64_fields) + extra
+            version = max(version, 45)
+        try:
+            filename = zinfo.filename.encode("ascii")
+            flag_bits = zinfo.flag_bits
+        except UnicodeEncodeError:
+            filename = zinfo.filename.encode("utf-8")
+            flag_bits = zinfo.flag_bits | 0x800
+        buffer.write(struct.pack(
+            "<4s4B4HL2L5H2L", b"PK\x01\x02", max(version, 20),
+            zinfo.create_system, version, 0, flag_bits, zinfo.compress_type,
+            dostime, dosdate, zinfo.CRC, compress_size, file_size,
+            len(filename), len(extra), 0, 0, zinfo.internal_attr,
+            zinfo.external_attr, header_offset))
+        buffer.write(filename)
+        buffer.write(extra)
+    end = buffer.tell()
+    count = len(entries)
+    size = end - start
+    if count >= 0xffff or size > ZIP64_LIMIT or start > ZIP64_LIMIT:
+        buffer.write(struct.pack(
+            "<4sQ2H2L4Q", b"PK\x06\x06", 44, 45, 45, 0, 0, count, count,
+            size, start))
+        buffer.write(struct.pack("<4sLQL", b"PK\x06\x07", 0, end, 1))
+        count = min(count, 0xffff)
+        size = min(size, 0xffffffff)
+        start = min(start, 0xffffffff)
+    buffer.write(struct.pack(
+        "<4s4H2LH", b"PK\x05\x06", 0, 0, count, count, size, start, 0))
+
+
+class PackedStore(object):
+    """
+    Store of small blobs packed into large segment objects under an s3
+    prefix, so writing and reading many tiny objects takes a handful of
+    requests instead of one per object. Every segment has a sidecar JSON
+    index of its blobs' offsets and lengths, which is written after the
+    segment so a segment only becomes visible once it is complete. Blobs
+    are read with ranged GETs, later segments supersede earlier ones and
+    deletes are recorded as tombstones until compaction rewrites the live
+    blobs of small or mostly dead segments into new segments. Writes and
+    deletes update the local index in place, refresh picks up the segments
+    of other writers. Any number of processes may write concurrently, but
+    only one may compact at a time.
+
+    Layout:
+        <prefix>/segments/<segment id>.seg
+        <prefix>/segments/<segment id>.json
+    """
+    def __init__(
+            self, access_key, secret_key, s3_url, segment_size=SEGMENT_SIZE,
+            worker_count=8):
+        self.client = get_client(
+            access_key, secret_key, max_pool_connections=worker_count)
+        s3_prefix, self.bucket_name = parse_url(s3_url)
+        self.segments_prefix = s3_prefix.rstrip("/") + "/segments/"
+        self.segment_size = segment_size
+        self.worker_count = worker_count
+        self.segments = {}
+        self.index = {}
+        self.refresh()
+
+    def refresh(self):
+        """
+        This method will reload the segment indexes from s3.
+        """
+        index_keys = [
+            obj["Key"]
+            for page in _iter_pages(
+                self.client, self.bucket_name, self.segments_prefix)
+            for obj in page.get("Contents", [])
+            if obj["Key"].endswith(".json")]
+        with ThreadPoolExecutor(max_workers=self.worker_count) as executor:
+            indexes = executor.map(
+                lambda key: _read_json_object(
+                    self.client, self.bucket_name, key),
+                index_keys)
+            segments = {
+                key[len(self.segments_prefix):-len(".json")]: segment_index
+                for key, segment_index in zip(index_keys, indexes)
+                if segment_index is not None}
+        self.segments = {}
+        self.index = {}
+        # Segment ids sort by creation time so later segments win
+        for segment_id in sorted(segments):
+            self._apply_index(segment_id, segments[segment_id])
+
+    def _apply_index(self, segment_id, segment_index):
+        """
+        This method will add a segment index to the local index, its blobs
+        and tombstones take precedence over the indexed ones.
+        """
+        self.segments[segment_id] = segment_index
+        for name, (offset, length) in segment_index["blobs"].items():
+            self.index[name] = (segment_id, offset, length)
+        for name in segment_index["deleted"]:
+            self.index.pop(name, None)
+
+    def list(self):
+        """
+        This method will list the names of the stored blobs.
+
+        Returns:
+            sorted list of blob names
+        """
+        return sorted(self.index)
+
+    def write(self, blobs):
+        """
+        This method will pack blobs into new segments and upload them
+        concurrently. Dicts are serialized with YAML like write_dict.
+
+        Args:
+            blobs (dict|iterable): blob names and their bytes, str or dict
+                content
+
+        Returns:
+            list of new segment ids
+        """
+        return self._write_segments(blobs)
+
+    def _write_segments(self, blobs, base_id=None):
+        """
+        This method will pack blobs into segments, upload them and add them
+        to the local index.
+
+        Returns:
+            list of new segment ids
+        """
+        if isinstance(blobs, dict):
+            blobs = blobs.items()
+        segments = []
+        buffer, entries = bytearray(), {}
+        for name, data in blobs:
+            if isinstance(data, dict):
+                data = yaml.dump(data).encode()
+            elif isinstance(data, str):
+                data = data.encode()
+            entries[name] = [len(buffer), len(data)]
+            buffer += data
+            if len(buffer) >= self.segment_size:
+                segments.append((buffer, entries))
+                buffer, entries = bytearray(), {}
+        if entries:
+            segments.append((buffer, entries))
+        with ThreadPoolExecutor(max_workers=self.worker_count) as executor:
+            segment_ids = list(executor.map(
+                lambda segment: self._write_segment(*segment, base_id),
+                segments))
+        for segment_id, (_, entries) in zip(segment_ids, segments):
+            self._apply_index(
+                segment_id, {"blobs": entries, "deleted": []})
+
+        return segment_ids
+
+    def read(self, name):
+        """
+        This method will read a blob with a single ranged GET.
+
+        Args:
+            name (str): blob name
+
+        Returns:
+            bytes object
+        """
+        return self.read_many([name])[name]
+
+    def read_many(self, names, retry=True):
+        """
+        This method will read blobs, fetching nearby blobs of the same
+        segment with one ranged GET and segments concurrently.
+
+        Args:
+            names (list): blob names
+            retry (bool): whether to refresh the indexes and retry once when
+                a segment was removed by a compaction
+
+        Returns:
+            dict of blob name to bytes object
+        """
+        missing = [name for name in names if name not in self.index]
+        if missing:
+            raise KeyError(f"Blobs not found: {', '.join(missing[:10])}")
+        # Empty blobs have no byte range to fetch
+        blobs = {name: b"" for name in names if not self.index[name][2]}
+        names = [name for name in names if name not in blobs]
+        segment_ranges = {}
+        for name in names:
+            segment_id, offset, length = self.index[name]
+            segment_ranges.setdefault(segment_id, []).append(
+                (offset, offset + length))
+        requests = [
+            (segment_id, start, end)
+            for segment_id, ranges in segment_ranges.items()
+            for start, end in _coalesce_ranges(ranges)]
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.worker_count
+            ) as executor:
+                chunks = list(executor.map(
+                    lambda request: self._read_segment_range(*request),
+                    requests))
+        # A compaction may have removed the segment since the last refresh
+        except ClientError as e:
+            if not retry or get_error_code(e) not in ("NoSuchKey", "404"):
+                raise
+            self.refresh()
+            return {**blobs, **self.read_many(names, retry=False)}
+        for name in names:
+            segment_id, offset, length = self.index[name]
+            for (request_id, start, end), chunk in zip(requests, chunks):
+                if request_id == segment_id and start <= offset < end:
+                    blobs[name] = chunk[offset - start:offset - start + length]
+                    break
+
+        return blobs
+
+    def delete(self, names):
+        """
+        This method will delete blobs by writing a tombstone index.
+
+        Args:
+            names (list): blob names
+        """
+        segment_id = self._new_segment_id()
+        self._write_index(segment_id, {}, list(names))
+        self._apply_index(segment_id, {"blobs": {}, "deleted": list(names)})
+
+    def compact(self, min_live_ratio=0.5):
+        """
+        This method will rewrite the live blobs of segments that are smaller
+        than half the segment size or whose live bytes are below the given
+        ratio into new segments, then delete the old segments and the
+        tombstones that no longer hide any blob. The new segments sort
+        right after the newest compacted segment, so blobs written by other
+        writers since the last refresh still take precedence.
+
+        Args:
+            min_live_ratio (float): live byte ratio below which a segment
+                is compacted
+
+        Returns:
+            dict with the number of compacted and written segments
+        """
+        self.refresh()
+        candidates = []
+        has_garbage = False
+        for segment_id, segment_index in self.segments.items():
+            size = sum(length for _, length in segment_index["blobs"].values())
+            live = sum(
+                length for name, (_, length) in segment_index["blobs"].items()
+                if self.index.get(name, (None,))[0] == segment_id)
+            if size < self.segment_size / 2 or live < min_live_ratio * size:
+                candidates.append(segment_id)
+                has_garbage |= live < size or bool(segment_index["deleted"])
+        # A single fully live segment would be rewritten unchanged
+        if not candidates or (len(candidates) == 1 and not has_garbage):
+            return {"compacted": 0, "written": 0}
+        # Tombstones are kept while a remaining segment holds the blob
+        remaining_names = {
+            name for segment_id, segment_index in self.segments.items()
+            if segment_id not in candidates
+            for name in segment_index["blobs"]}
+        tombstones = sorted({
+            name for segment_id in candidates
+            for name in self.segments[segment_id]["deleted"]
+            if name in remaining_names and name not in self.index})
+        live_names = sorted(
+            name for name, (segment_id, _, _) in self.index.items()
+            if segment_id in candidates)
+        blobs = self.read_many(live_names)
+        base_id = max(candidates)
+        segment_ids = self._write_segments(
+            ((name, blobs[name]) for name in live_names), base_id)
+        if tombstones:
+            segment_id = self._new_segment_id(base_id)
+            self._write_index(segment_id, {}, tombstones)
+            self._apply_index(
+                segment_id, {"blobs": {}, "deleted": tombstones})
+        # Remove the old segments only after the new ones are visible
+        for batch in _iter_batches(
+            [
+                self.segments_prefix + segment_id + extension
+                for segment_id in candidates
+                for extension in (".json", ".seg")],
+            DELETE_BATCH_SIZE
+        ):
+            result = _delete_batch(self.client, self.bucket_name, batch, 3)
+            if result["errors"]:
+                logging.error(
+                    f"{len(result['errors'])} compacted segment objects "
+                    f"couldn't be deleted from {self.segments_prefix}.")
+        for segment_id in candidates:
+            del self.segments[segment_id]
+
+        return {"compacted": len(candidates), "written": len(segment_ids)}
+
+    def _new_segment_id(self, base_id=None):
+        """
+        This method will create a segment id that sorts by creation time, or
+        right after the given segment id.
+        """
+        if base_id is not None:
+            return f"{base_id}-{uuid.uuid4().hex[:8]}"
+        return f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+    def _write_segment(self, buffer, entries, base_id=None):
+        """
+        This method will upload a segment followed by its index.
+
+        Returns:
+            segment id
+        """
+        segment_id = self._new_segment_id(base_id)
+        if not _write_bytes(
+            self.client, self.segments_prefix + segment_id + ".seg",
+            self.bucket_name, bytes(buffer)
+        ):
+            raise IOError(f"Writing segment {segment_id} failed.")
+        self._write_index(segment_id, entries, [])
+
+        return segment_id
+
+    def _write_index(self, segment_id, entries, deleted):
+        """
+        This method will upload a segment index.
+        """
+        self.client.put_object(
+            Bucket=self.bucket_name,
+            Key=self.segments_prefix + segment_id + ".json",
+            Body=json.dumps({"blobs": entries, "deleted": deleted}).encode())
+
+    def _read_segment_range(self, segment_id, start, end):
+        """
+        This method will read a byte range of a segment.
+
+        Returns:
+            bytes object
+        """
+        return _read_range(
+            self.client, self.bucket_name,
+            self.segments_prefix + segment_id + ".seg", start, end)
+
+
+def write_local_file(
+        access_key, secret_key, s3_prefix, bucket_name, local_filepath,
+        **kwargs):
+    """
+    This method will write a local file to s3. Large files are streamed in
+    multipart upload parts rather than being read into memory.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_prefix (str): AWS s3 prefix to file
+        bucket_name (str): AWS s3 bucket name
+        local_filepath (str): local filepath
+        kwargs: additional write_bytes arguments
+
+    Returns:
+        success
+    """
+    success = False
+    with open(local_filepath, "rb") as bytes_object:
+        success = write_bytes(
+            access_key, secret_key, s3_prefix, bucket_name, bytes_object,
+            **kwargs)
+
+    return success
+
+
+def sync(
+        access_key, secret_key, source, destination, delete=False,
+        worker_count=8, dry_run=False):
+    """
+    This method will incrementally sync a local directory to an s3 prefix or
+    an s3 prefix to a local directory. Both sides are compared with a single
+    listing and only new files, or files whose size or ETag differ, are
+    transferred concurrently.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        source (str): local directory or s3 url
+        destination (str): s3 url or local directory
+        delete (bool): whether to delete destination files that don't exist
+            in the source
+        worker_count (int): number of concurrent transfers
+        dry_run (bool): only report what would be transferred and deleted
+
+    Returns:
+        dict with the transferred and deleted relative paths, the number
+        of unchanged files and the errors per relative path
+    """
+    upload = is_valid_s3_url(destination)
+    if upload == is_valid_s3_url(source):
+        raise ValueError(
+            "Exactly one of source and destination must be an s3 url.")
+    local_dir, s3_url = (source, destination) if upload else (
+        destination, source)
+    s3_prefix, bucket_name = parse_url(s3_url)
+    if s3_prefix and not s3_prefix.endswith("/"):
+        s3_prefix += "/"
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    # Index both sides by relative path
+    remote_files = {
+        obj["Key"][len(s3_prefix):]: obj
+        for page in iter_response_pages(
+            access_key, secret_key, s3_prefix, bucket_name,
+            worker_count=worker_count)
+        for obj in page if not obj["Key"].endswith("/")}
+    local_files = {}
+    for dirpath, _, filenames in os.walk(local_dir):
+        for filename in filenames:
+            local_path = os.path.join(dirpath, filename)
+            local_files[os.path.relpath(local_path, local_dir).replace(
+                os.sep, "/")] = local_path
+    report = {"transferred": [], "deleted": [], "unchanged": 0, "errors": {}}
+
+    def transfer(relative_path):
+        local_path = os.path.join(local_dir, *relative_path.split("/"))
+        # Keys with ".." segments mustn't be written outside the directory
+        if not upload:
+            local_path = _get_contained_path(local_dir, local_path)
+        obj = remote_files.get(relative_path)
+        if obj is not None and os.path.isfile(local_path) and (
+            _is_unchanged(local_path, obj)
+        ):
+            return relative_path, False
+        if not dry_run:
+            if upload:
+                with open(local_path, "rb") as bytes_object:
+                    if not _write_bytes(
+                        client, s3_prefix + relative_path, bucket_name,
+                        bytes_object
+                    ):
+                        raise IOError(f"Upload of {local_path} failed.")
+            else:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                _download_atomic(
+                    client, bucket_name, s3_prefix + relative_path,
+                    {"ContentLength": obj["Size"], "ETag": obj["ETag"]},
+                    local_path)
+        return relative_path, True
+
+    source_files = local_files if upload else remote_files
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        futures = {
+            executor.submit(transfer, relative_path): relative_path
+            for relative_path in source_files}
+        for future, relative_path in futures.items():
+            try:
+                if future.result()[1]:
+                    report["transferred"].append(relative_path)
+                else:
+                    report["unchanged"] += 1
+            except Exception as e:
+                report["errors"][relative_path] = str(e)
+    # Remove destination files that aren't in the source
+    if delete:
+        extra_files = sorted(
+            set(remote_files if upload else local_files) - set(source_files))
+        if extra_files and not dry_run:
+            if upload:
+                result = delete_objects(
+                    access_key, secret_key, bucket_name,
+                    keys=[s3_prefix + i for i in extra_files],
+                    worker_count=worker_count)
+                for error in result["errors"]:
+                    report["errors"][error["Key"][len(s3_prefix):]] = (
+                        error.get("Message"))
+            else:
+                for relative_path in extra_files:
+                    os.remove(local_files[relative_path])
+        report["deleted"] = [
+            i for i in extra_files if i not in report["errors"]]
+    if report["errors"]:
+        logging.error(
+            f"{len(report['errors'])} files failed to sync from {source} "
+            f"to {destination}.")
+
+    return report
+
+
+def _get_contained_path(local_dir, local_path):
+    """
+    This method will resolve a local path and make sure it stays within the
+    local directory.
+
+    Returns:
+        resolved local path
+    """
+    root = os.path.realpath(local_dir)
+    resolved_path = os.path.realpath(local_path)
+    if os.path.commonpath([root, resolved_path]) != root or (
+        resolved_path == root
+    ):
+        raise ValueError(f"{local_path} is outside of {local_dir}.")
+
+    return resolved_path
+
+
+def _is_unchanged(local_path, obj):
+    """
+    This method will compare a local file with a listed s3 object by size
+    and ETag.
+
+    Returns:
+        boolean for whether the file is unchanged
+    """
+    size = os.path.getsize(local_path)
+    if size != obj["Size"]:
+        return False
+
+    return _matches_etag(
+        size, obj["ETag"], functools.partial(calculate_file_etag, local_path))
+
+
+def _matches_etag(size, etag, calculate, part_size=DEFAULT_PART_SIZE):
+    """
+    This method will check whether content matches an s3 ETag. Multipart
+    ETags depend on the upload part size, which is guessed from the part
+    count, so a mismatch counts as changed.
+
+    Args:
+        size (int): content size in bytes
+        etag (str): quoted s3 ETag
+        calculate (callable): calculates the content's ETag given a part
+            size and part count
+        part_size (int): part size the content would be uploaded with
+
+    Returns:
+        boolean for whether the content matches
+    """
+    if "-" not in etag:
+        return calculate(None, None) == etag
+    part_count = int(etag.strip('"').split("-")[1])
+    # Try the part size used by write_bytes and the smallest whole MiB part
+    # size that yields the same number of parts
+    mib = 1024 ** 2
+    candidates = {
+        get_upload_part_size(size, part_size),
+        math.ceil(size / part_count / mib) * mib}
+    for candidate in candidates:
+        if math.ceil(size / candidate) == part_count and calculate(
+            candidate, part_count
+        ) == etag:
+            return True
+
+    return False
+
+
+def check_s3_path(
+        access_key, secret_key, s3_path, bucket_name, listing_cache=None):
+    """
+    This method will check whether the provided s3 path is valid. Paths
+    with glob characters are expanded with glob_s3_path, other paths must
+    be an object or a directory containing objects.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_path (str): path to s3 file
+        bucket_name (str): name of s3 bucket
+        listing_cache (S3ListingCache): optional cache of prefix listings
+            used to expand glob paths
+
+    Returns:
+        boolean for whether the path exists
+    """
+    s3_prefix = _get_path_prefix(s3_path, bucket_name)
+    if GLOB_PATTERN.search(s3_prefix):
+        return len(glob_s3_path(
+            access_key, secret_key, s3_path, bucket_name,
+            listing_cache=listing_cache)) > 0
+    inventory = _get_inventory(bucket_name)
+    if inventory is not None and inventory.exists(s3_prefix):
+        return True
+    s3_client = get_client(access_key, secret_key)
+    # Check for a directory with this name
+    resp = s3_client.list_objects_v2(
+        Bucket=bucket_name, Prefix=s3_prefix.rstrip("/") + "/", MaxKeys=1)
+    if "Contents" in resp or s3_prefix.endswith("/"):
+        return "Contents" in resp
+    # Otherwise check for an object with this exact key
+    try:
+        s3_client.head_object(Bucket=bucket_name, Key=s3_prefix)
+    except ClientError:
+        return False
+
+    return True
+
+
+class S3ListingCache(object):
+    """
+    Cache of object key listings per bucket and prefix. A listing is reused
+    for every prefix it contains, so expanding many globs under the same
+    root only lists s3 once. Delimited listings of single directories are
+    cached separately. Buckets with an enabled inventory are listed from
+    its index.
+    """
+    def __init__(self):
+        self.listings = {}
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def get_keys(self, client, bucket_name, s3_prefix):
+        """
+        This method will get the sorted keys under a prefix, listing s3 if
+        no cached listing contains the prefix.
+
+        Returns:
+            list of object keys
+        """
+        with self.lock:
+            for (bucket, prefix), keys in self.listings.items():
+                if bucket == bucket_name and s3_prefix.startswith(prefix):
+                    start = bisect.bisect_left(keys, s3_prefix)
+                    end = start
+                    while end < len(keys) and keys[end].startswith(
+                        s3_prefix
+                    ):
+                        end += 1
+                    return keys[start:end]
+        inventory = _get_inventory(bucket_name)
+        if inventory is not None:
+            keys = inventory.get_keys(client, s3_prefix)
+        else:
+            keys = [
+                obj["Key"]
+                for page in _iter_pages(client, bucket_name, s3_prefix)
+                for obj in page.get("Contents", [])]
+        with self.lock:
+            self.listings[(bucket_name, s3_prefix)] = keys
+
+        return keys
+
+    def get_children(self, client, bucket_name, s3_prefix):
+        """
+        This method will get the keys and sub-directories directly under a
+        directory, listing s3 with a "/" delimiter if no cached listing
+        contains the directory.
+
+        Returns:
+            tuple of the object keys and sub-directory prefixes
+        """
+        with self.lock:
+            children = self.children.get((bucket_name, s3_prefix))
+            is_listed = any(
+                bucket == bucket_name and s3_prefix.startswith(prefix)
+                for bucket, prefix in self.listings)
+        if children is not None:
+            return children
+        if is_listed or _get_inventory(bucket_name) is not None:
+            keys, sub_prefixes = [], []
+            for key in self.get_keys(client, bucket_name, s3_prefix):
+                name = key[len(s3_prefix):]
+                if "/" in name:
+                    sub_prefixes.append(
+                        s3_prefix + name.split("/", 1)[0] + "/")
+                else:
+                    keys.append(key)
+            children = (keys, list(dict.fromkeys(sub_prefixes)))
+        else:
+            keys, sub_prefixes = [], []
+            for page in _iter_pages(
+                client, bucket_name, s3_prefix, delimiter="/"
+            ):
+                keys += [obj["Key"] for obj in page.get("Contents", [])]
+                sub_prefixes += [
+                    common_prefix["Prefix"]
+                    for common_prefix in page.get("CommonPrefixes", [])]
+            children = (keys, sub_prefixes)
+        with self.lock:
+            self.children[(bucket_name, s3_prefix)] = children
+
+        return children
+
+    def clear(self):
+        """
+        This method will clear the cached listings.
+        """
+        with self.lock:
+            self.listings = {}
+            self.children = {}
+
+
+def glob_s3_path(
+        access_key, secret_key, s3_path, bucket_name, listing_cache=None,
+        include_hidden=False):
+    """
+    This method will expand a glob pattern to the object keys it matches,
+    listing one path segment at a time so only the directories the pattern
+    can match are listed. Supported are "*" and "?" within a path segment,
+    "[...]" character classes, "{a,b}" alternatives and "**" across path
+    segments. Patterns that match a directory match every object under it.
+    Hidden files and directories starting with "_" or ".", like _SUCCESS
+    markers, are skipped like Spark does unless they are matched by name or
+    include_hidden is set.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_path (str): s3 path or key glob pattern
+        bucket_name (str): name of s3 bucket
+        listing_cache (S3ListingCache): optional cache of prefix listings
+        include_hidden (bool): whether to include hidden files
+
+    Returns:
+        sorted list of matching object keys
+    """
+    pattern = _get_path_prefix(s3_path, bucket_name).rstrip("/")
+    if listing_cache is None:
+        listing_cache = S3ListingCache()
+    keys = _expand_glob(
+        get_client(access_key, secret_key), bucket_name, pattern,
+        listing_cache)
+    # Objects below a matched directory match as well
+    regex = re.compile(
+        _glob_to_regex(pattern) + ("(/.*)?" if pattern else "(.*)"),
+        re.DOTALL)
+    hidden = ("_", ".")
+    explicit_hidden = pattern.rsplit("/", 1)[-1].startswith(hidden)
+    matches = []
+    for key in keys:
+        result = regex.fullmatch(key)
+        # Skip directory markers
+        if result is None or key.endswith("/"):
+            continue
+        # Skip hidden files and directories unless they were matched by name
+        if not include_hidden:
+            remainder = result.group(1)
+            if remainder:
+                if any(part.startswith(hidden)
+                       for part in remainder.lstrip("/").split("/")):
+                    continue
+            elif not explicit_hidden and key.rsplit("/", 1)[-1].startswith(
+                hidden
+            ):
+                continue
+        matches.append(key)
+
+    return matches
+
+
+def _expand_glob(client, bucket_name, pattern, listing_cache):
+    """
+    This method will find the candidate keys of a glob pattern. Directories
+    are listed with a "/" delimiter for each segment with glob characters
+    and only the sub-directories matching it are descended into. The
+    directories matched by the last segment and the rest of a pattern
+    after "**" are listed in full.
+
+    Returns:
+        sorted list of object keys
+    """
+    segments = _split_glob_segments(pattern)
+    prefixes, keys = [""], []
+    for i, segment in enumerate(segments):
+        is_last = i == len(segments) - 1
+        match = GLOB_PATTERN.search(segment)
+        if match is None:
+            prefixes = [
+                prefix + segment + ("" if is_last else "/")
+                for prefix in prefixes]
+            continue
+        # The rest of the pattern may span directories
+        if "**" in segment or "/" in segment:
+            prefixes = [
+                prefix + segment[:match.start()] for prefix in prefixes]
+            break
+        regex = re.compile(_glob_to_regex(segment), re.DOTALL)
+        directories = []
+        for prefix in prefixes:
+            children, sub_prefixes = listing_cache.get_children(
+                client, bucket_name, prefix)
+            directories += [
+                sub_prefix for sub_prefix in sub_prefixes
+                if regex.fullmatch(sub_prefix[len(prefix):-1])]
+            # Objects only match the last segment
+            if is_last:
+                keys += [
+                    key for key in children
+                    if regex.fullmatch(key[len(prefix):])]
+        prefixes = directories
+    for prefix in prefixes:
+        keys += listing_cache.get_keys(client, bucket_name, prefix)
+
+    return sorted(set(keys))
+
+
+def _split_glob_segments(pattern):
+    """
+    This method will split a glob pattern into its path segments, keeping
+    "{a,b}" alternatives that contain a "/" in one segment.
+
+    Returns:
+        list of pattern segments
+    """
+    segments, start, depth = [], 0, 0
+    for i, char in enumerate(pattern):
+        if char == "{":
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+        elif char == "/" and not depth:
+            segments.append(pattern[start:i])
+            start = i + 1
+    segments.append(pattern[start:])
+
+    return segments
+
+
+def _get_path_prefix(s3_path, bucket_name):
+    """
+    This method will remove the scheme and bucket from an s3 path.
+
+    Returns:
+        s3 key or pattern
+    """
+    if bucket_name in s3_path:
+        return s3_path.split(bucket_name, 1)[1][1:]
+
+    return s3_path
+
+
+def _glob_to_regex(pattern):
+    """
+    This method will translate a glob pattern to a regular expression.
+
+    Returns:
+        regular expression string
+    """
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            # Zero or more directories
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex.append(".*")
+            i += 2
+            continue
+        end = -1
+        if char in "[{":
+            end = pattern.find("]" if char == "[" else "}", i + 1)
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[" and end > i + 1:
+            body = pattern[i + 1:end]
+            negate = body[0] in "!^"
+            body = "".join(
+                c if c == "-" else re.escape(c)
+                for c in body[int(negate):])
+            regex.append(f"[{'^' if negate else ''}{body}]")
+            i = end
+        elif char == "{" and end > i:
+            regex.append("(?:{})".format("|".join(
+                _glob_to_regex(alternative)
+                for alternative in pattern[i + 1:end].split(","))))
+            i = end
+        else:
+            regex.append(re.escape(char))
+        i += 1
+
+    return "".join(regex)
+
+
+class S3Inventory(object):
+    """
+    Sorted key index of an S3 Inventory report, used to serve listings of
+    very large buckets without paging through LIST requests. The report's
+    CSV, ORC or parquet data files are read in parallel and the sorted
+    index can be kept in a local parquet file so it is only built once per
+    report, and its columns stay in arrow and numpy arrays so only the
+    served pages become python objects. Keys sorting after the last key
+    the report has under a prefix, e.g. partitions or files appended after
+    the snapshot, are merged in from a live listing that starts after that
+    key. Keys written after the snapshot that sort between indexed keys, or
+    objects deleted after it, are only reflected in the next report, use
+    the max_age of enable_inventory to stop serving older snapshots.
+    """
+    def __init__(
+            self, access_key, secret_key, inventory_url, cache_dir=None,
+            worker_count=8):
+        client = get_client(
+            access_key, secret_key, max_pool_connections=worker_count)
+        manifest_key, inventory_bucket = parse_url(inventory_url)
+        # Use the latest report of an inventory configuration prefix
+        if not manifest_key.endswith("manifest.json"):
+            manifest_key = _get_latest_inventory_manifest(
+                client, inventory_bucket, manifest_key)
+        manifest = _read_json_object(client, inventory_bucket, manifest_key)
+        if manifest is None:
+            raise FileNotFoundError(
+                f"s3://{inventory_bucket}/{manifest_key} does not exist.")
+        self.bucket_name = manifest["sourceBucket"]
+        self.snapshot_time = datetime.datetime.fromtimestamp(
+            int(manifest["creationTimestamp"]) / 1000, datetime.timezone.utc)
+        cache_path = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_path = os.path.join(cache_dir, _hash_key(
+                inventory_bucket, manifest_key) + ".parquet")
+        if cache_path is not None and os.path.exists(cache_path):
+            table = pq.read_table(cache_path, memory_map=True)
+        else:
+            with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                tables = list(executor.map(
+                    lambda data_file: _read_inventory_file(
+                        client, manifest["destinationBucket"].split(":")[-1],
+                        data_file["key"], manifest),
+                    manifest["files"]))
+            table = pa.concat_tables(tables).sort_by("key")
+            if cache_path is not None:
+                with tempfile.NamedTemporaryFile(
+                    dir=cache_dir, delete=False
+                ) as temp_file:
+                    pq.write_table(table, temp_file)
+                os.replace(temp_file.name, cache_path)
+        self.keys = table.column("key").combine_chunks()
+        self.sizes = table.column("size").to_numpy()
+        self.etags = table.column("etag").combine_chunks()
+        self.last_modified = table.column("last_modified").combine_chunks()
+
+    def get_age(self):
+        """
+        This method will get the age of the inventory snapshot.
+
+        Returns:
+            age in seconds
+        """
+        return (datetime.datetime.now(datetime.timezone.utc) -
+                self.snapshot_time).total_seconds()
+
+    def iter_pages(self, client, s3_prefix, page_size=1000):
+        """
+        This method will yield the objects under a prefix in pages, followed
+        by the live listing of the keys sorting after the last indexed one.
+
+        Args:
+            client (botocore.client.S3): s3 client for live listings
+            s3_prefix (str): s3 prefix
+            page_size (int): number of objects per page
+
+        Yields:
+            lists of object dicts
+        """
+        start, end = self._get_range(s3_prefix)
+        for page_start in range(start, end, page_size):
+            page_end = min(page_start + page_size, end)
+            yield [
+                {key: value for key, value in (
+                    ("Key", key), ("Size", int(size)),
+                    ("ETag", etag and f'"{etag}"'),
+                    ("LastModified", last_modified))
+                 if value is not None}
+                for key, size, etag, last_modified in zip(
+                    self.keys[page_start:page_end].to_pylist(),
+                    self.sizes[page_start:page_end],
+                    self.etags[page_start:page_end].to_pylist(),
+                    self.last_modified[page_start:page_end].to_pylist())]
+        yield from self._iter_live_pages(client, s3_prefix, start, end)
+
+    def get_summary(self, client, s3_prefix):
+        """
+        This method will count the objects and bytes under a prefix.
+
+        Returns:
+            dict with the object count and total size in bytes
+        """
+        start, end = self._get_range(s3_prefix)
+        summary = {
+            "count": end - start, "size": int(self.sizes[start:end].sum())}
+        for page in self._iter_live_pages(client, s3_prefix, start, end):
+            summary["count"] += len(page)
+            summary["size"] += sum(obj["Size"] for obj in page)
+
+        return summary
+
+    def get_keys(self, client, s3_prefix):
+        """
+        This method will get the sorted keys under a prefix.
+
+        Returns:
+            list of object keys
+        """
+        start, end = self._get_range(s3_prefix)
+
+        return self.keys[start:end].to_pylist() + [
+            obj["Key"] for page in self._iter_live_pages(
+                client, s3_prefix, start, end)
+            for obj in page]
+
+    def exists(self, s3_prefix):
+        """
+        This method will check whether the inventory has an object with the
+        given key or under the given directory.
+
+        Returns:
+            boolean for whether the path exists in the inventory
+        """
+        s3_prefix = s3_prefix.rstrip("/")
+        index = self._bisect(s3_prefix)
+        if index < len(self.keys) and (
+            self.keys[index].as_py() == s3_prefix
+        ):
+            return True
+        start, end = self._get_range(s3_prefix + "/")
+
+        return start < end
+
+    def _iter_live_pages(self, client, s3_prefix, start, end):
+        """
+        This method will list the keys under a prefix that sort after the
+        last key the inventory has under it.
+
+        Yields:
+            lists of object dicts
+        """
+        start_after = self.keys[end - 1].as_py() if start < end else None
+        for response in _iter_pages(
+            client, self.bucket_name, s3_prefix, start_after=start_after
+        ):
+            if 'Contents' in response:
+                yield response['Contents']
 
-        Args:
-            access_key (str): AWS s3 Access Key
-            secret_key (str): AWS s3 Secret Key
-            s3_prefix (str): AWS s3 prefix to file
-            bucket_name (str): AWS s3 bucket name
+    def _get_range(self, s3_prefix):
+        """
+        This method will get the index range of the keys under a prefix.
 
         Returns:
-            bytes object
-    """
-    return pd.read_csv(
-        io.StringIO(str(read_file(
-            access_key, secret_key, s3_prefix, bucket_name), "utf-8")),
-        # Pass additional keyword arguments to pandas read_csv method
-        **kwargs)
+            start and end index
+        """
+        return (
+            self._bisect(s3_prefix), self._bisect(s3_prefix + "\U0010ffff"))
 
+    def _bisect(self, value):
+        """
+        This method will binary search the sorted keys without converting
+        them to python strings.
 
-def write_bytes(access_key, secret_key, s3_prefix, bucket_name, bytes_object):
-    """
-        This method will write a bytes object to s3 provided a prefix.
+        Returns:
+            index of the first key not less than the value
+        """
+        low, high = 0, len(self.keys)
+        while low < high:
+            middle = (low + high) // 2
+            if self.keys[middle].as_py() < value:
+                low = middle + 1
+            else:
+                high = middle
 
-        Args:
-            access_key (str): AWS s3 Access Key
-            secret_key (str): AWS s3 Secret Key
-            s3_prefix (str): AWS s3 prefix to file
-            bucket_name (str): AWS s3 bucket name
-            bytes_object (bytes): object that will be written
+        return low
 
-        Returns:
-            Success boolean
-    """
-    # Setup boto3 s3 client
-    client = boto3.client(
-        's3', aws_access_key_id=access_key, aws_secret_access_key=secret_key)
-    # Write object to s3
-    response = client.put_object(
-        Body=bytes_object, Bucket=bucket_name, Key=s3_prefix)
-    # Return success
-    return response["ResponseMetadata"]["HTTPStatusCode"] == 200
 
+_INVENTORIES = {}
 
-def write_pandas_df(
-        access_key, secret_key, s3_url, pandas_df, file_format="csv",
-        **kwargs):
+
+def enable_inventory(
+        access_key, secret_key, inventory_url, cache_dir=None, max_age=None,
+        worker_count=8):
     """
-    This method will save a DataFrame to S3 provided the filename.
+    This method will serve listings, glob expansion and path checks of an
+    inventoried bucket from its S3 Inventory report.
 
     Args:
         access_key (str): AWS s3 Access Key
         secret_key (str): AWS s3 Secret Key
-        s3_url (str): s3 url where data will be written
-        pandas_df (pandas.DataFrame): DataFrame object
-        file_format (str): desired file format, default is csv
+        inventory_url (str): s3 url of an inventory manifest.json, or of an
+            inventory configuration prefix to use its latest report
+        cache_dir (str): optional directory to keep the sorted index in
+        max_age (float): seconds after which the snapshot is considered
+            stale and listings fall back to live LIST requests
+        worker_count (int): number of inventory files read concurrently
 
     Returns:
-        success boolean
+        S3Inventory object
     """
-    # Encode pandas DataFrame to bytes object
-    if file_format == "csv":
-        bytes_object = pandas_df.to_csv(None, index=False, **kwargs).encode()
-    elif file_format == "parquet":
-        bytes_object = pandas_df.to_parquet(None, index=False)
-    else:
-        return False
-    # Write bytes to s3
-    return write_bytes(
-        access_key, secret_key,
-        # Parse s3 URL for bucket name and s3 key
-        *parse_url(s3_url),
-        bytes_object)
+    inventory = S3Inventory(
+        access_key, secret_key, inventory_url, cache_dir, worker_count)
+    _INVENTORIES[inventory.bucket_name] = (inventory, max_age)
+
+    return inventory
 
 
-def write_dict(access_key, secret_key, s3_url, dict_object):
+def disable_inventory(bucket_name=None):
     """
-    This method will convert a dict to bytes using YAML and write them to
-    a specified s3 location.
+    This method will stop serving a bucket, or every bucket, from its
+    inventory.
+    """
+    if bucket_name is None:
+        _INVENTORIES.clear()
+    else:
+        _INVENTORIES.pop(bucket_name, None)
 
-    TODO: Add other file format options like JSON
 
-    Args:
-        access_key (str): AWS s3 Access Key
-        secret_key (str): AWS s3 Secret Key
-        s3_url (str): s3 url where data will be written
-        dict_object (dict): python dictionary
+def _get_inventory(bucket_name):
+    """
+    This method will get the enabled inventory of a bucket unless it is
+    stale.
 
     Returns:
-        success boolean
+        S3Inventory object or None
     """
-    return write_bytes(
-        access_key, secret_key,
-        # Parse s3 URL for bucket name and s3 key
-        *parse_url(s3_url),
-        # Encode dictionary
-        yaml.dump(dict_object).encode())
+    inventory, max_age = _INVENTORIES.get(bucket_name, (None, None))
+    if inventory is not None and max_age is not None and (
+        inventory.get_age() > max_age
+    ):
+        return None
 
+    return inventory
 
-def write_zip(access_key, secret_key, s3_url, file_dict):
-    """
-    This method will zip a dictionary of byte objects and save the file
-    on s3.
 
-    Args:
-        access_key (str): AWS s3 Access Key
-        secret_key (str): AWS s3 Secret Key
-        s3_url (str): s3 url where data will be written
-        file_dict (dict): filenames and their corresponding bytes
+def _get_latest_inventory_manifest(client, bucket_name, s3_prefix):
+    """
+    This method will find the manifest of the latest report under an
+    inventory configuration prefix. Report directories are named after
+    their creation time, so the latest one sorts last.
 
     Returns:
-        success boolean
+        manifest key
     """
-    # Write bytes in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(
-        zip_buffer, "a", zipfile.ZIP_DEFLATED, allowZip64=True
-    ) as zip_file:
-        for key, value in file_dict.items():
-            zip_file.writestr(key, value)
-    # Write bytes buffer to file
-    success = write_bytes(
-        access_key, secret_key, *parse_url(s3_url), zip_buffer.getvalue())
-    # Close buffer
-    zip_buffer.close()
-
-    return success
+    s3_prefix = s3_prefix.rstrip("/") + "/"
+    report_prefixes = sorted(
+        common_prefix["Prefix"]
+        for response in _iter_pages(
+            client, bucket_name, s3_prefix, delimiter="/")
+        for common_prefix in response.get("CommonPrefixes", [])
+        if not common_prefix["Prefix"].endswith("/hive/"))
+    for report_prefix in reversed(report_prefixes):
+        manifest_key = report_prefix + "manifest.json"
+        if _read_json_object(client, bucket_name, manifest_key) is not None:
+            return manifest_key
+    raise FileNotFoundError(
+        f"No inventory report found under s3://{bucket_name}/{s3_prefix}")
 
 
-def write_local_file(
-        access_key, secret_key, s3_prefix, bucket_name, local_filepath):
+def _read_inventory_file(client, bucket_name, s3_prefix, manifest):
     """
-    This method will write a local file to s3.
-
-    Args:
-        access_key (str): AWS s3 Access Key
-        secret_key (str): AWS s3 Secret Key
-        s3_prefix (str): AWS s3 prefix to file
-        bucket_name (str): AWS s3 bucket name
-        local_filepath (str): local filepath
+    This method will read an inventory data file, keeping only the current
+    versions of objects.
 
     Returns:
-        success
+        pyarrow Table with key, size, etag and last_modified columns
     """
-    success = False
-    with open(local_filepath, "rb") as bytes_object:
-        success = write_bytes(
-            access_key, secret_key, s3_prefix, bucket_name, bytes_object)
+    data = client.get_object(
+        Bucket=bucket_name, Key=s3_prefix)["Body"].read()
+    file_format = manifest["fileFormat"].lower()
+    if file_format == "csv":
+        # CSV files have no header and URL encoded keys
+        columns = [
+            re.sub(r"(?<!^)(?=[A-Z])", "_", column.strip()).lower()
+            for column in manifest["fileSchema"].split(",")]
+        df = pd.read_csv(
+            io.BytesIO(data), compression="gzip", header=None,
+            names=columns, dtype=str, keep_default_na=False)
+        df["key"] = df["key"].map(unquote_plus)
+        if "size" in df:
+            df["size"] = pd.to_numeric(df["size"]).fillna(0).astype("int64")
+        for column in ("is_latest", "is_delete_marker"):
+            if column in df:
+                df[column] = df[column].str.lower() == "true"
+        if "last_modified_date" in df:
+            df["last_modified_date"] = pd.to_datetime(
+                df["last_modified_date"], utc=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    elif file_format == "orc":
+        from pyarrow import orc
+        table = orc.ORCFile(pa.BufferReader(data)).read()
+    else:
+        table = pq.read_table(pa.BufferReader(data))
+    # Drop noncurrent versions and delete markers of versioned reports
+    if "is_latest" in table.column_names:
+        table = table.filter(table.column("is_latest"))
+    if "is_delete_marker" in table.column_names:
+        table = table.filter(pc.invert(
+            table.column("is_delete_marker")))
 
-    return success
+    return pa.table({
+        "key": _get_inventory_column(table, "key", pa.string()),
+        "size": _get_inventory_column(
+            table, "size", pa.int64()).fill_null(0),
+        "etag": _get_inventory_column(table, "e_tag", pa.string()),
+        "last_modified": _get_inventory_column(
+            table, "last_modified_date", pa.timestamp("ms", tz="UTC"))})
 
 
-def check_s3_path(access_key, secret_key, s3_path, bucket_name):
+def _get_inventory_column(table, column, data_type):
     """
-    This method will check whether the provided s3 path is valid.
-
-    Args:
-        access_key (str): AWS s3 Access Key
-        secret_key (str): AWS s3 Secret Key
-        s3_path (str): path to s3 file
-        bucket_name (str): name of s3 bucket
+    This method will get an inventory column, Size, ETag and
+    LastModifiedDate are optional fields and are null if not reported.
 
     Returns:
-        boolean for whether the path exists
+        pyarrow array
     """
-    s3_client = boto3.client(
-        's3', aws_access_key_id=access_key, aws_secret_access_key=secret_key)
-    # --- Setup key ---
-    # Remove bucket from path to get prefix if applicable
-    if bucket_name in s3_path:
-        s3_prefix = s3_path.split(bucket_name)[1][1:]
-    else:
-        s3_prefix = s3_path
-    # Get prefix to the left of the glob character
-    if "*" in s3_prefix:
-        s3_prefix = s3_prefix.split("*")[0]
-    # Get list response
-    resp = s3_client.list_objects(
-        Bucket=bucket_name, Prefix=s3_prefix, MaxKeys=1)
+    if column not in table.column_names:
+        return pa.nulls(table.num_rows, data_type)
 
-    return "Contents" in resp
+    return table.column(column).cast(data_type)
 
 
 def get_responses(
-        access_key, secret_key, s3_prefix, bucket_name):
+        access_key, secret_key, s3_prefix, bucket_name, worker_count=1,
+        fanout_depth=1):
     """
         This method will get the file information for a given directory on s3.
 
@@ -272,33 +3420,218 @@ def get_responses(
             secret_key (str): AWS s3 Secret Key
             s3_prefix (str): directory within s3 bucket
             bucket_name (str): name of s3 bucket
+            worker_count (int): number of concurrent listings, when greater
+                than one the sub-prefixes of the directory are listed in
+                parallel, see iter_response_pages
+            fanout_depth (int): number of "/" delimited levels to discover
+                sub-prefixes over before listing them in parallel
 
         Returns:
-            list of json responses from S3
+            list of json responses from S3 sorted by key
     """
-    client = boto3.session.Session().client(
-        "s3", aws_access_key_id=access_key, aws_secret_access_key=secret_key)
-    continuation_token = None
     responses = []
+    for page in iter_response_pages(
+        access_key, secret_key, s3_prefix, bucket_name,
+        worker_count=worker_count, fanout_depth=fanout_depth
+    ):
+        responses += page
+    # Parallel listings complete out of order
+    if worker_count > 1:
+        responses.sort(key=itemgetter("Key"))
+
+    return responses
+
+
+def iter_response_pages(
+        access_key, secret_key, s3_prefix, bucket_name, worker_count=1,
+        fanout_depth=1):
+    """
+    This method will yield the file information for a given directory on s3
+    one page at a time instead of accumulating every object in a list.
+
+    With more than one worker the directory is first listed with a "/"
+    delimiter to discover its sub-prefixes, which are then listed
+    concurrently. Pages are yielded as they arrive and aren't ordered.
+    Buckets with an enabled inventory are served from its index instead.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_prefix (str): directory within s3 bucket
+        bucket_name (str): name of s3 bucket
+        worker_count (int): number of concurrent listings
+        fanout_depth (int): number of "/" delimited levels to discover
+            sub-prefixes over
+
+    Yields:
+        lists of object dicts
+    """
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    inventory = _get_inventory(bucket_name)
+    if inventory is not None:
+        yield from inventory.iter_pages(client, s3_prefix)
+    elif worker_count > 1:
+        yield from _iter_pages_parallel(
+            client, bucket_name, [s3_prefix], worker_count, fanout_depth)
+    else:
+        for response in _iter_pages(client, bucket_name, s3_prefix):
+            if 'Contents' in response:
+                yield response['Contents']
+
+
+def get_prefix_summary(
+        access_key, secret_key, s3_prefix_list, bucket_name, worker_count=8,
+        fanout_depth=1):
+    """
+    This method will count the objects and bytes under a list of s3
+    prefixes. Only the counters are kept, so memory doesn't grow with the
+    number of objects.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        s3_prefix_list (list): list of s3 prefixes
+        bucket_name (str): name of s3 bucket
+        worker_count (int): number of concurrent listings
+        fanout_depth (int): number of "/" delimited levels to discover
+            sub-prefixes over
+
+    Returns:
+        dict with the object count and total size in bytes
+    """
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    summary = {"count": 0, "size": 0}
+    inventory = _get_inventory(bucket_name)
+    if inventory is not None:
+        for s3_prefix in s3_prefix_list:
+            prefix_summary = inventory.get_summary(client, s3_prefix)
+            summary["count"] += prefix_summary["count"]
+            summary["size"] += prefix_summary["size"]
+        return summary
+    for page in _iter_pages_parallel(
+        client, bucket_name, s3_prefix_list, worker_count, fanout_depth
+    ):
+        summary["count"] += len(page)
+        summary["size"] += sum(obj["Size"] for obj in page)
+
+    return summary
+
+
+def _iter_pages(
+        client, bucket_name, s3_prefix, delimiter=None, start_after=None):
+    """
+    This method will yield list_objects_v2 responses until the listing is no
+    longer truncated, optionally starting after a given key.
+    """
+    continuation_token = None
     # List objects within the given directory until the response is truncated
     while True:
         list_kwargs = dict(Bucket=bucket_name, Prefix=s3_prefix, MaxKeys=1000)
+        if delimiter:
+            list_kwargs['Delimiter'] = delimiter
+        if start_after:
+            list_kwargs['StartAfter'] = start_after
         # Add continuation token if not None
         if continuation_token:
             list_kwargs['ContinuationToken'] = continuation_token
         response = client.list_objects_v2(**list_kwargs)
-        # Add valid reponses and update continuation token
-        if 'Contents' in response:
-            responses += response['Contents']
+        yield response
         # Exit while loop if at the end of the objects
         if not response.get('IsTruncated'):
             break
         continuation_token = response.get('NextContinuationToken')
 
-    return responses
+
+def _discover_prefixes(client, bucket_name, s3_prefix, depth):
+    """
+    This method will list a prefix with a "/" delimiter to split it into the
+    objects directly under it and its sub-prefixes, descending depth levels.
+
+    Returns:
+        list of object dicts and list of sub-prefixes
+    """
+    objects = []
+    prefixes = []
+    for response in _iter_pages(client, bucket_name, s3_prefix, "/"):
+        objects += response.get('Contents', [])
+        prefixes += [i['Prefix'] for i in response.get('CommonPrefixes', [])]
+    if depth > 1:
+        sub_prefixes = []
+        for prefix in prefixes:
+            sub_objects, leaf_prefixes = _discover_prefixes(
+                client, bucket_name, prefix, depth - 1)
+            objects += sub_objects
+            sub_prefixes += leaf_prefixes
+        prefixes = sub_prefixes
+
+    return objects, prefixes
 
 
-def get_s3_prefix_size(access_key, secret_key, s3_prefix_list, bucket_name):
+def _iter_pages_parallel(
+        client, bucket_name, s3_prefix_list, worker_count, fanout_depth):
+    """
+    This method will list a set of prefixes concurrently after fanning them
+    out into their sub-prefixes. Listed pages are passed back through a
+    bounded queue so slow consumers don't cause unbounded memory growth.
+
+    Yields:
+        lists of object dicts
+    """
+    done = object()
+    pages = queue.Queue(maxsize=2 * worker_count)
+    stop = threading.Event()
+
+    def list_prefix(prefix):
+        try:
+            for response in _iter_pages(client, bucket_name, prefix):
+                if 'Contents' not in response:
+                    continue
+                if not put_page(response['Contents']):
+                    return
+        finally:
+            put_page(done)
+
+    def put_page(item):
+        # Give up once the consumer has stopped iterating
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        leaf_prefixes = []
+        for objects, prefixes in executor.map(
+            lambda prefix: _discover_prefixes(
+                client, bucket_name, prefix, fanout_depth),
+            s3_prefix_list
+        ):
+            if objects:
+                yield objects
+            leaf_prefixes += prefixes
+        futures = [
+            executor.submit(list_prefix, prefix) for prefix in leaf_prefixes]
+        try:
+            remaining = len(futures)
+            while remaining:
+                page = pages.get()
+                if page is done:
+                    remaining -= 1
+                else:
+                    yield page
+        finally:
+            stop.set()
+        # Raise any listing errors
+        for future in futures:
+            future.result()
+
+
+def get_s3_prefix_size(
+        access_key, secret_key, s3_prefix_list, bucket_name, worker_count=8):
     """
     This method will get the size of a list of s3 prefixes.
 
@@ -307,15 +3640,15 @@ def get_s3_prefix_size(access_key, secret_key, s3_prefix_list, bucket_name):
         secret_key (str): AWS s3 Secret Key
         prefix_list (list): list of s3 prefixes
         bucket (str): name of s3 bucket
+        worker_count (int): number of concurrent listings
 
     Returns:
         size (in Gb)
     """
-    responses = []
-    for s3_prefix in s3_prefix_list:
-        responses += get_responses(
-            access_key, secret_key, s3_prefix, bucket_name)
-    return round(sum([i["Size"] for i in responses]) / np.power(10, 9), 2)
+    summary = get_prefix_summary(
+        access_key, secret_key, s3_prefix_list, bucket_name,
+        worker_count=worker_count)
+    return round(summary["size"] / np.power(10, 9), 2)
 
 
 def copy_file(access_key, secret_key, old_prefix, new_prefix, bucket_name):
@@ -364,75 +3697,497 @@ def copy_s3_files(
         Returns:
             success boolean
     """
-    success = True
-    old_keys = list(key_map.keys())
-    new_keys = list(key_map.values())
-    # Create a thread pood to multiprocess tasks
+    report = copy_objects(
+        access_key, secret_key, key_map, bucket_name,
+        worker_count=worker_count, max_retries=max_retries)
+    # If there are failed copies log error and reset success
+    copies_failed = sum(not result["success"] for result in report.values())
+    if copies_failed > 0:
+        logging.error(
+            f"WARNING: {copies_failed} copies failed.")
+        return False
+
+    return True
+
+
+def copy_objects(
+        access_key, secret_key, key_map, bucket_name, destination_bucket=None,
+        worker_count=32, max_retries=5, sizes=None,
+        multipart_threshold=MULTIPART_COPY_THRESHOLD,
+        part_size=COPY_PART_SIZE):
+    """
+    This method will copy many s3 objects server side with a shared client.
+    Each copy is retried with exponential backoff and jitter, and the number
+    of concurrent copies adapts when s3 throttles requests. Objects above the
+    multipart threshold are copied with concurrent UploadPartCopy requests,
+    which also lifts the 5 GB limit of a single copy.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        key_map (dict|iterable): map or (old, new) pairs of s3 keys
+        bucket_name (str): source s3 bucket
+        destination_bucket (str): destination s3 bucket, defaults to the
+            source bucket
+        worker_count (int): maximum number of concurrent copies
+        max_retries (int): maximum number of retries per key
+        sizes (dict): optional map of old s3 key to size in bytes, e.g. from
+            get_responses, used to pick multipart copies up front. Without
+            it, multipart copies are used once a single copy is rejected
+            for size
+        multipart_threshold (int): size in bytes from which to copy in parts
+        part_size (int): size in bytes of each copied part
+
+    Returns:
+        dict of old s3 key to a dict with the new key, success boolean,
+        number of attempts and error message
+    """
+    destination_bucket = destination_bucket or bucket_name
+    pairs = key_map.items() if isinstance(key_map, dict) else key_map
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    limiter = AdaptiveLimiter(worker_count)
+    report = {}
     with ThreadPoolExecutor(max_workers=worker_count) as executor:
-        # Run initial tasks
-        file_count = len(old_keys)
-        results = list(executor.map(
-            copy_file, [access_key] * file_count, [secret_key] * file_count,
-            old_keys, new_keys, [bucket_name] * file_count))
-        failed_tasks = [i for i in range(len(results)) if not results[i]]
-        # Retry at most the number of max retries
-        retries = 0
-        while len(failed_tasks) > 0 and retries < max_retries:
-            # Resubmit failed tasks
-            futures = [i.result() for i in [
-                executor.submit(
-                    copy_file, access_key, secret_key, old_keys[i],
-                    new_keys[i], bucket_name)
-                for i in failed_tasks]]
-            # Get updated failed tasks
-            failed_tasks = [
-                i for i in range(len(futures)) if not futures[i]]
-            # Iterate retries
-            retries += 1
-        # If there are still failed tasks log error and reset success
-        copies_failed = len(failed_tasks)
-        if copies_failed > 0:
-            logging.error(
-                f"WARNING: {copies_failed} copies failed.")
-            success = False
+        pending = set()
+        for old_key, new_key in pairs:
+            # Bound the number of queued copies for very large key maps
+            if len(pending) >= 4 * worker_count:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                report.update(future.result() for future in done)
+            size = sizes.get(old_key) if sizes else None
+            pending.add(executor.submit(
+                _copy_object_with_retries, client, limiter, bucket_name,
+                old_key, destination_bucket, new_key, size, max_retries,
+                multipart_threshold, part_size))
+        report.update(future.result() for future in pending)
 
-    return success
+    return report
+
+
+def _copy_object_with_retries(
+        client, limiter, bucket_name, old_key, destination_bucket, new_key,
+        size, max_retries, multipart_threshold, part_size):
+    """
+    This method will copy a single object, retrying retryable failures.
+
+    Returns:
+        old key and its copy result
+    """
+    result = {"new_key": new_key, "success": False, "attempts": 0,
+              "error": None}
+    use_multipart = size is not None and size >= multipart_threshold
+    while True:
+        result["attempts"] += 1
+        try:
+            with limiter:
+                if use_multipart:
+                    _copy_object_multipart(
+                        client, bucket_name, old_key, destination_bucket,
+                        new_key, part_size)
+                else:
+                    client.copy_object(
+                        Bucket=destination_bucket, Key=new_key,
+                        CopySource={"Bucket": bucket_name, "Key": old_key})
+            limiter.record_success()
+            result["success"] = True
+            result["error"] = None
+            break
+        except Exception as e:
+            code = get_error_code(e)
+            result["error"] = str(e)
+            # Objects over 5 GB have to be copied in parts
+            if code in ("InvalidRequest", "EntityTooLarge") and not (
+                use_multipart
+            ):
+                # Report a failing head request for this key only
+                try:
+                    use_multipart = client.head_object(
+                        Bucket=bucket_name, Key=old_key
+                    )["ContentLength"] > MULTIPART_COPY_THRESHOLD
+                except Exception as head_error:
+                    result["error"] = str(head_error)
+                    break
+                if use_multipart:
+                    continue
+                break
+            if code in THROTTLING_ERROR_CODES:
+                limiter.record_throttle()
+            elif code in NON_RETRYABLE_ERROR_CODES:
+                break
+            if result["attempts"] > max_retries:
+                break
+            time.sleep(get_backoff_delay(result["attempts"] - 1))
+
+    return old_key, result
+
+
+def _copy_object_multipart(
+        client, bucket_name, old_key, destination_bucket, new_key, part_size,
+        worker_count=8):
+    """
+    This method will copy an object with concurrent UploadPartCopy requests,
+    keeping the metadata, content headers and server side encryption a
+    single copy_object request would keep.
+    """
+    head = client.head_object(Bucket=bucket_name, Key=old_key)
+    part_size = max(
+        part_size, MIN_PART_SIZE,
+        math.ceil(head["ContentLength"] / MAX_PART_COUNT))
+    create_args = {"Metadata": head.get("Metadata", {})}
+    for field in MULTIPART_COPY_FIELDS:
+        if field in head:
+            create_args[field] = head[field]
+    upload_id = client.create_multipart_upload(
+        Bucket=destination_bucket, Key=new_key, **create_args)["UploadId"]
+
+    def copy_part(part_number, start, end):
+        response = call_with_retries(
+            client.upload_part_copy, Bucket=destination_bucket, Key=new_key,
+            UploadId=upload_id, PartNumber=part_number,
+            CopySource={"Bucket": bucket_name, "Key": old_key},
+            CopySourceIfMatch=head["ETag"],
+            CopySourceRange=f"bytes={start}-{end - 1}")
+        return {
+            "PartNumber": part_number,
+            "ETag": response["CopyPartResult"]["ETag"]}
+
+    try:
+        ranges = get_part_ranges(head["ContentLength"], part_size)
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            parts = list(executor.map(
+                lambda args: copy_part(args[0] + 1, *args[1]),
+                enumerate(ranges)))
+        client.complete_multipart_upload(
+            Bucket=destination_bucket, Key=new_key, UploadId=upload_id,
+            MultipartUpload={"Parts": parts})
+    except Exception:
+        client.abort_multipart_upload(
+            Bucket=destination_bucket, Key=new_key, UploadId=upload_id)
+        raise
+
+
+def delete_objects(
+        access_key, secret_key, bucket_name, keys=None, s3_prefix=None,
+        dry_run=False, versioned=False, worker_count=8, max_retries=3):
+    """
+    This method will delete s3 objects in bulk. Keys are streamed from an
+    iterable or a prefix listing, batched into delete_objects requests of
+    1000 keys and the batches are sent concurrently.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        bucket_name (str): name of s3 bucket
+        keys (iterable): s3 keys to delete, or (key, version id) pairs
+        s3_prefix (str): delete every object under this prefix instead, an
+            empty prefix isn't allowed to avoid emptying a whole bucket
+        dry_run (bool): only count and log the objects that would be deleted
+        versioned (bool): when deleting a prefix, delete every object
+            version and delete marker so nothing remains in a versioned
+            bucket. Otherwise only delete markers are added for versioned
+            buckets
+        worker_count (int): number of concurrent batch deletes
+        max_retries (int): maximum number of retries per batch
+
+    Returns:
+        dict with the number of matched and deleted objects and a list of
+        per-key errors
+    """
+    if keys is None and not s3_prefix:
+        raise ValueError("Either keys or a non-empty s3_prefix is required.")
+    client = get_client(
+        access_key, secret_key, max_pool_connections=worker_count)
+    if keys is None:
+        keys = _iter_delete_keys(client, bucket_name, s3_prefix, versioned)
+    report = {"matched": 0, "deleted": 0, "errors": []}
+
+    def collect(result):
+        report["deleted"] += result["deleted"]
+        report["errors"] += result["errors"]
+
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        pending = set()
+        for batch in _iter_batches(keys, DELETE_BATCH_SIZE):
+            report["matched"] += len(batch)
+            if dry_run:
+                logging.info(
+                    f"Dry run: would delete {len(batch)} objects from "
+                    f"{bucket_name} starting at {batch[0]['Key']}")
+                continue
+            if len(pending) >= 2 * worker_count:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future.result())
+            pending.add(executor.submit(
+                _delete_batch, client, bucket_name, batch, max_retries))
+        for future in pending:
+            collect(future.result())
+    if report["errors"]:
+        logging.error(
+            f"{len(report['errors'])} of {report['matched']} deletes from "
+            f"{bucket_name} failed.")
+
+    return report
+
+
+def _iter_delete_keys(client, bucket_name, s3_prefix, versioned):
+    """
+    This method will yield the keys, or key and version id pairs, under a
+    prefix.
+    """
+    if not versioned:
+        for response in _iter_pages(client, bucket_name, s3_prefix):
+            for obj in response.get("Contents", []):
+                yield obj["Key"]
+        return
+    paginator = client.get_paginator("list_object_versions")
+    for response in paginator.paginate(Bucket=bucket_name, Prefix=s3_prefix):
+        for obj in response.get("Versions", []) + response.get(
+            "DeleteMarkers", []
+        ):
+            yield obj["Key"], obj["VersionId"]
+
+
+def _iter_batches(keys, batch_size):
+    """
+    This method will group keys into delete_objects object identifiers.
+
+    Yields:
+        lists of at most batch_size object identifier dicts
+    """
+    batch = []
+    for key in keys:
+        if isinstance(key, str):
+            batch.append({"Key": key})
+        else:
+            batch.append({"Key": key[0], "VersionId": key[1]})
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _delete_batch(client, bucket_name, batch, max_retries):
+    """
+    This method will delete a batch of at most 1000 objects. Quiet mode is
+    used so only the failed keys are returned.
+
+    Returns:
+        dict with the number of deleted objects and per-key errors
+    """
+    try:
+        response = call_with_retries(
+            client.delete_objects, Bucket=bucket_name,
+            Delete={"Objects": batch, "Quiet": True}, max_retries=max_retries)
+        errors = response.get("Errors", [])
+    except Exception as e:
+        # Every key in the batch failed
+        errors = [
+            dict(obj, Code=get_error_code(e), Message=str(e))
+            for obj in batch]
+
+    return {"deleted": len(batch) - len(errors), "errors": errors}
 
 
 def create_manifest_for_parquet(
         s3_bucket, s3_prefix, aws_access_key_id=None,
-        aws_secret_access_key=None):
+        aws_secret_access_key=None, skip_unchanged=False, incremental=False,
+        statistics=False, worker_count=8):
     """
     Create a manifest file for Parquet files in a given S3 prefix.
 
+    In incremental mode the previous manifest is read and only keys after
+    its last key are listed, so a rebuild costs O(new files). This assumes
+    new files sort after existing ones, e.g. time ordered file names, and
+    doesn't drop entries for deleted files. With statistics the footers of
+    new files are read in parallel with ranged GETs, their row counts are
+    recorded as the entries' record_count and their column min / max are
+    written to a manifest_statistics.json sidecar that get_manifest_files
+    uses to prune files.
+
     Parameters:
         s3_bucket (str): Name of the S3 bucket.
         s3_prefix (str): Prefix in the S3 bucket where Parquet files are stored.
         aws_access_key_id (str, optional): AWS Access Key ID. Defaults to None.
         aws_secret_access_key (str, optional): AWS Secret Access Key. Defaults to None.
+        skip_unchanged (bool, optional): Skip writing an identical manifest.
+            Defaults to False.
+        incremental (bool, optional): Extend the previous manifest with new
+            files. Defaults to False.
+        statistics (bool, optional): Record row counts and column min / max
+            of new files. Defaults to False.
+        worker_count (int, optional): Number of concurrent footer reads.
+            Defaults to 8.
 
     Returns:
         str: The S3 key of the created manifest file.
     """
-    # Pull the list of files from the provided prefix
-    responses = get_responses(
-        aws_access_key_id, aws_secret_access_key, s3_prefix,
-        s3_bucket)
-    # Filter for .parquet files and create manifest entries
-    manifest = {
-        "entries": [
-            {
-                "url": f"s3://{s3_bucket}/" + obj["Key"],
-                "mandatory": True,
-                "meta": {"content_length": obj["Size"]}
-            }
-            for obj in responses
-            if obj["Key"].endswith(".parquet")]}
-    # Write manifest file to S3
-    s3 = boto3.client(
-        's3', aws_access_key_id=aws_access_key_id, 
-        aws_secret_access_key=aws_secret_access_key)
+    s3 = get_client(
+        aws_access_key_id, aws_secret_access_key,
+        max_pool_connections=worker_count)
     manifest_key = s3_prefix.rstrip('/') + '/manifest.json'
-    s3.put_object(Bucket=s3_bucket, Key=manifest_key, Body=json.dumps(manifest))
+    statistics_key = s3_prefix.rstrip('/') + '/manifest_statistics.json'
+    url_prefix = f"s3://{s3_bucket}/"
+    # Start from the previous manifest in incremental mode
+    entries, file_statistics, start_after = [], {}, None
+    if incremental:
+        entries = (_read_json_object(s3, s3_bucket, manifest_key) or {}).get(
+            "entries", [])
+        file_statistics = (_read_json_object(
+            s3, s3_bucket, statistics_key) or {}).get("files", {})
+        if entries:
+            start_after = max(
+                entry["url"][len(url_prefix):] for entry in entries)
+    # Pull the list of new parquet files from the provided prefix
+    new_objects = [
+        obj
+        for page in _iter_pages(
+            s3, s3_bucket, s3_prefix, start_after=start_after)
+        for obj in page.get("Contents", [])
+        if obj["Key"].endswith(".parquet")]
+    new_entries = [
+        {
+            "url": url_prefix + obj["Key"],
+            "mandatory": True,
+            "meta": {"content_length": obj["Size"]}
+        }
+        for obj in new_objects]
+    # Read the footers of the new files in parallel
+    if statistics and new_entries:
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            new_statistics = executor.map(
+                lambda obj: get_file_statistics(read_parquet_metadata(
+                    s3, s3_bucket, obj["Key"])[0]),
+                new_objects)
+            for entry, file_stats in zip(new_entries, new_statistics):
+                entry["meta"]["record_count"] = file_stats["record_count"]
+                file_statistics[entry["url"]] = file_stats
+    manifest = {"entries": entries + new_entries}
+    # Write the statistics sidecar before the manifest that references it
+    if statistics:
+        body = json.dumps({"files": file_statistics}).encode()
+        if not (skip_unchanged and _is_object_unchanged(
+            s3, s3_bucket, statistics_key, body
+        )):
+            s3.put_object(Bucket=s3_bucket, Key=statistics_key, Body=body)
+    # Write manifest file to S3
+    body = json.dumps(manifest).encode()
+    if skip_unchanged and _is_object_unchanged(
+        s3, s3_bucket, manifest_key, body
+    ):
+        logging.info(f"s3://{s3_bucket}/{manifest_key} is unchanged.")
+        return manifest_key
+    s3.put_object(Bucket=s3_bucket, Key=manifest_key, Body=body)
 
     return manifest_key
+
+
+def get_file_statistics(metadata):
+    """
+    This method will aggregate the row count and the min / max of every top
+    level column of a parquet file. Only JSON serializable statistics are
+    kept, dates and timestamps are stored as ISO strings.
+
+    Args:
+        metadata (pyarrow.parquet.FileMetaData): parquet file metadata
+
+    Returns:
+        dict with the record count and a dict of column name to [min, max],
+        None where statistics are missing
+    """
+    columns = {}
+    for i in range(metadata.num_row_groups):
+        for column, min_max in get_row_group_statistics(
+            metadata.row_group(i)
+        ).items():
+            if min_max is not None:
+                min_max = [_to_json_value(value) for value in min_max]
+                if None in min_max:
+                    min_max = None
+            if column not in columns:
+                columns[column] = min_max
+            elif columns[column] is not None and min_max is not None:
+                try:
+                    columns[column] = [
+                        min(columns[column][0], min_max[0]),
+                        max(columns[column][1], min_max[1])]
+                except TypeError:
+                    columns[column] = None
+            else:
+                columns[column] = None
+
+    return {"record_count": metadata.num_rows, "columns": columns}
+
+
+def _to_json_value(value):
+    """
+    This method will convert a statistics value to a JSON value.
+
+    Returns:
+        JSON serializable value or None
+    """
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        try:
+            return value.decode()
+        except UnicodeDecodeError:
+            return None
+
+    return None
+
+
+def get_manifest_files(access_key, secret_key, manifest_url, filters=None):
+    """
+    This method will get the file urls of a parquet manifest, pruning files
+    whose column statistics can't satisfy the filters. Files without
+    statistics are always kept.
+
+    Args:
+        access_key (str): AWS s3 Access Key
+        secret_key (str): AWS s3 Secret Key
+        manifest_url (str): s3 url of the manifest.json file
+        filters (list): filters in disjunctive normal form like pyarrow
+
+    Returns:
+        list of s3 urls
+    """
+    manifest_key, bucket_name = parse_url(manifest_url)
+    client = get_client(access_key, secret_key)
+    manifest = _read_json_object(client, bucket_name, manifest_key)
+    if manifest is None:
+        raise FileNotFoundError(f"{manifest_url} does not exist.")
+    urls = [entry["url"] for entry in manifest.get("entries", [])]
+    filters = _normalize_filters(filters)
+    if not filters:
+        return urls
+    file_statistics = (_read_json_object(
+        client, bucket_name,
+        manifest_key.rsplit("/", 1)[0] + "/manifest_statistics.json"
+    ) or {}).get("files", {})
+
+    return [
+        url for url in urls
+        if url not in file_statistics or statistics_may_match(
+            file_statistics[url]["columns"], filters)]
+
+
+def _read_json_object(client, bucket_name, s3_prefix):
+    """
+    This method will read a JSON object from s3.
+
+    Returns:
+        parsed JSON or None if the object doesn't exist
+    """
+    try:
+        response = client.get_object(Bucket=bucket_name, Key=s3_prefix)
+    except ClientError as e:
+        if get_error_code(e) in ("NoSuchKey", "404"):
+            return None
+        raise
+
+    return json.loads(response["Body"].read())
@@ -0,0 +1,267 @@
+import os
+import datetime
+import threading
+import pytest
+import boto3
+from unittest.mock import MagicMock, patch
+from moto import mock_aws
+from dataengine import dataset
+
+DIRNAME = os.path.dirname(os.path.realpath(__file__))
+BUCKET_NAME = "my-bucket"
+
+
+@pytest.fixture
+def s3_client():
+    os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+    with mock_aws():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket=BUCKET_NAME)
+        for day in ('2024-01-01', '2024-01-02'):
+            conn.put_object(
+                Bucket=BUCKET_NAME, Key=f'data/{day}/part-0.csv', Body=b'a\n1')
+        yield conn
+
+
+def create_dataset(spark, **kwargs):
+    kwargs.setdefault("schema", {"a": "IntegerType"})
+    kwargs.setdefault("dt", datetime.datetime(2024, 1, 2))
+    return dataset.Dataset(
+        "my_dataset", DIRNAME, f"s3://{BUCKET_NAME}/data/{{date_str}}/*",
+        location="s3", spark=spark, bucket=BUCKET_NAME, **kwargs)
+
+
+def test_dataset_is_lazy(s3_client):
+    spark = MagicMock()
+    with patch.object(
+        dataset.s3_utils, "check_s3_path", wraps=dataset.s3_utils.check_s3_path
+    ) as check_s3_path:
+        my_dataset = create_dataset(spark)
+        # Construction only records the plan
+        check_s3_path.assert_not_called()
+        spark.read.load.assert_not_called()
+        assert my_dataset.get_plan()["path_templates"] == [
+            f"s3://{BUCKET_NAME}/data/{{date_str}}/*"]
+        df = my_dataset.df
+        assert my_dataset.df is df
+    assert check_s3_path.call_count == 1
+    spark.read.load.assert_called_once()
+    assert spark.read.load.call_args[0][0] == [
+        f"s3://{BUCKET_NAME}/data/2024-01-02/*"]
+
+
+def test_prefetch_datasets(s3_client):
+    spark = MagicMock()
+    datasets = [
+        create_dataset(spark), create_dataset(spark),
+        create_dataset(spark, exact_files=True)]
+    with patch.object(
+        dataset.s3_utils, "glob_s3_path", wraps=dataset.s3_utils.glob_s3_path
+    ) as glob_s3_path:
+        dataset.prefetch_datasets(datasets)
+    # Equal plans are only resolved once
+    assert glob_s3_path.call_count == 2
+    assert all(i.resolved for i in datasets)
+    assert datasets[1].file_path_list == [
+        f"s3://{BUCKET_NAME}/data/2024-01-02/*"]
+    assert datasets[2].file_path_list == [
+        f"s3://{BUCKET_NAME}/data/2024-01-02/part-0.csv"]
+    spark.read.load.assert_not_called()
+
+
+def test_local_dataset_reads_with_spark(tmp_path):
+    (tmp_path / "file.csv").write_text("a|b\n1|2\n")
+    spark = MagicMock()
+    my_dataset = dataset.Dataset(
+        "my_dataset", str(tmp_path), "file.csv", separator="|", spark=spark,
+        schema={"a": "IntegerType", "b": "IntegerType"})
+    my_dataset.df
+    args, kwargs = spark.read.load.call_args
+    assert args[0] == ["file://" + str(tmp_path / "file.csv")]
+    assert kwargs["sep"] == "|"
+    assert kwargs["header"] == True
+    assert kwargs["schema"].fieldNames() == ["a", "b"]
+
+
+def test_local_dataset_relative_dirname(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "file.csv").write_text("a\n1\n")
+    monkeypatch.chdir(tmp_path)
+    spark = MagicMock()
+    my_dataset = dataset.Dataset(
+        "my_dataset", "data", "file.csv", spark=spark)
+    my_dataset.df
+    # Relative paths are made absolute so they aren't read as a host name
+    assert spark.read.load.call_args[0][0] == [
+        "file://" + str(tmp_path / "data" / "file.csv")]
+
+
+def test_local_partitioned_dataset_relative_dirname(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    spark = MagicMock()
+    my_dataset = dataset.Dataset(
+        "my_dataset", "data", "table", file_format="parquet", spark=spark,
+        dt=datetime.datetime(2024, 1, 2), partitioning={"date_column": "dt"})
+    my_dataset.prefetch()
+    assert my_dataset.file_path_list == [
+        "file://" + str(tmp_path / "data" / "table") + "/dt=2024-01-02"]
+
+
+def test_local_dataset_use_pandas(tmp_path):
+    (tmp_path / "file.csv").write_text("a,b\n1,2\n")
+    spark = MagicMock()
+    my_dataset = dataset.Dataset(
+        "my_dataset", str(tmp_path), "file.csv", spark=spark,
+        use_pandas=True)
+    with patch.object(dataset.spark_utils, "pandas_to_spark") as to_spark:
+        assert my_dataset.df is to_spark.return_value
+    assert to_spark.call_args[0][1].to_dict("list") == {"a": [1], "b": [2]}
+    spark.read.load.assert_not_called()
+
+
+def test_partitioned_dataset_filters_window(s3_client):
+    spark = MagicMock()
+    my_dataset = dataset.Dataset(
+        "my_dataset", DIRNAME, "s3://{bucket}/table/", location="s3",
+        file_format="parquet", spark=spark,
+        dt=datetime.datetime(2024, 1, 3), bucket=BUCKET_NAME,
+        dt_delta={"delta_type": "rolling", "days": -2},
+        exclude_hours=["0-5"], rename={"dt": "date"},
+        partitioning={"date_column": "dt", "hour_column": "hour"})
+    df = my_dataset.df
+    # A single spark path is read per base path
+    args, kwargs = spark.read.load.call_args
+    assert args[0] == [
+        f"s3://{BUCKET_NAME}/table/dt={{2024-01-02,2024-01-03}}"]
+    assert kwargs["basePath"] == f"s3://{BUCKET_NAME}/table"
+    hours = ", ".join(str(i) for i in range(6, 24))
+    spark.read.load.return_value.where.assert_called_once_with(
+        f"(dt = '2024-01-02' AND hour IN ({hours})) OR "
+        f"(dt = '2024-01-03' AND hour IN ({hours}))")
+    # Partition columns are renamed after filtering
+    where = spark.read.load.return_value.where
+    where.return_value.withColumnRenamed.assert_called_once_with(
+        "dt", "date")
+    assert df is where.return_value.withColumnRenamed.return_value
+
+
+def test_partitioned_dataset_latest(s3_client):
+    s3_client.put_object(
+        Bucket=BUCKET_NAME, Key="table/dt=2024-01-01/hour=0/part-0.parquet",
+        Body=b"")
+    spark = MagicMock()
+    my_dataset = dataset.Dataset(
+        "my_dataset", DIRNAME, "s3://{bucket}/table", location="s3",
+        file_format="parquet", spark=spark,
+        dt=datetime.datetime(2024, 1, 2), bucket=BUCKET_NAME,
+        dt_delta={"delta_type": "latest", "days": 2},
+        partitioning={"date_column": "dt", "hour_column": "hour"})
+    my_dataset.prefetch()
+    assert my_dataset.file_path_list == [
+        f"s3://{BUCKET_NAME}/table/dt=2024-01-01"]
+    assert my_dataset.partition_filter == "dt IN ('2024-01-01')"
+
+
+def test_schema_registry(s3_client, tmp_path):
+    registry_path = str(tmp_path / "schemas.yaml")
+    schema = dataset.ps_types.StructType([
+        dataset.ps_types.StructField("a", dataset.ps_types.LongType())])
+    spark = MagicMock()
+    spark.read.load.return_value.schema = schema
+    dataset.enable_schema_registry(registry_path)
+    try:
+        # The first load merges the schema and registers it
+        create_dataset(spark, schema=None, file_format="parquet").df
+        assert spark.read.load.call_args[1]["mergeSchema"] == True
+        registry = dataset.SchemaRegistry(registry_path)
+        assert registry.get("my_dataset", "1") == schema
+        # Later loads only check the new paths for drift
+        spark.read.load.reset_mock()
+        create_dataset(
+            spark, schema=None, file_format="parquet",
+            dt=datetime.datetime(2024, 1, 1)).df
+        assert spark.read.load.call_args_list[0][0][0] == [
+            f"s3://{BUCKET_NAME}/data/2024-01-01/*"]
+        assert spark.read.load.call_args[1]["schema"] == schema
+        assert "mergeSchema" not in spark.read.load.call_args[1]
+        # A new column in the sample falls back to merging the schema
+        spark.read.load.reset_mock()
+        drifted_schema = dataset.ps_types.StructType(schema.fields + [
+            dataset.ps_types.StructField("b", dataset.ps_types.StringType())])
+        spark.read.load.return_value.schema = drifted_schema
+        s3_client.put_object(
+            Bucket=BUCKET_NAME, Key="data/2024-01-03/part-0.csv", Body=b"")
+        create_dataset(
+            spark, schema=None, file_format="parquet",
+            dt=datetime.datetime(2024, 1, 3)).df
+        assert spark.read.load.call_args[1]["mergeSchema"] == True
+        assert dataset.SchemaRegistry(registry_path).get(
+            "my_dataset", "1") == drifted_schema
+    finally:
+        dataset.disable_schema_registry()
+
+
+def test_schema_registry_from_yaml(tmp_path):
+    registry_path = tmp_path / "schemas.yaml"
+    registry_path.write_text(
+        "my_dataset:\n  '2':\n    schema: {a: LongType}\n")
+    registry = dataset.SchemaRegistry(str(registry_path))
+    assert registry.get("my_dataset", "1") is None
+    assert registry.get("my_dataset", 2).fieldNames() == ["a"]
+
+
+def test_dataframe_cache(s3_client):
+    spark = MagicMock()
+    spark.read.load.return_value.persist.return_value.is_cached = True
+    datasets = [create_dataset(spark), create_dataset(spark)]
+    other_dataset = create_dataset(spark, dt=datetime.datetime(2024, 1, 1))
+    cache = dataset.DataFrameCache("MEMORY_ONLY")
+    cache.add_consumers(datasets + [other_dataset])
+    # Shared inputs are read once and persisted
+    df = cache.get_df(datasets[0])
+    assert cache.get_df(datasets[1]) is df
+    spark.read.load.return_value.persist.assert_called_once_with(
+        dataset.StorageLevel.MEMORY_ONLY)
+    assert spark.read.load.call_count == 1
+    # Inputs with a single consumer aren't persisted
+    cache.get_df(other_dataset)
+    assert spark.read.load.call_count == 2
+    spark.read.load.return_value.persist.assert_called_once()
+    # The last consumer unpersists
+    cache.release(datasets[0])
+    df.unpersist.assert_not_called()
+    cache.release(datasets[1])
+    df.unpersist.assert_called_once()
+
+
+def test_dataframe_cache_keys_and_locks(s3_client):
+    spark = MagicMock()
+    datasets = [
+        create_dataset(spark), create_dataset(spark, rename={"a": "b"})]
+    cache = dataset.DataFrameCache()
+    cache.add_consumers(datasets)
+    # Consumers of the same paths with different transforms aren't shared
+    dfs = [cache.get_df(i) for i in datasets]
+    assert spark.read.load.call_count == 2
+    assert dfs[0] is spark.read.load.return_value
+    assert dfs[1] is dfs[0].withColumnRenamed.return_value
+    # A slow load doesn't block consumers of other datasets
+    loading = threading.Event()
+    finished = threading.Event()
+
+    def slow_load():
+        loading.set()
+        finished.wait(5)
+        return MagicMock()
+
+    slow_dataset = create_dataset(spark, dt=datetime.datetime(2024, 1, 1))
+    with patch.object(slow_dataset, "_load", side_effect=slow_load):
+        thread = threading.Thread(target=cache.get_df, args=(slow_dataset,))
+        thread.start()
+        assert loading.wait(5)
+        other_dataset = create_dataset(spark, schema_version="2")
+        cache.get_df(other_dataset)
+        assert spark.read.load.call_count == 3
+        finished.set()
+        thread.join()
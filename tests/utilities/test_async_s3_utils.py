@@ -0,0 +1,106 @@
+import asyncio
+import os
+import pytest
+import boto3
+from moto import mock_aws
+from moto.server import ThreadedMotoServer
+from dataengine.utilities import async_s3_utils
+
+# Setup global variables
+ACCESS_KEY = "testing"
+SECRET_KEY = "testing"
+BUCKET_NAME = "my-bucket"
+
+
+@pytest.fixture
+def aws_credentials():
+    """Mock AWS Credentials for moto."""
+    os.environ['AWS_ACCESS_KEY_ID'] = ACCESS_KEY
+    os.environ['AWS_SECRET_ACCESS_KEY'] = SECRET_KEY
+    os.environ['AWS_SECURITY_TOKEN'] = 'testing'
+    os.environ['AWS_SESSION_TOKEN'] = 'testing'
+
+
+@pytest.fixture
+def s3_client(aws_credentials):
+    with mock_aws():
+        conn = boto3.client("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket=BUCKET_NAME)
+        yield conn
+
+
+def test_async_s3_client(s3_client):
+    async def run():
+        async with async_s3_utils.AsyncS3Client(
+            ACCESS_KEY, SECRET_KEY, max_concurrency=8
+        ) as s3:
+            keys = [f'async/file_{i}' for i in range(50)]
+            results = await asyncio.gather(*[
+                s3.write_bytes(key, BUCKET_NAME, key.encode())
+                for key in keys])
+            assert all(results)
+            objects = await s3.list_objects('async/', BUCKET_NAME)
+            assert sorted(obj['Key'] for obj in objects) == sorted(keys)
+            data = await asyncio.gather(*[
+                s3.read_file(key, BUCKET_NAME) for key in keys])
+            assert data == [key.encode() for key in keys]
+            result = await s3.copy_object(
+                'async/file_0', 'copied/file_0', BUCKET_NAME)
+            assert result['success']
+            head = await s3.head_object('copied/file_0', BUCKET_NAME)
+            assert head['ContentLength'] == len(b'async/file_0')
+            report = await s3.delete_objects(keys, BUCKET_NAME)
+            assert report['deleted'] == len(keys)
+            assert await s3.head_object('async/file_0', BUCKET_NAME) is None
+
+    asyncio.run(run())
+
+
+def test_async_s3_client_cancellation(s3_client):
+    s3_client.put_object(
+        Bucket=BUCKET_NAME, Key='large', Body=os.urandom(4 * 1024 ** 2))
+
+    async def run():
+        async with async_s3_utils.AsyncS3Client(
+            ACCESS_KEY, SECRET_KEY, max_concurrency=1
+        ) as s3:
+            task = asyncio.create_task(
+                s3.read_file('large', BUCKET_NAME, chunk_size=1024))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # The request slot is released for other operations
+            head = await asyncio.wait_for(
+                s3.head_object('large', BUCKET_NAME), timeout=10)
+            assert head['ContentLength'] == 4 * 1024 ** 2
+
+    asyncio.run(run())
+
+
+def test_async_s3_client_endpoint_url(aws_credentials):
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+    server.start()
+    try:
+        host, port = server.get_host_and_port()
+        endpoint_url = f'http://{host}:{port}'
+        boto3.client(
+            's3', region_name='us-east-1', endpoint_url=endpoint_url
+        ).create_bucket(Bucket=BUCKET_NAME)
+        # The client is created outside of the loop it is used in
+        s3 = async_s3_utils.AsyncS3Client(
+            ACCESS_KEY, SECRET_KEY, max_concurrency=4,
+            endpoint_url=endpoint_url)
+
+        async def run():
+            async with s3:
+                assert all(await asyncio.gather(*[
+                    s3.write_bytes(f'server/{i}', BUCKET_NAME, b'x' * i)
+                    for i in range(10)]))
+                objects = await s3.list_objects('server/', BUCKET_NAME)
+                assert len(objects) == 10
+                assert await s3.read_file('server/3', BUCKET_NAME) == b'xxx'
+
+        asyncio.run(run())
+    finally:
+        server.stop()
@@ -1,9 +1,18 @@
+import gzip
+import hashlib
+import io
+import json
+import os
 import tempfile
+import zipfile
+from unittest.mock import MagicMock, patch
 import pytest
 import boto3
+from botocore.exceptions import ClientError
 from moto import mock_aws
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from dataengine.utilities import s3_utils
 
 # Setup global variables
@@ -102,6 +111,60 @@ def test_read_file(s3_client):
     assert result == b'test_content'
 
 
+def test_read_file_parallel(s3_client):
+    setup_s3_bucket(s3_client)
+    body = bytes(range(256)) * 4000
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='test_large', Body=body)
+    result = s3_utils.read_file(
+        ACCESS_KEY, SECRET_KEY, 'test_large', BUCKET_NAME, parallel=True,
+        part_size=100000, worker_count=4)
+    assert result == body
+
+
+def test_read_file_parallel_multipart_etag(s3_client):
+    setup_s3_bucket(s3_client)
+    # Upload an object in two parts so it has a multipart ETag
+    parts = [b'a' * 5 * 1024 ** 2, b'b' * 1000]
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=BUCKET_NAME, Key='test_multipart')['UploadId']
+    etags = [
+        s3_client.upload_part(
+            Bucket=BUCKET_NAME, Key='test_multipart', UploadId=upload_id,
+            PartNumber=i + 1, Body=part)['ETag']
+        for i, part in enumerate(parts)]
+    s3_client.complete_multipart_upload(
+        Bucket=BUCKET_NAME, Key='test_multipart', UploadId=upload_id,
+        MultipartUpload={'Parts': [
+            {'PartNumber': i + 1, 'ETag': etag}
+            for i, etag in enumerate(etags)]})
+    result = s3_utils.read_file(
+        ACCESS_KEY, SECRET_KEY, 'test_multipart', BUCKET_NAME, parallel=True,
+        part_size=1024 ** 2)
+    assert result == b''.join(parts)
+
+
+def test_download_file(s3_client):
+    setup_s3_bucket(s3_client)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        local_filepath = f"{tmpdir}/test_size"
+        size = s3_utils.download_file(
+            ACCESS_KEY, SECRET_KEY, 'test_size', BUCKET_NAME, local_filepath,
+            part_size=1024 ** 2)
+        assert size == 1024 * 10000
+        with open(local_filepath, "rb") as local_file:
+            assert local_file.read() == b'a' * 1024 * 10000
+
+
+def test_calculate_etag():
+    # Single part ETags are the MD5 of the content
+    md5 = hashlib.md5(b'test_content').hexdigest()
+    assert s3_utils.calculate_etag(b'test_content') == f'"{md5}"'
+    # Multipart ETags are the MD5 of the part MD5s with the part count
+    digests = hashlib.md5(b'a').digest() + hashlib.md5(b'b').digest()
+    assert s3_utils.calculate_etag(b'ab', part_size=1) == (
+        f'"{hashlib.md5(digests).hexdigest()}-2"')
+
+
 def test_read_df(s3_client):
     setup_s3_bucket(s3_client)
     s3_prefix = 'test_csv'
@@ -112,6 +175,141 @@ def test_read_df(s3_client):
     pd.testing.assert_frame_equal(df, expected_df)
 
 
+def test_read_df_pyarrow(s3_client):
+    setup_s3_bucket(s3_client)
+    df = s3_utils.read_df(
+        ACCESS_KEY, SECRET_KEY, 'test_csv', BUCKET_NAME, engine="pyarrow",
+        dtype={'col2': 'float64'}, usecols=['col2'])
+    expected_df = pd.DataFrame({'col2': [2.0, 4.0]})
+    pd.testing.assert_frame_equal(df, expected_df)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_iter_df(s3_client, compression):
+    setup_s3_bucket(s3_client)
+    df = pd.DataFrame({'col1': range(25), 'col2': range(25, 50)})
+    body = df.to_csv(index=False).encode()
+    if compression == "gzip":
+        body = gzip.compress(body)
+    elif compression == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        body = zstandard.ZstdCompressor().compress(body)
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='test_iter_csv', Body=body)
+    # Compression is inferred from the magic bytes
+    chunks = list(s3_utils.iter_df(
+        ACCESS_KEY, SECRET_KEY, 'test_iter_csv', BUCKET_NAME, chunksize=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+
+def setup_parquet_file(s3_client, prefix='test.parquet'):
+    df = pd.DataFrame({
+        'id': range(100), 'value': [float(i) for i in range(100)],
+        'name': [f'name_{i}' for i in range(100)]})
+    s3_client.put_object(
+        Bucket=BUCKET_NAME, Key=prefix,
+        Body=df.to_parquet(None, index=False, row_group_size=10))
+    return df
+
+
+def test_read_parquet(s3_client):
+    setup_s3_bucket(s3_client)
+    df = setup_parquet_file(s3_client)
+    result = s3_utils.read_parquet(
+        ACCESS_KEY, SECRET_KEY, 'test.parquet', BUCKET_NAME)
+    pd.testing.assert_frame_equal(result, df)
+
+
+def test_read_parquet_projection_and_filters(s3_client):
+    setup_s3_bucket(s3_client)
+    setup_parquet_file(s3_client)
+    result = s3_utils.read_parquet(
+        ACCESS_KEY, SECRET_KEY, 'test.parquet', BUCKET_NAME,
+        columns=['name'], filters=[('id', '>=', 95)], as_arrow=True)
+    assert result.column_names == ['name']
+    assert result.column('name').to_pylist() == [
+        f'name_{i}' for i in range(95, 100)]
+    # Filters that exclude every row group return an empty table
+    result = s3_utils.read_parquet(
+        ACCESS_KEY, SECRET_KEY, 'test.parquet', BUCKET_NAME,
+        columns=['id'], filters=[[('id', '<', 0)], [('id', '>', 1000)]])
+    assert list(result.columns) == ['id']
+    assert len(result) == 0
+    # A filter column with several predicates is read once
+    result = s3_utils.read_parquet(
+        ACCESS_KEY, SECRET_KEY, 'test.parquet', BUCKET_NAME,
+        columns=['name'], filters=[('id', '>=', 95), ('id', '<', 97)],
+        as_arrow=True)
+    assert result.column('name').to_pylist() == ['name_95', 'name_96']
+
+
+def test_s3_file_seek_and_readahead(s3_client):
+    setup_s3_bucket(s3_client)
+    data = os.urandom(10 * 1024)
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='test.bin', Body=data)
+    s3_file = s3_utils.S3File(
+        ACCESS_KEY, SECRET_KEY, 'test.bin', BUCKET_NAME, block_size=1024,
+        max_readahead=4096, cache_size=8192)
+    assert s3_file.read(100) == data[:100]
+    assert s3_file.tell() == 100
+    # Sequential reads are served from the readahead blocks
+    assert s3_file.read(2000) == data[100:2100]
+    assert s3_file.read(1000) == data[2100:3100]
+    assert s3_file.read(4000) == data[3100:7100]
+    assert s3_file.request_count == 3
+    assert s3_file.seek(-10, io.SEEK_END) == len(data) - 10
+    assert s3_file.read() == data[-10:]
+    assert s3_file.read(10) == b''
+    # Blocks still in the cache don't need another request
+    request_count = s3_file.request_count
+    s3_file.seek(50)
+    assert s3_file.read(50) == data[50:100]
+    assert s3_file.request_count == request_count
+
+
+def test_s3_file_zip_and_parquet(s3_client):
+    setup_s3_bucket(s3_client)
+    df = setup_parquet_file(s3_client)
+    table = pq.read_table(s3_utils.S3File(
+        ACCESS_KEY, SECRET_KEY, 'test.parquet', BUCKET_NAME))
+    pd.testing.assert_frame_equal(table.to_pandas(), df)
+    # Reading one member of an archive only fetches the blocks it needs
+    members = {f'file{i}.bin': os.urandom(1024 ** 2) for i in range(8)}
+    s3_utils.write_zip(
+        ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/test.zip', members)
+    s3_file = s3_utils.S3File(
+        ACCESS_KEY, SECRET_KEY, 'test.zip', BUCKET_NAME,
+        block_size=64 * 1024)
+    with zipfile.ZipFile(s3_file) as zip_file:
+        assert zip_file.read('file3.bin') == members['file3.bin']
+    assert s3_file.request_count <= 8
+    assert sum(len(block) for block in s3_file.blocks.values()) < (
+        3 * 1024 ** 2)
+
+
+def test_read_df_parquet(s3_client):
+    setup_s3_bucket(s3_client)
+    df = setup_parquet_file(s3_client)
+    result = s3_utils.read_df(
+        ACCESS_KEY, SECRET_KEY, 'test.parquet', BUCKET_NAME,
+        file_format='parquet', usecols=['id', 'value'])
+    pd.testing.assert_frame_equal(result, df[['id', 'value']])
+
+
+def test_statistics_may_match():
+    statistics = {'id': (10, 19), 'name': None}
+    assert s3_utils.statistics_may_match(statistics, [])
+    assert s3_utils.statistics_may_match(statistics, [[('id', '=', 15)]])
+    assert not s3_utils.statistics_may_match(statistics, [[('id', '>', 19)]])
+    assert not s3_utils.statistics_may_match(
+        statistics, [[('id', 'in', [1, 2, 30])]])
+    # Missing statistics can't be used to prune
+    assert s3_utils.statistics_may_match(statistics, [[('name', '=', 'a')]])
+    # Any matching conjunction is enough
+    assert s3_utils.statistics_may_match(
+        statistics, [[('id', '<', 0)], [('id', '<=', 10)]])
+
+
 def test_write_bytes(s3_client):
     setup_s3_bucket(s3_client)
     # Setup test data
@@ -128,6 +326,39 @@ def test_write_bytes(s3_client):
     assert written_data == bytes_object
 
 
+def test_write_bytes_multipart(s3_client):
+    setup_s3_bucket(s3_client)
+    bytes_object = b'a' * 6 * 1024 ** 2 + b'b' * 1024 ** 2
+    success = s3_utils.write_bytes(
+        ACCESS_KEY, SECRET_KEY, 'test_multipart', BUCKET_NAME, bytes_object,
+        multipart_threshold=1024 ** 2, part_size=5 * 1024 ** 2)
+    assert success == True
+    # Verify the object was uploaded in two parts
+    head = s3_client.head_object(Bucket=BUCKET_NAME, Key='test_multipart')
+    assert head['ETag'].endswith('-2"')
+    assert s3_utils.read_file(
+        ACCESS_KEY, SECRET_KEY, 'test_multipart', BUCKET_NAME
+    ) == bytes_object
+
+
+def test_upload_parts_aborts_on_failure(s3_client):
+    setup_s3_bucket(s3_client)
+
+    def failing_parts():
+        yield b'a' * 5 * 1024 ** 2
+        yield b'b' * 5 * 1024 ** 2
+        raise ValueError("Failed to read part")
+
+    success = s3_utils.upload_parts(
+        s3_client, BUCKET_NAME, 'test_aborted', failing_parts())
+    assert success == False
+    # Verify nothing was written and the upload was cleaned up
+    assert 'Uploads' not in s3_client.list_multipart_uploads(
+        Bucket=BUCKET_NAME)
+    assert s3_utils.check_s3_path(
+        ACCESS_KEY, SECRET_KEY, 'test_aborted', BUCKET_NAME) == False
+
+
 def test_write_pandas_df_csv(s3_client):
     setup_s3_bucket(s3_client)
     # Setup args
@@ -168,6 +399,36 @@ def test_write_pandas_df_unsupported_format(s3_client):
     assert success == False
 
 
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_write_pandas_df_stream_csv(s3_client, compression):
+    setup_s3_bucket(s3_client)
+    prefix = "test_stream.csv"
+    df = pd.DataFrame({'col1': range(1000), 'col2': range(1000, 2000)})
+    success = s3_utils.write_pandas_df_stream(
+        ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/{prefix}', df,
+        compression=compression, chunksize=100)
+    assert success == True
+    written_df = pd.concat(s3_utils.iter_df(
+        ACCESS_KEY, SECRET_KEY, prefix, BUCKET_NAME))
+    pd.testing.assert_frame_equal(written_df, df)
+
+
+def test_write_pandas_df_stream_parquet(s3_client):
+    setup_s3_bucket(s3_client)
+    prefix = "test_stream.parquet"
+    df = pd.DataFrame({'col1': range(1000), 'col2': range(1000, 2000)})
+    success = s3_utils.write_pandas_df_stream(
+        ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/{prefix}', df,
+        file_format="parquet", chunksize=100)
+    assert success == True
+    metadata, _, _, _ = s3_utils.read_parquet_metadata(
+        s3_client, BUCKET_NAME, prefix)
+    assert metadata.num_row_groups == 10
+    written_df = s3_utils.read_parquet(
+        ACCESS_KEY, SECRET_KEY, prefix, BUCKET_NAME)
+    pd.testing.assert_frame_equal(written_df, df)
+
+
 def test_write_dict(s3_client):
     setup_s3_bucket(s3_client)
     # Setup args
@@ -180,6 +441,101 @@ def test_write_dict(s3_client):
     assert success == True
 
 
+def get_version_count(s3_client, prefix):
+    return len(s3_client.list_object_versions(
+        Bucket=BUCKET_NAME, Prefix=prefix).get('Versions', []))
+
+
+def test_write_skip_unchanged(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_client.put_bucket_versioning(
+        Bucket=BUCKET_NAME, VersioningConfiguration={'Status': 'Enabled'})
+    url = f's3://{BUCKET_NAME}/test_dict.yaml'
+    for test_dict in ({'key': 'value'}, {'key': 'value'}, {'key': 'other'}):
+        assert s3_utils.write_dict(
+            ACCESS_KEY, SECRET_KEY, url, test_dict, skip_unchanged=True)
+    assert get_version_count(s3_client, 'test_dict.yaml') == 2
+    # Multipart ETags are matched with the upload part size
+    data = os.urandom(12 * 1024 ** 2)
+    for _ in range(2):
+        assert s3_utils.write_bytes(
+            ACCESS_KEY, SECRET_KEY, 'test.bin', BUCKET_NAME, data,
+            multipart_threshold=5 * 1024 ** 2, part_size=5 * 1024 ** 2,
+            skip_unchanged=True)
+    assert get_version_count(s3_client, 'test.bin') == 1
+    # Manifests are only rewritten when their entries change
+    setup_parquet_file(s3_client, 'data/part-0.parquet')
+    for _ in range(2):
+        manifest_key = s3_utils.create_manifest_for_parquet(
+            BUCKET_NAME, 'data/', ACCESS_KEY, SECRET_KEY,
+            skip_unchanged=True)
+    assert get_version_count(s3_client, manifest_key) == 1
+
+
+def test_create_manifest_for_parquet_incremental(s3_client):
+    setup_s3_bucket(s3_client)
+    for i in range(2):
+        s3_client.put_object(
+            Bucket=BUCKET_NAME, Key=f'data/part-{i}.parquet',
+            Body=pd.DataFrame({'id': range(i * 10, i * 10 + 10)}).to_parquet(
+                None, index=False))
+    manifest_key = s3_utils.create_manifest_for_parquet(
+        BUCKET_NAME, 'data', ACCESS_KEY, SECRET_KEY, statistics=True)
+    assert manifest_key == 'data/manifest.json'
+    s3_client.put_object(
+        Bucket=BUCKET_NAME, Key='data/part-2.parquet',
+        Body=pd.DataFrame({'id': range(20, 25)}).to_parquet(None, index=False))
+    s3_utils.create_manifest_for_parquet(
+        BUCKET_NAME, 'data', ACCESS_KEY, SECRET_KEY, incremental=True,
+        statistics=True)
+    manifest = json.loads(s3_utils.read_file(
+        ACCESS_KEY, SECRET_KEY, manifest_key, BUCKET_NAME))
+    urls = [entry['url'] for entry in manifest['entries']]
+    assert urls == [
+        f's3://{BUCKET_NAME}/data/part-{i}.parquet' for i in range(3)]
+    record_counts = [
+        entry['meta']['record_count'] for entry in manifest['entries']]
+    assert record_counts == [10, 10, 5]
+    # Files are pruned using their column statistics
+    files = s3_utils.get_manifest_files(
+        ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/{manifest_key}',
+        filters=[('id', '>=', 15)])
+    assert files == urls[1:]
+    assert s3_utils.get_manifest_files(
+        ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/{manifest_key}') == urls
+
+
+def test_write_objects(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='objects/a', Body=b'a')
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='objects/b', Body=b'old')
+    report = s3_utils.write_objects(
+        ACCESS_KEY, SECRET_KEY,
+        {'objects/a': b'a', 'objects/b': b'b', 'objects/c': b'c'},
+        BUCKET_NAME)
+    assert sorted(report['written']) == ['objects/b', 'objects/c']
+    assert report['unchanged'] == ['objects/a']
+    assert report['errors'] == {}
+    assert s3_utils.read_file(
+        ACCESS_KEY, SECRET_KEY, 'objects/b', BUCKET_NAME) == b'b'
+
+
+def test_write_objects_unrelated_prefixes(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='a/x', Body=b'x')
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='c/z', Body=b'z')
+    with patch.object(
+        s3_utils, '_iter_pages', wraps=s3_utils._iter_pages
+    ) as iter_pages:
+        report = s3_utils.write_objects(
+            ACCESS_KEY, SECRET_KEY, {'a/x': b'x', 'b/y': b'y'}, BUCKET_NAME)
+    assert report['written'] == ['b/y']
+    assert report['unchanged'] == ['a/x']
+    # Only the keys' own directories are listed, not the whole bucket
+    assert sorted(call.args[2] for call in iter_pages.call_args_list) == [
+        'a/', 'b/']
+
+
 def test_write_zip(s3_client):
     setup_s3_bucket(s3_client)
     # Setup args
@@ -191,6 +547,39 @@ def test_write_zip(s3_client):
         ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/{prefix}', test_files)
 
     assert success == True
+    # Members get the same permissions as zipfile.writestr gives them
+    expected = io.BytesIO()
+    with zipfile.ZipFile(expected, 'w') as zip_file:
+        zip_file.writestr('file1.txt', b'This is file1')
+    zip_bytes = s3_utils.read_file(ACCESS_KEY, SECRET_KEY, prefix, BUCKET_NAME)
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
+        assert zip_file.infolist()[0].external_attr == zipfile.ZipFile(
+            expected).infolist()[0].external_attr
+
+
+def test_write_zip_stream(s3_client):
+    setup_s3_bucket(s3_client)
+    prefix = "test_stream.zip"
+    large_member = [os.urandom(1024 ** 2) for _ in range(12)]
+    members = [
+        ('file1.txt', b'This is file1'),
+        ('dir/file2.bin', iter(large_member)),
+        ('fïlé3.txt', 'unicode name')]
+    success = s3_utils.write_zip_stream(
+        ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/{prefix}', iter(members),
+        worker_count=2)
+    assert success == True
+    # The archive is valid and was streamed in multiple parts
+    head = s3_client.head_object(Bucket=BUCKET_NAME, Key=prefix)
+    assert '-' in head['ETag']
+    zip_bytes = s3_utils.read_file(ACCESS_KEY, SECRET_KEY, prefix, BUCKET_NAME)
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == [
+            'file1.txt', 'dir/file2.bin', 'fïlé3.txt']
+        assert zip_file.read('file1.txt') == b'This is file1'
+        assert zip_file.read('dir/file2.bin') == b''.join(large_member)
+        assert zip_file.read('fïlé3.txt') == b'unicode name'
 
 
 def test_write_local_file(s3_client):
@@ -207,6 +596,22 @@ def test_write_local_file(s3_client):
     assert success == True
 
 
+def test_write_local_file_multipart(s3_client):
+    setup_s3_bucket(s3_client)
+    content = b'a' * 11 * 1024 ** 2
+    with tempfile.NamedTemporaryFile() as tmpfile:
+        tmpfile.write(content)
+        tmpfile.flush()
+        success = s3_utils.write_local_file(
+            ACCESS_KEY, SECRET_KEY, 'test_local_file', BUCKET_NAME,
+            tmpfile.name, multipart_threshold=1024 ** 2)
+    assert success == True
+    head = s3_client.head_object(Bucket=BUCKET_NAME, Key='test_local_file')
+    assert head['ETag'].endswith('-2"')
+    assert s3_utils.read_file(
+        ACCESS_KEY, SECRET_KEY, 'test_local_file', BUCKET_NAME) == content
+
+
 def test_check_s3_path_valid(s3_client):
     setup_s3_bucket(s3_client)
     assert s3_utils.check_s3_path(
@@ -228,6 +633,74 @@ def test_check_s3_path_with_glob(s3_client):
     ) == True
 
 
+def test_check_s3_path_directory(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='dir/file', Body=b'')
+    assert s3_utils.check_s3_path(
+        ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/dir', BUCKET_NAME)
+    # Partial names are no longer treated as existing paths
+    assert not s3_utils.check_s3_path(
+        ACCESS_KEY, SECRET_KEY, 'test_text', BUCKET_NAME)
+
+
+def test_glob_s3_path(s3_client):
+    setup_s3_bucket(s3_client)
+    keys = [
+        'data/dt=2024-01-01/hour=00/part-0.csv',
+        'data/dt=2024-01-01/hour=01/part-0.csv',
+        'data/dt=2024-01-01/hour=01/_SUCCESS',
+        'data/dt=2024-01-02/hour=00/part-0.csv',
+        'data/dt=2024-01-02/hour=00/part-1.json',
+        'data/dt=2024-01-10/hour=00/part-0.csv']
+    for key in keys:
+        s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=b'')
+    listing_cache = s3_utils.S3ListingCache()
+
+    def glob(pattern, **kwargs):
+        return s3_utils.glob_s3_path(
+            ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/{pattern}',
+            BUCKET_NAME, listing_cache=listing_cache, **kwargs)
+
+    # Directories match every visible file below them
+    assert glob('data/') == [keys[i] for i in (0, 1, 3, 4, 5)]
+    assert glob('data/dt=2024-01-0?/hour=00/*.csv') == [keys[0], keys[3]]
+    assert glob('data/dt=2024-01-0[!1]') == [keys[3], keys[4]]
+    assert glob('data/dt=2024-01-{01,10}/hour=00') == [keys[0], keys[5]]
+    assert glob('data/**/*.json') == [keys[4]]
+    assert glob('data/dt=2024-01-01/*/_SUCCESS') == [keys[2]]
+    assert glob('data/dt=2024-01-01/*', include_hidden=True) == sorted(
+        keys[:3])
+    assert glob('data/dt=2024-01-1') == []
+    # Every pattern was expanded from the first listing
+    assert list(listing_cache.listings) == [(BUCKET_NAME, 'data')]
+
+
+def test_glob_s3_path_lists_matching_directories(s3_client):
+    setup_s3_bucket(s3_client)
+    keys = [
+        f'events/{event}/dt={dt}/part-0.csv'
+        for event in ('click', 'view') for dt in ('2024-01-01', '2024-01-02')]
+    for key in keys:
+        s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=b'')
+    with patch.object(
+        s3_utils, '_iter_pages', wraps=s3_utils._iter_pages
+    ) as iter_pages:
+        assert s3_utils.check_s3_path(
+            ACCESS_KEY, SECRET_KEY,
+            f's3://{BUCKET_NAME}/events/*/dt=2024-01-02/', BUCKET_NAME)
+        assert s3_utils.glob_s3_path(
+            ACCESS_KEY, SECRET_KEY, 'events/*/dt=2024-01-02/', BUCKET_NAME
+        ) == [keys[1], keys[3]]
+    # Only the wildcard directory and the matching partitions are listed
+    assert sorted(
+        call.args[2:] + (call.kwargs.get('delimiter'),)
+        for call in iter_pages.call_args_list[:3]
+    ) == [
+        ('events/', '/'),
+        ('events/click/dt=2024-01-02', None),
+        ('events/view/dt=2024-01-02', None)]
+
+
 def test_check_s3_path_invalid_glob(s3_client):
     setup_s3_bucket(s3_client)
     assert s3_utils.check_s3_path(
@@ -251,6 +724,46 @@ def test_get_responses_empty(s3_client):
     assert len(responses) == 0
 
 
+def setup_nested_prefixes(s3_client):
+    keys = [
+        f'nested/{dt}/hour={hour}/part-{i}.csv'
+        for dt in ('dt=2024-01-01', 'dt=2024-01-02')
+        for hour in range(3) for i in range(2)] + ['nested/_SUCCESS']
+    for key in keys:
+        s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=b'abc')
+    return sorted(keys)
+
+
+@pytest.mark.parametrize("fanout_depth", [1, 2])
+def test_get_responses_parallel(s3_client, fanout_depth):
+    setup_s3_bucket(s3_client)
+    keys = setup_nested_prefixes(s3_client)
+    responses = s3_utils.get_responses(
+        ACCESS_KEY, SECRET_KEY, 'nested/', BUCKET_NAME, worker_count=4,
+        fanout_depth=fanout_depth)
+    assert [file["Key"] for file in responses] == keys
+
+
+def test_iter_response_pages(s3_client):
+    setup_s3_bucket(s3_client)
+    keys = setup_nested_prefixes(s3_client)
+    pages = list(s3_utils.iter_response_pages(
+        ACCESS_KEY, SECRET_KEY, 'nested/', BUCKET_NAME, worker_count=4))
+    # Pages are yielded per sub-prefix listing
+    assert len(pages) == 3
+    assert sorted(file["Key"] for page in pages for file in page) == keys
+
+
+def test_get_prefix_summary(s3_client):
+    setup_s3_bucket(s3_client)
+    keys = setup_nested_prefixes(s3_client)
+    summary = s3_utils.get_prefix_summary(
+        ACCESS_KEY, SECRET_KEY, ['nested/', 'test'], BUCKET_NAME)
+    assert summary == {
+        "count": len(keys) + 3,
+        "size": 3 * len(keys) + 12 + 17 + 1024 * 10000}
+
+
 def test_get_s3_prefix_size(s3_client):
     setup_s3_bucket(s3_client)
     size_gb = s3_utils.get_s3_prefix_size(
@@ -301,3 +814,503 @@ def test_copy_s3_files_partial_failure(s3_client):
         ACCESS_KEY, SECRET_KEY, key_map, BUCKET_NAME, worker_count=2,
         max_retries=1
     ) == False
+
+
+def test_copy_s3_files_retries_only_failed_keys(s3_client):
+    setup_s3_bucket(s3_client)
+    key_map = {
+        'nonexistent_file': 'nonexistent_file_copy',
+        'test_textfile': 'test_textfile_copy',
+        'test_csv': 'test_csv_copy'}
+    assert s3_utils.copy_s3_files(
+        ACCESS_KEY, SECRET_KEY, key_map, BUCKET_NAME, worker_count=2,
+        max_retries=2
+    ) == False
+    # The successful copies happened regardless of the failed key
+    assert s3_utils.check_s3_path(
+        ACCESS_KEY, SECRET_KEY, 'test_csv_copy', BUCKET_NAME) == True
+
+
+def test_copy_objects_report(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_client.create_bucket(Bucket='other-bucket')
+    report = s3_utils.copy_objects(
+        ACCESS_KEY, SECRET_KEY,
+        [('test_textfile', 'copy/test_textfile'),
+         ('nonexistent_file', 'copy/nonexistent_file')],
+        BUCKET_NAME, destination_bucket='other-bucket', max_retries=3)
+    assert report['test_textfile']['success'] == True
+    assert report['test_textfile']['attempts'] == 1
+    # Missing keys aren't retried
+    assert report['nonexistent_file']['success'] == False
+    assert report['nonexistent_file']['attempts'] == 1
+    assert 'NoSuchKey' in report['nonexistent_file']['error']
+    assert s3_client.get_object(
+        Bucket='other-bucket', Key='copy/test_textfile'
+    )['Body'].read() == b'test_content'
+
+
+def test_copy_objects_multipart(s3_client):
+    setup_s3_bucket(s3_client)
+    body = b'a' * 6 * 1024 ** 2 + b'b' * 1024
+    s3_client.put_object(
+        Bucket=BUCKET_NAME, Key='test_large', Body=body,
+        ContentType='text/plain', CacheControl='max-age=60',
+        ContentEncoding='identity', ContentDisposition='attachment',
+        ContentLanguage='en', ServerSideEncryption='AES256')
+    report = s3_utils.copy_objects(
+        ACCESS_KEY, SECRET_KEY, {'test_large': 'test_large_copy'},
+        BUCKET_NAME, sizes={'test_large': len(body)},
+        multipart_threshold=1024 ** 2, part_size=5 * 1024 ** 2)
+    assert report['test_large']['success'] == True
+    head = s3_client.head_object(Bucket=BUCKET_NAME, Key='test_large_copy')
+    assert head['ETag'].endswith('-2"')
+    # The settings a single copy_object request would keep are carried over
+    assert head['ContentType'] == 'text/plain'
+    assert head['CacheControl'] == 'max-age=60'
+    assert head['ContentEncoding'] == 'identity'
+    assert head['ContentDisposition'] == 'attachment'
+    assert head['ContentLanguage'] == 'en'
+    assert head['ServerSideEncryption'] == 'AES256'
+    assert s3_client.get_object(
+        Bucket=BUCKET_NAME, Key='test_large_copy')['Body'].read() == body
+
+
+def test_copy_object_head_failure():
+    client = MagicMock()
+    client.copy_object.side_effect = ClientError(
+        {'Error': {'Code': 'InvalidRequest'}}, 'CopyObject')
+    client.head_object.side_effect = ClientError(
+        {'Error': {'Code': '404'}}, 'HeadObject')
+    # A failing head request is reported for the key instead of raised
+    old_key, result = s3_utils._copy_object_with_retries(
+        client, s3_utils.AdaptiveLimiter(1), BUCKET_NAME, 'deleted',
+        BUCKET_NAME, 'deleted_copy', None, 3,
+        s3_utils.MULTIPART_COPY_THRESHOLD, s3_utils.COPY_PART_SIZE)
+    assert old_key == 'deleted'
+    assert result['success'] == False
+    assert '404' in result['error']
+
+
+def test_open_stream_closes_body():
+    for data, compression in (
+        (gzip.compress(b'a,b\n1,2\n'), 'gzip'), (b'a,b\n1,2\n', None)
+    ):
+        body = MagicMock(wraps=io.BytesIO(data))
+        with s3_utils.open_stream(
+            {'Body': body}, compression=compression
+        ) as stream:
+            assert stream.read() == b'a,b\n1,2\n'
+        # Closing the reader releases the response body
+        body.close.assert_called_once()
+
+
+def test_adaptive_limiter():
+    limiter = s3_utils.AdaptiveLimiter(8)
+    limiter.record_throttle()
+    limiter.record_throttle()
+    assert limiter.limit == 2
+    # A full window of successes raises the limit by one
+    limiter.record_success()
+    limiter.record_success()
+    assert limiter.limit == 3
+    for _ in range(10):
+        limiter.record_throttle()
+    assert limiter.limit == 1
+
+
+def test_delete_objects_prefix(s3_client):
+    setup_s3_bucket(s3_client)
+    keys = setup_nested_prefixes(s3_client)
+    # Dry runs don't delete anything
+    report = s3_utils.delete_objects(
+        ACCESS_KEY, SECRET_KEY, BUCKET_NAME, s3_prefix='nested/',
+        dry_run=True)
+    assert report == {"matched": len(keys), "deleted": 0, "errors": []}
+    assert len(s3_utils.get_responses(
+        ACCESS_KEY, SECRET_KEY, 'nested/', BUCKET_NAME)) == len(keys)
+    report = s3_utils.delete_objects(
+        ACCESS_KEY, SECRET_KEY, BUCKET_NAME, s3_prefix='nested/')
+    assert report == {"matched": len(keys), "deleted": len(keys), "errors": []}
+    assert s3_utils.get_responses(
+        ACCESS_KEY, SECRET_KEY, 'nested/', BUCKET_NAME) == []
+    # Other objects are untouched
+    assert len(s3_utils.get_responses(
+        ACCESS_KEY, SECRET_KEY, 'test', BUCKET_NAME)) == 3
+
+
+def test_delete_objects_keys(s3_client, monkeypatch):
+    setup_s3_bucket(s3_client)
+    monkeypatch.setattr(s3_utils, "DELETE_BATCH_SIZE", 2)
+    report = s3_utils.delete_objects(
+        ACCESS_KEY, SECRET_KEY, BUCKET_NAME,
+        keys=iter(['test_textfile', 'test_csv', 'test_size']))
+    assert report["deleted"] == 3
+    assert s3_utils.get_responses(
+        ACCESS_KEY, SECRET_KEY, 'test', BUCKET_NAME) == []
+
+
+def test_delete_objects_versioned(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_client.put_bucket_versioning(
+        Bucket=BUCKET_NAME, VersioningConfiguration={'Status': 'Enabled'})
+    for body in (b'v1', b'v2'):
+        s3_client.put_object(
+            Bucket=BUCKET_NAME, Key='versioned/file', Body=body)
+    report = s3_utils.delete_objects(
+        ACCESS_KEY, SECRET_KEY, BUCKET_NAME, s3_prefix='versioned/',
+        versioned=True)
+    assert report["deleted"] == 2
+    assert 'Versions' not in s3_client.list_object_versions(
+        Bucket=BUCKET_NAME, Prefix='versioned/')
+
+
+def test_delete_objects_requires_prefix(s3_client):
+    setup_s3_bucket(s3_client)
+    with pytest.raises(ValueError):
+        s3_utils.delete_objects(
+            ACCESS_KEY, SECRET_KEY, BUCKET_NAME, s3_prefix='')
+
+
+def test_s3_cache(s3_client):
+    setup_s3_bucket(s3_client)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = s3_utils.S3Cache(tmpdir)
+        assert s3_utils.read_file(
+            ACCESS_KEY, SECRET_KEY, 'test_textfile', BUCKET_NAME, cache=cache
+        ) == b'test_content'
+        assert len(os.listdir(cache.objects_dir)) == 1
+        # Changed objects get a new ETag and are downloaded again
+        s3_client.put_object(
+            Bucket=BUCKET_NAME, Key='test_textfile', Body=b'new_content')
+        assert s3_utils.read_file(
+            ACCESS_KEY, SECRET_KEY, 'test_textfile', BUCKET_NAME, cache=cache
+        ) == b'new_content'
+        # The default cache is used by read_df
+        s3_utils.enable_cache(tmpdir)
+        try:
+            df = s3_utils.read_df(
+                ACCESS_KEY, SECRET_KEY, 'test_csv', BUCKET_NAME)
+        finally:
+            s3_utils.disable_cache()
+        pd.testing.assert_frame_equal(
+            df, pd.DataFrame({'col1': [1, 3], 'col2': [2, 4]}))
+        assert len(os.listdir(cache.objects_dir)) == 3
+
+
+def test_s3_cache_ttl(s3_client):
+    setup_s3_bucket(s3_client)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = s3_utils.S3Cache(tmpdir, ttl=3600)
+        assert cache.read(
+            s3_client, BUCKET_NAME, 'test_textfile') == b'test_content'
+        # Within the ttl the cached version is served without a request
+        s3_client.put_object(
+            Bucket=BUCKET_NAME, Key='test_textfile', Body=b'new_content')
+        assert cache.read(
+            s3_client, BUCKET_NAME, 'test_textfile') == b'test_content'
+        assert open(cache.get_path(
+            s3_client, BUCKET_NAME, 'test_textfile', validate=True), 'rb'
+        ).read() == b'new_content'
+
+
+def test_s3_cache_eviction(s3_client):
+    setup_s3_bucket(s3_client)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = s3_utils.S3Cache(tmpdir, max_size=20)
+        cache.read(s3_client, BUCKET_NAME, 'test_textfile')
+        cache.read(s3_client, BUCKET_NAME, 'test_csv')
+        # Only the most recently used entry fits
+        assert os.listdir(cache.objects_dir) == [os.path.basename(
+            cache.get_path(s3_client, BUCKET_NAME, 'test_csv'))]
+
+
+def test_s3_cache_large_object(s3_client):
+    setup_s3_bucket(s3_client)
+    body = b'a\n' + b'1\n' * 49
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='large.csv', Body=body)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = s3_utils.S3Cache(tmpdir, max_size=50)
+        cache.read(s3_client, BUCKET_NAME, 'test_textfile')
+        # Objects larger than the cache are served without caching them
+        assert cache.read(s3_client, BUCKET_NAME, 'large.csv') == body
+        assert cache.get_path(s3_client, BUCKET_NAME, 'large.csv') is None
+        df = s3_utils.read_df(
+            ACCESS_KEY, SECRET_KEY, 'large.csv', BUCKET_NAME, cache=cache)
+        assert df.shape == (49, 1)
+        assert len(os.listdir(cache.objects_dir)) == 1
+
+
+def test_sync(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_url = f's3://{BUCKET_NAME}/sync'
+    with tempfile.TemporaryDirectory() as local_dir:
+        os.makedirs(os.path.join(local_dir, 'configs'))
+        for relative_path, content in (
+            ('a.txt', b'a'), ('configs/b.yaml', b'b: 1')
+        ):
+            with open(os.path.join(local_dir, relative_path), 'wb') as f:
+                f.write(content)
+        report = s3_utils.sync(ACCESS_KEY, SECRET_KEY, local_dir, s3_url)
+        assert sorted(report['transferred']) == ['a.txt', 'configs/b.yaml']
+        # Unchanged files aren't uploaded again
+        with open(os.path.join(local_dir, 'a.txt'), 'wb') as f:
+            f.write(b'changed')
+        s3_client.put_object(
+            Bucket=BUCKET_NAME, Key='sync/extra.txt', Body=b'extra')
+        report = s3_utils.sync(
+            ACCESS_KEY, SECRET_KEY, local_dir, s3_url, delete=True)
+        assert report['transferred'] == ['a.txt']
+        assert report['unchanged'] == 1
+        assert report['deleted'] == ['extra.txt']
+        assert [i['Key'] for i in s3_utils.get_responses(
+            ACCESS_KEY, SECRET_KEY, 'sync/', BUCKET_NAME)] == [
+                'sync/a.txt', 'sync/configs/b.yaml']
+
+
+def test_sync_to_local(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_utils.write_bytes(
+        ACCESS_KEY, SECRET_KEY, 'sync/large', BUCKET_NAME,
+        b'a' * 6 * 1024 ** 2, multipart_threshold=1024 ** 2)
+    s3_client.put_object(
+        Bucket=BUCKET_NAME, Key='sync/dir/small', Body=b'small')
+    with tempfile.TemporaryDirectory() as local_dir:
+        with open(os.path.join(local_dir, 'stale'), 'wb') as f:
+            f.write(b'stale')
+        report = s3_utils.sync(
+            ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/sync/', local_dir,
+            delete=True)
+        assert sorted(report['transferred']) == ['dir/small', 'large']
+        assert report['deleted'] == ['stale']
+        with open(os.path.join(local_dir, 'dir', 'small'), 'rb') as f:
+            assert f.read() == b'small'
+        # Multipart ETags are matched against the local files
+        report = s3_utils.sync(
+            ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/sync/', local_dir)
+        assert report['transferred'] == []
+        assert report['unchanged'] == 2
+
+
+
+def test_sync_to_local_rejects_traversal(s3_client):
+    setup_s3_bucket(s3_client)
+    for key in ('sync/../escaped', 'sync/dir/../../../escaped', 'sync/ok'):
+        s3_client.put_object(Bucket=BUCKET_NAME, Key=key, Body=b'data')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        local_dir = os.path.join(tmpdir, 'local')
+        os.makedirs(local_dir)
+        report = s3_utils.sync(
+            ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/sync/', local_dir)
+        # Keys resolving outside of the directory are reported as errors
+        assert report['transferred'] == ['ok']
+        assert sorted(report['errors']) == [
+            '../escaped', 'dir/../../../escaped']
+        assert os.listdir(tmpdir) == ['local']
+        assert os.listdir(local_dir) == ['ok']
+
+
+def test_metrics(s3_client):
+    setup_s3_bucket(s3_client)
+    exported = []
+    metrics = s3_utils.enable_metrics(export=exported.append, interval=60)
+    try:
+        s3_utils.write_dict(
+            ACCESS_KEY, SECRET_KEY, f's3://{BUCKET_NAME}/test_dict.yaml',
+            {'key': 'value'})
+        s3_utils.read_file(
+            ACCESS_KEY, SECRET_KEY, 'test_dict.yaml', BUCKET_NAME)
+        client = s3_utils.get_client(ACCESS_KEY, SECRET_KEY)
+        with pytest.raises(Exception):
+            client.head_object(Bucket=BUCKET_NAME, Key='missing')
+        snapshot = {
+            (i['caller'], i['operation']): i
+            for i in s3_utils.get_metrics_snapshot()}
+        put = snapshot[('write_dict', 'PutObject')]
+        assert put['bucket'] == BUCKET_NAME
+        assert put['count'] == 1
+        assert put['bytes_out'] == len(b'key: value\n')
+        get = snapshot[('read_file', 'GetObject')]
+        assert get['bytes_in'] == len(b'key: value\n')
+        assert sum(get['latency_buckets'].values()) == 1
+        head = snapshot[('test_s3_utils.test_metrics', 'HeadObject')]
+        assert head['errors'] == 1
+    finally:
+        s3_utils.disable_metrics()
+    # The exporter flushes a final snapshot when it is stopped
+    assert len(exported) == 1
+    assert len(exported[0]) == 3
+    metrics.reset()
+    assert metrics.snapshot() == []
+    assert s3_utils.get_metrics_snapshot() == []
+
+
+def setup_inventory(s3_client, file_format='CSV'):
+    s3_client.create_bucket(Bucket='inventory-bucket')
+    report_prefix = f'inventory/{BUCKET_NAME}/daily/2024-01-02T00-00Z/'
+    rows = [
+        ('data/a b.csv', 10), ('data/b.csv', 20), ('data/sub/c.csv', 30)]
+    if file_format == 'CSV':
+        body = gzip.compress(''.join(
+            f'"{BUCKET_NAME}","{key.replace(" ", "+")}","{size}",'
+            f'"2024-01-01T00:00:00.000Z","etag{size}"\n'
+            for key, size in rows).encode())
+    else:
+        body = pd.DataFrame({
+            'bucket': BUCKET_NAME, 'key': [key for key, _ in rows],
+            'size': [size for _, size in rows],
+            'last_modified_date': pd.Timestamp('2024-01-01', tz='UTC'),
+            'e_tag': [f'etag{size}' for _, size in rows]}).to_parquet(None)
+    s3_client.put_object(
+        Bucket='inventory-bucket', Key=report_prefix + 'data/0.gz',
+        Body=body)
+    manifest = {
+        'sourceBucket': BUCKET_NAME,
+        'destinationBucket': 'arn:aws:s3:::inventory-bucket',
+        'fileFormat': file_format,
+        'fileSchema': 'Bucket, Key, Size, LastModifiedDate, ETag',
+        'creationTimestamp': '1704153600000',
+        'files': [{'key': report_prefix + 'data/0.gz', 'size': len(body)}]}
+    s3_client.put_object(
+        Bucket='inventory-bucket', Key=report_prefix + 'manifest.json',
+        Body=json.dumps(manifest))
+    return report_prefix
+
+
+@pytest.mark.parametrize('file_format', ['CSV', 'Parquet'])
+def test_inventory(s3_client, file_format):
+    setup_s3_bucket(s3_client)
+    report_prefix = setup_inventory(s3_client, file_format)
+    # Keys newer than the snapshot only exist in the live listing
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='new/d.csv', Body=b'd')
+    s3_client.put_object(Bucket=BUCKET_NAME, Key='data/sub/e.csv', Body=b'e')
+    inventory_url = 's3://inventory-bucket/' + (
+        f'inventory/{BUCKET_NAME}/daily/' if file_format == 'CSV'
+        else report_prefix + 'manifest.json')
+    with tempfile.TemporaryDirectory() as cache_dir:
+        inventory = s3_utils.enable_inventory(
+            ACCESS_KEY, SECRET_KEY, inventory_url, cache_dir=cache_dir)
+        try:
+            assert inventory.bucket_name == BUCKET_NAME
+            assert len(os.listdir(cache_dir)) == 1
+            responses = s3_utils.get_responses(
+                ACCESS_KEY, SECRET_KEY, 'data/', BUCKET_NAME)
+            # Keys after the snapshot under inventoried prefixes are merged
+            assert [obj['Key'] for obj in responses] == [
+                'data/a b.csv', 'data/b.csv', 'data/sub/c.csv',
+                'data/sub/e.csv']
+            assert responses[0]['ETag'] == '"etag10"'
+            assert s3_utils.get_prefix_summary(
+                ACCESS_KEY, SECRET_KEY, ['data/', 'new/'], BUCKET_NAME
+            ) == {'count': 5, 'size': 62}
+            assert s3_utils.glob_s3_path(
+                ACCESS_KEY, SECRET_KEY, 'data/sub/*', BUCKET_NAME
+            ) == ['data/sub/c.csv', 'data/sub/e.csv']
+            assert s3_utils.glob_s3_path(
+                ACCESS_KEY, SECRET_KEY, 'data/*.csv', BUCKET_NAME
+            ) == ['data/a b.csv', 'data/b.csv']
+            # Objects only in the inventory are served from its index
+            assert s3_utils.check_s3_path(
+                ACCESS_KEY, SECRET_KEY, 'data/sub', BUCKET_NAME)
+            assert s3_utils.check_s3_path(
+                ACCESS_KEY, SECRET_KEY, 'new/d.csv', BUCKET_NAME)
+            assert not s3_utils.check_s3_path(
+                ACCESS_KEY, SECRET_KEY, 'data/su', BUCKET_NAME)
+            # The sorted index is reused from the cache directory
+            cached = s3_utils.S3Inventory(
+                ACCESS_KEY, SECRET_KEY, inventory_url, cache_dir=cache_dir)
+            assert cached.keys.equals(inventory.keys)
+        finally:
+            s3_utils.disable_inventory()
+    assert [obj['Key'] for obj in s3_utils.get_responses(
+        ACCESS_KEY, SECRET_KEY, 'data/', BUCKET_NAME)] == ['data/sub/e.csv']
+
+
+def test_inventory_optional_fields(s3_client):
+    setup_s3_bucket(s3_client)
+    s3_client.create_bucket(Bucket='inventory-bucket')
+    report_prefix = f'inventory/{BUCKET_NAME}/daily/2024-01-02T00-00Z/'
+    body = gzip.compress(f'"{BUCKET_NAME}","data/a.csv"\n'.encode())
+    s3_client.put_object(
+        Bucket='inventory-bucket', Key=report_prefix + 'data/0.gz',
+        Body=body)
+    s3_client.put_object(
+        Bucket='inventory-bucket', Key=report_prefix + 'manifest.json',
+        Body=json.dumps({
+            'sourceBucket': BUCKET_NAME,
+            'destinationBucket': 'arn:aws:s3:::inventory-bucket',
+            'fileFormat': 'CSV', 'fileSchema': 'Bucket, Key',
+            'creationTimestamp': '1704153600000',
+            'files': [{'key': report_prefix + 'data/0.gz'}]}))
+    inventory = s3_utils.S3Inventory(
+        ACCESS_KEY, SECRET_KEY,
+        f's3://inventory-bucket/{report_prefix}manifest.json')
+    client = s3_utils.get_client(ACCESS_KEY, SECRET_KEY)
+    assert list(inventory.iter_pages(client, 'data/')) == [
+        [{'Key': 'data/a.csv', 'Size': 0}]]
+
+
+def test_packed_store(s3_client):
+    setup_s3_bucket(s3_client)
+    url = f's3://{BUCKET_NAME}/packed'
+    store = s3_utils.PackedStore(
+        ACCESS_KEY, SECRET_KEY, url, segment_size=1024)
+    blobs = {f'config/{i}.yaml': {'id': i} for i in range(500)}
+    segment_ids = store.write(blobs)
+    # Hundreds of blobs are written as a few segments and their indexes
+    assert 1 < len(segment_ids) < 5
+    assert s3_client.list_objects_v2(
+        Bucket=BUCKET_NAME, Prefix='packed/')['KeyCount'] == (
+        2 * len(segment_ids))
+    assert store.read('config/7.yaml') == b'id: 7\n'
+    # Writes and deletes update the index without listing the segments
+    with patch.object(store, 'refresh') as refresh:
+        store.write({'config/7.yaml': b'id: seven\n'})
+        store.delete(['config/8.yaml'])
+    refresh.assert_not_called()
+    assert len(store.list()) == 499
+    assert store.read('config/7.yaml') == b'id: seven\n'
+    # A new store sees the latest version of every blob
+    store = s3_utils.PackedStore(ACCESS_KEY, SECRET_KEY, url)
+    assert len(store.list()) == 499
+    assert store.read_many(['config/7.yaml', 'config/9.yaml']) == {
+        'config/7.yaml': b'id: seven\n', 'config/9.yaml': b'id: 9\n'}
+    with pytest.raises(KeyError):
+        store.read('config/8.yaml')
+    result = store.compact()
+    assert result == {'compacted': len(segment_ids) + 2, 'written': 1}
+    assert s3_client.list_objects_v2(
+        Bucket=BUCKET_NAME, Prefix='packed/')['KeyCount'] == 2
+    assert len(store.list()) == 499
+    assert store.read('config/7.yaml') == b'id: seven\n'
+    assert store.read('config/499.yaml') == b'id: 499\n'
+    assert store.compact() == {'compacted': 0, 'written': 0}
+    # Blobs written by another writer during a compaction take precedence
+    store.write({'config/1.yaml': b'id: 1\n'})
+    other_store = s3_utils.PackedStore(ACCESS_KEY, SECRET_KEY, url)
+    read_many = store.read_many
+
+    def write_during_compaction(names, **kwargs):
+        other_store.write({'config/1.yaml': b'id: one\n'})
+        return read_many(names, **kwargs)
+
+    with patch.object(
+        store, 'read_many', side_effect=write_during_compaction
+    ):
+        assert store.compact()['compacted'] == 2
+    store = s3_utils.PackedStore(ACCESS_KEY, SECRET_KEY, url)
+    assert store.read('config/1.yaml') == b'id: one\n'
+    assert len(store.list()) == 499
+
+
+def test_packed_store_empty_blobs(s3_client):
+    setup_s3_bucket(s3_client)
+    url = f's3://{BUCKET_NAME}/packed'
+    store = s3_utils.PackedStore(ACCESS_KEY, SECRET_KEY, url)
+    store.write({'a': b'x', 'e': b''})
+    store.write({'only_empty': ''})
+    store = s3_utils.PackedStore(ACCESS_KEY, SECRET_KEY, url)
+    assert store.read('e') == b''
+    assert store.read('only_empty') == b''
+    assert store.read_many(['a', 'e', 'only_empty']) == {
+        'a': b'x', 'e': b'', 'only_empty': b''}